@@ -13,6 +13,18 @@ ALLOWED_HOSTS = ["127.0.0.1", "localhost"]
 
 FIELD_ENCRYPTION_KEY = os.getenv("FIELD_ENCRYPTION_KEY", "")
 TIMEKEEPER_REPO_URL = "https://github.com/terminusgps/terminusgps-timekeeper/"
+TIMEKEEPER_REPORT_DIR = BASE_DIR / "reports"
+TIMEKEEPER_WORKER_CONCURRENCY = 2
+TIMEKEEPER_JOB_STALE_TIMEOUT = 600
+TIMEKEEPER_REPORT_WORKERS = 1
+TIMEKEEPER_REPORT_CHART_BACKEND = "reportlab"
+TIMEKEEPER_REPORT_PROFILE_MEMORY = False
+TIMEKEEPER_IMPORT_CHUNK_SIZE = 1000
+TIMEKEEPER_PUNCH_EVENT_SETTLE = 0
+TIMEKEEPER_PUNCH_STREAM_INTERVAL = 1.0
+TIMEKEEPER_ASYNC_VIEWS = False
+TIMEKEEPER_SERVER_TIMING_SAMPLE_RATE = 0.1
+TIMEKEEPER_SLOW_REQUEST_THRESHOLD = 500
 FILE_UPLOAD_PERMISSIONS = stat.S_IRUSR | stat.S_IWUSR | stat.S_IRGRP
 
 # Application definition
@@ -30,6 +42,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "terminusgps_timekeeper.middleware.ServerTimingMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -64,7 +77,15 @@ WSGI_APPLICATION = "src.wsgi.application"
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
 DATABASES = {
-    "default": {"ENGINE": "django.db.backends.sqlite3", "NAME": BASE_DIR / "db.sqlite3"}
+    "default": {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": BASE_DIR / "db.sqlite3",
+        "OPTIONS": {
+            "init_command": "PRAGMA journal_mode=WAL; PRAGMA synchronous=NORMAL;",
+            "transaction_mode": "IMMEDIATE",
+            "timeout": 20,
+        },
+    }
 }
 
 
@@ -1,100 +1,161 @@
 from django.contrib import admin, messages
+from django.template.loader import render_to_string
 from django.utils.translation import ngettext
 
 from terminusgps_timekeeper.models import (
     Employee,
+    EmployeeDailyHours,
     EmployeePunchCard,
     EmployeeShift,
+    PunchBatch,
+    PunchEvent,
+    PunchEventCheckpoint,
     Report,
+    ReportJob,
 )
+from terminusgps_timekeeper.punches import bulk_punch_in, bulk_punch_out
 
 
-@admin.register(Report)
-class ReportAdmin(admin.ModelAdmin):
-    list_display = ["id", "start_date", "end_date"]
-    list_filter = ["start_date", "end_date"]
+class PunchActionsMixin:
+    """Admin actions that punch the selected employees in/out in bulk."""
 
+    employee_id_field: str = "pk"
+    """Field holding the employee id on the admin's model."""
 
-@admin.register(Employee)
-class EmployeeAdmin(admin.ModelAdmin):
-    fieldsets = [
-        (None, {"fields": ["user", "phone", "title", "pfp"]}),
-        ("Read-only", {"fields": ["code"]}),
-    ]
-    readonly_fields = ["code"]
-    actions = ["punch_employees_in", "punch_employees_out"]
+    def get_employee_ids(self, queryset) -> list[int]:
+        return list(queryset.values_list(self.employee_id_field, flat=True))
 
     @admin.action(description="Punch selected employees in")
     def punch_employees_in(self, request, queryset) -> None:
-        results_map = {"success": [], "skipped": []}
-        for employee in queryset:
-            if employee.punch_card.punched_in:
-                results_map["skipped"].append(employee.punch_card)
-                continue
-
-            employee.punch_card.punched_in = True
-            employee.punch_card.save()
-            results_map["success"].append(employee.punch_card)
-
-        if results_map["skipped"]:
+        result = bulk_punch_in(self.get_employee_ids(queryset))
+        if result.skipped:
             self.message_user(
                 request,
                 ngettext(
                     "%(count)s employee was already punched in and was skipped.",
                     "%(count)s employees were already punched in and were skipped.",
-                    len(results_map["skipped"]),
+                    result.skipped,
                 )
-                % {"count": len(results_map["skipped"])},
+                % {"count": result.skipped},
                 messages.WARNING,
             )
-        if results_map["success"]:
+        if result.success:
             self.message_user(
                 request,
                 ngettext(
                     "%(count)s employee was punched in.",
                     "%(count)s employees were punched in.",
-                    len(results_map["success"]),
+                    result.success,
                 )
-                % {"count": len(results_map["success"])},
+                % {"count": result.success},
                 messages.SUCCESS,
             )
 
     @admin.action(description="Punch selected employees out")
     def punch_employees_out(self, request, queryset) -> None:
-        results_map = {"success": [], "skipped": []}
-        for employee in queryset:
-            if not employee.punch_card.punched_in:
-                results_map["skipped"].append(employee.punch_card)
-                continue
-
-            employee.punch_card.punched_in = False
-            employee.punch_card.save()
-            results_map["success"].append(employee.punch_card)
-
-        if results_map["skipped"]:
+        result = bulk_punch_out(self.get_employee_ids(queryset))
+        if result.skipped:
             self.message_user(
                 request,
                 ngettext(
                     "%(count)s employee was already punched out and was skipped.",
                     "%(count)s employees were already punched out and were skipped.",
-                    len(results_map["skipped"]),
+                    result.skipped,
                 )
-                % {"count": len(results_map["skipped"])},
+                % {"count": result.skipped},
                 messages.WARNING,
             )
-        if results_map["success"]:
+        if result.success:
             self.message_user(
                 request,
                 ngettext(
                     "%(count)s employee was punched out.",
                     "%(count)s employees were punched out.",
-                    len(results_map["success"]),
+                    result.success,
                 )
-                % {"count": len(results_map["success"])},
+                % {"count": result.success},
                 messages.SUCCESS,
             )
 
 
+@admin.register(Report)
+class ReportAdmin(admin.ModelAdmin):
+    list_display = ["id", "start_date", "end_date"]
+    list_filter = ["start_date", "end_date"]
+
+
+@admin.register(ReportJob)
+class ReportJobAdmin(admin.ModelAdmin):
+    list_display = ["id", "report", "status", "attempts", "created_at", "finished_at"]
+    list_filter = ["status"]
+    readonly_fields = [
+        "report",
+        "author",
+        "attempts",
+        "locked_by",
+        "locked_at",
+        "created_at",
+        "finished_at",
+        "error",
+        "profile_table",
+    ]
+    exclude = ["profile"]
+
+    @admin.display(description="profile")
+    def profile_table(self, obj: ReportJob) -> str:
+        if not obj.profile:
+            return "-"
+        return render_to_string(
+            "terminusgps_timekeeper/reports/partials/_job_profile.html",
+            {"profile": obj.profile},
+        )
+
+
+@admin.register(EmployeeDailyHours)
+class EmployeeDailyHoursAdmin(admin.ModelAdmin):
+    list_display = ["employee", "date", "hours", "shift_count"]
+    list_filter = ["date"]
+    readonly_fields = ["employee", "date", "seconds", "shift_count"]
+
+
+@admin.register(PunchEvent)
+class PunchEventAdmin(admin.ModelAdmin):
+    list_display = ["employee", "direction", "timestamp", "source", "recorded_at"]
+    list_filter = ["direction", "source", "timestamp"]
+    readonly_fields = ["employee", "direction", "timestamp", "source", "recorded_at"]
+
+
+@admin.register(PunchEventCheckpoint)
+class PunchEventCheckpointAdmin(admin.ModelAdmin):
+    list_display = ["name", "last_event_id", "updated_at"]
+    readonly_fields = ["name", "last_event_id", "updated_at"]
+
+
+@admin.register(PunchBatch)
+class PunchBatchAdmin(admin.ModelAdmin):
+    list_display = ["token", "source", "received", "applied", "skipped", "created_at"]
+    list_filter = ["source", "created_at"]
+    readonly_fields = [
+        "token",
+        "source",
+        "received",
+        "applied",
+        "duplicates",
+        "skipped",
+        "created_at",
+    ]
+
+
+@admin.register(Employee)
+class EmployeeAdmin(PunchActionsMixin, admin.ModelAdmin):
+    fieldsets = [
+        (None, {"fields": ["user", "phone", "title", "pfp"]}),
+        ("Read-only", {"fields": ["code"]}),
+    ]
+    readonly_fields = ["code"]
+    actions = ["punch_employees_in", "punch_employees_out"]
+
+
 @admin.register(EmployeeShift)
 class EmployeeShiftAdmin(admin.ModelAdmin):
     list_display = ["employee", "end_datetime", "duration"]
@@ -103,84 +164,26 @@ class EmployeeShiftAdmin(admin.ModelAdmin):
 
 
 @admin.register(EmployeePunchCard)
-class EmployeePunchCardAdmin(admin.ModelAdmin):
+class EmployeePunchCardAdmin(PunchActionsMixin, admin.ModelAdmin):
     list_display = ["employee", "punched_in"]
     fieldsets = [
-        (None, {"fields": ["punched_in"]}),
         (
             "Read-only",
-            {"fields": ["employee", "last_punch_in_time", "_prev_punch_state"]},
-        ),
+            {
+                "fields": [
+                    "employee",
+                    "punched_in",
+                    "last_punch_in_time",
+                    "_prev_punch_state",
+                ]
+            },
+        )
     ]
     actions = ["punch_employees_in", "punch_employees_out"]
-    readonly_fields = ["employee", "last_punch_in_time", "_prev_punch_state"]
-
-    @admin.action(description="Punch selected employees in")
-    def punch_employees_in(self, request, queryset) -> None:
-        results_map = {"success": [], "skipped": []}
-        for pcard in queryset:
-            if pcard.punched_in:
-                results_map["skipped"].append(pcard)
-                continue
-
-            pcard.punched_in = True
-            pcard.save()
-            results_map["success"].append(pcard)
-
-        if results_map["skipped"]:
-            self.message_user(
-                request,
-                ngettext(
-                    "%(count)s employee was already punched in and was skipped.",
-                    "%(count)s employees were already punched in and were skipped.",
-                    len(results_map["skipped"]),
-                )
-                % {"count": len(results_map["skipped"])},
-                messages.WARNING,
-            )
-        if results_map["success"]:
-            self.message_user(
-                request,
-                ngettext(
-                    "%(count)s employee was punched in.",
-                    "%(count)s employees were punched in.",
-                    len(results_map["success"]),
-                )
-                % {"count": len(results_map["success"])},
-                messages.SUCCESS,
-            )
-
-    @admin.action(description="Punch selected employees out")
-    def punch_employees_out(self, request, queryset) -> None:
-        results_map = {"success": [], "skipped": []}
-        for pcard in queryset:
-            if not pcard.punched_in:
-                results_map["skipped"].append(pcard)
-                continue
-
-            pcard.punched_in = False
-            pcard.save()
-            results_map["success"].append(pcard)
-
-        if results_map["skipped"]:
-            self.message_user(
-                request,
-                ngettext(
-                    "%(count)s employee was already punched out and was skipped.",
-                    "%(count)s employees were already punched out and were skipped.",
-                    len(results_map["skipped"]),
-                )
-                % {"count": len(results_map["skipped"])},
-                messages.WARNING,
-            )
-        if results_map["success"]:
-            self.message_user(
-                request,
-                ngettext(
-                    "%(count)s employee was punched out.",
-                    "%(count)s employees were punched out.",
-                    len(results_map["success"]),
-                )
-                % {"count": len(results_map["success"])},
-                messages.SUCCESS,
-            )
+    readonly_fields = [
+        "employee",
+        "punched_in",
+        "last_punch_in_time",
+        "_prev_punch_state",
+    ]
+    employee_id_field = "employee_id"
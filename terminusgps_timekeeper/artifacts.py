@@ -0,0 +1,180 @@
+import datetime
+import hashlib
+import os
+import pathlib
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.db.models import (
+    Count,
+    DateTimeField,
+    DurationField,
+    ExpressionWrapper,
+    F,
+    Max,
+    Min,
+    Sum,
+    Value,
+)
+
+from terminusgps_timekeeper.models import EmployeeDailyHours, Report
+from terminusgps_timekeeper.pdf_generators import generate_report_pdf
+from terminusgps_timekeeper.profiling import ReportProfile
+
+
+def get_report_directory() -> pathlib.Path:
+    """
+    Returns the directory generated report pdf files are stored in.
+
+    :returns: A directory path. Defaults to ``BASE_DIR / "reports"``.
+    :rtype: :py:obj:`~pathlib.Path`
+
+    """
+    return pathlib.Path(
+        getattr(settings, "TIMEKEEPER_REPORT_DIR", settings.BASE_DIR / "reports")
+    )
+
+
+def get_period_directory(start_date: datetime.date, end_date: datetime.date) -> str:
+    """
+    Returns the directory name for a report period, i.e. ``"YYYY-MM-DD_YYYY-MM-DD"``.
+
+    :param start_date: Start of the report period.
+    :type start_date: :py:obj:`~datetime.date`
+    :param end_date: End of the report period.
+    :type end_date: :py:obj:`~datetime.date`
+    :returns: A directory name.
+    :rtype: :py:obj:`str`
+
+    """
+    return f"{start_date:%Y-%m-%d}_{end_date:%Y-%m-%d}"
+
+
+def get_shift_fingerprint(report: Report) -> str:
+    """
+    Returns a fingerprint of the shift data in the report period.
+
+    The fingerprint changes whenever shifts in the period are added, removed or edited, or the period's daily hours rollup changes, i.e. when it's rebuilt. Moving a shift without changing its duration changes the sum of its start times, so that changes the fingerprint too.
+
+    :param report: A report.
+    :type report: :py:obj:`~terminusgps_timekeeper.models.Report`
+    :returns: A hex digest.
+    :rtype: :py:obj:`str`
+
+    """
+    start, _ = report.period
+    aggregates = report.shifts.order_by().aggregate(
+        count=Count("id"),
+        id_max=Max("id"),
+        id_sum=Sum("id"),
+        duration=Sum("duration"),
+        start_min=Min("start_datetime"),
+        end_max=Max("end_datetime"),
+        start_offsets=Sum(
+            ExpressionWrapper(
+                F("start_datetime") - Value(start, DateTimeField()),
+                output_field=DurationField(),
+            )
+        ),
+    )
+    # Report totals and charts are read from the rollup, which can change without the shifts changing
+    aggregates.update(
+        EmployeeDailyHours.objects.filter(
+            date__gte=report.start_date, date__lte=report.end_date
+        ).aggregate(
+            rollup_count=Count("id"),
+            rollup_id_max=Max("id"),
+            rollup_seconds=Sum("seconds"),
+            rollup_shifts=Sum("shift_count"),
+        )
+    )
+    payload = repr(sorted(aggregates.items())).encode()
+    return hashlib.sha256(payload).hexdigest()[:32]
+
+
+def get_report_artifact_path(report: Report, fingerprint: str) -> pathlib.Path:
+    """
+    Returns a path to the cached pdf file for the report and shift data fingerprint.
+
+    Reports covering identical periods share the same artifact.
+
+    :param report: A report.
+    :type report: :py:obj:`~terminusgps_timekeeper.models.Report`
+    :param fingerprint: A shift data fingerprint.
+    :type fingerprint: :py:obj:`str`
+    :returns: A pdf filepath.
+    :rtype: :py:obj:`~pathlib.Path`
+
+    """
+    period = get_period_directory(report.start_date, report.end_date)
+    return get_report_directory() / period / f"{fingerprint}.pdf"
+
+
+def get_report_pdf(
+    report: Report, author: str | None = None, profile: ReportProfile | None = None
+) -> pathlib.Path:
+    """
+    Returns a path to a pdf file for the report, generating it only if no up-to-date artifact exists.
+
+    :param report: A report.
+    :type report: :py:obj:`~terminusgps_timekeeper.models.Report`
+    :param author: An optional pdf author.
+    :type author: :py:obj:`str` | :py:obj:`None`
+    :param profile: An optional profile to record the fingerprint and generation stages in.
+    :type profile: :py:obj:`~terminusgps_timekeeper.profiling.ReportProfile` | :py:obj:`None`
+    :returns: A pdf filepath.
+    :rtype: :py:obj:`~pathlib.Path`
+
+    """
+    if profile is None:
+        profile = ReportProfile()
+    with profile.stage("fingerprint"):
+        fingerprint = get_shift_fingerprint(report)
+    path = get_report_artifact_path(report, fingerprint)
+    if path.is_file():
+        return path
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    pdf_file = generate_report_pdf(report, author, profile)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    with os.fdopen(fd, "wb") as tmp_file:
+        tmp_file.write(pdf_file.getbuffer())
+    os.replace(tmp_path, path)
+
+    for stale in path.parent.glob("*.pdf"):
+        if stale != path:
+            stale.unlink(missing_ok=True)
+    return path
+
+
+def invalidate_report_artifacts(
+    start_date: datetime.date, end_date: datetime.date
+) -> int:
+    """
+    Deletes every cached report pdf file whose period overlaps the provided dates.
+
+    :param start_date: Start of the changed date range.
+    :type start_date: :py:obj:`~datetime.date`
+    :param end_date: End of the changed date range.
+    :type end_date: :py:obj:`~datetime.date`
+    :returns: Number of report periods invalidated.
+    :rtype: :py:obj:`int`
+
+    """
+    directory = get_report_directory()
+    if not directory.is_dir():
+        return 0
+
+    invalidated = 0
+    for period in directory.iterdir():
+        try:
+            lower, upper = (
+                datetime.date.fromisoformat(d) for d in period.name.split("_")
+            )
+        except ValueError:
+            continue
+        if lower <= end_date and upper >= start_date:
+            shutil.rmtree(period, ignore_errors=True)
+            invalidated += 1
+    return invalidated
@@ -0,0 +1,172 @@
+import datetime
+import io
+
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+from reportlab.graphics import shapes
+from reportlab.graphics.charts.barcharts import VerticalBarChart
+from reportlab.lib import colors
+
+from terminusgps_timekeeper.utils import build_shift_table
+
+# This module must not import models, it's imported by freshly spawned
+# worker processes that haven't set up Django.
+
+CHART_BACKENDS: tuple[str, ...] = ("reportlab", "matplotlib")
+"""Available chart backends. ``"reportlab"`` draws vector graphics, ``"matplotlib"`` embeds png images."""
+
+
+def get_hours_axis_max(weekday_hours: dict[str, float]) -> float:
+    """
+    Returns the top of the hours axis, at least 30 hours and above the tallest bar.
+
+    :param weekday_hours: Hours worked, keyed by weekday name.
+    :type weekday_hours: :py:obj:`dict`
+    :returns: Maximum value for the hours axis.
+    :rtype: :py:obj:`float`
+
+    """
+    return max(30.0, max(weekday_hours.values(), default=0.0) * 1.15)
+
+
+def render_weekday_chart(title: str, weekday_hours: dict[str, float]) -> io.BytesIO:
+    """
+    Renders a bar chart of hours worked by day of week as a png image.
+
+    Uses a standalone :py:obj:`~matplotlib.figure.Figure` instead of pyplot, so it's safe to call from multiple threads at once.
+
+    :param title: Title for the chart.
+    :type title: :py:obj:`str`
+    :param weekday_hours: Hours worked, keyed by weekday name.
+    :type weekday_hours: :py:obj:`dict`
+    :returns: A png image data stream.
+    :rtype: :py:obj:`~io.BytesIO`
+
+    """
+    days = list(weekday_hours.keys())
+    figure = Figure(figsize=(8, 4))
+    FigureCanvasAgg(figure)
+    axes = figure.add_subplot()
+    bars = axes.bar(days, [weekday_hours[day] for day in days], color="skyblue")
+    for bar in bars:
+        height = bar.get_height()
+        if height > 0:
+            axes.text(
+                bar.get_x() + bar.get_width() / 2.0,
+                height + 0.1,
+                f"{height:.1f}h",
+                ha="center",
+                va="bottom",
+            )
+    axes.set_title(title)
+    axes.set_xlabel("Day of Week")
+    axes.set_ylabel("Total Hours")
+    axes.tick_params(axis="x", labelrotation=45)
+    axes.set_ylim(top=get_hours_axis_max(weekday_hours))
+    figure.tight_layout()
+    img_buffer = io.BytesIO()
+    figure.savefig(img_buffer, format="png", bbox_inches="tight")
+    img_buffer.seek(0)
+    return img_buffer
+
+
+def draw_weekday_chart(
+    title: str, weekday_hours: dict[str, float], width: float, height: float
+) -> shapes.Drawing:
+    """
+    Draws a bar chart of hours worked by day of week as reportlab vector graphics.
+
+    :param title: Title for the chart.
+    :type title: :py:obj:`str`
+    :param weekday_hours: Hours worked, keyed by weekday name.
+    :type weekday_hours: :py:obj:`dict`
+    :param width: Width of the drawing in points.
+    :type width: :py:obj:`float`
+    :param height: Height of the drawing in points.
+    :type height: :py:obj:`float`
+    :returns: A drawing flowable.
+    :rtype: :py:obj:`~reportlab.graphics.shapes.Drawing`
+
+    """
+    drawing = shapes.Drawing(width, height)
+    drawing.hAlign = "CENTER"
+    drawing.add(
+        shapes.String(
+            width / 2,
+            height - 16,
+            title,
+            fontName="Helvetica-Bold",
+            fontSize=12,
+            textAnchor="middle",
+        )
+    )
+
+    chart = VerticalBarChart()
+    chart.x, chart.y = 50, 60
+    chart.width, chart.height = width - 70, height - 100
+    chart.data = [list(weekday_hours.values())]
+    chart.bars[0].fillColor = colors.skyblue
+    chart.bars[0].strokeColor = None
+    chart.valueAxis.valueMin = 0
+    chart.valueAxis.valueMax = get_hours_axis_max(weekday_hours)
+    chart.valueAxis.labels.fontName = "Helvetica"
+    chart.valueAxis.labels.fontSize = 8
+    chart.categoryAxis.categoryNames = list(weekday_hours.keys())
+    chart.categoryAxis.labels.angle = 45
+    chart.categoryAxis.labels.boxAnchor = "ne"
+    chart.categoryAxis.labels.fontName = "Helvetica"
+    chart.categoryAxis.labels.fontSize = 8
+    chart.barLabelFormat = lambda value: f"{value:.1f}h" if value > 0 else ""
+    chart.barLabels.nudge = 6
+    chart.barLabels.fontName = "Helvetica"
+    chart.barLabels.fontSize = 8
+    drawing.add(chart)
+
+    drawing.add(
+        shapes.Group(
+            shapes.String(
+                0,
+                0,
+                "Total Hours",
+                fontName="Helvetica",
+                fontSize=9,
+                textAnchor="middle",
+            ),
+            transform=(0, 1, -1, 0, 14, chart.y + chart.height / 2),
+        )
+    )
+    drawing.add(
+        shapes.String(
+            width / 2,
+            4,
+            "Day of Week",
+            fontName="Helvetica",
+            fontSize=9,
+            textAnchor="middle",
+        )
+    )
+    return drawing
+
+
+def render_employee_section(
+    name: str,
+    weekday_hours: dict[str, float],
+    intervals: list[tuple[datetime.datetime, datetime.datetime, datetime.timedelta]],
+) -> tuple[bytes, list[list[str]]]:
+    """
+    Renders an employee's weekday chart and shift table data.
+
+    Takes and returns plain picklable values, so it can run in a worker process.
+
+    :param name: The employee's display name.
+    :type name: :py:obj:`str`
+    :param weekday_hours: Hours worked, keyed by weekday name.
+    :type weekday_hours: :py:obj:`dict`
+    :param intervals: Local start, end and duration of each shift.
+    :type intervals: :py:obj:`list`
+    :returns: A png image and a list of table rows.
+    :rtype: :py:obj:`tuple`
+
+    """
+    chart = render_weekday_chart(f"Hours Worked by Day of Week: {name}", weekday_hours)
+    return chart.getvalue(), build_shift_table(intervals)
@@ -0,0 +1,191 @@
+import dataclasses
+import datetime
+
+from django.utils import timezone
+
+from terminusgps_timekeeper.intervals import aggregate_intervals, split_intervals
+from terminusgps_timekeeper.models import Employee, EmployeeShift, Report
+from terminusgps_timekeeper.utils import build_shift_table
+
+WEEKDAYS: tuple[str, ...] = (
+    "Monday",
+    "Tuesday",
+    "Wednesday",
+    "Thursday",
+    "Friday",
+    "Saturday",
+    "Sunday",
+)
+"""Weekday names, in :py:meth:`~datetime.date.weekday` order."""
+
+
+def get_clipped_interval(
+    shift: EmployeeShift,
+) -> tuple[datetime.datetime, datetime.datetime, datetime.timedelta]:
+    """
+    Returns the start, end and duration of a shift, clipped to the report period if the shift was loaded by :py:attr:`Report.shifts <terminusgps_timekeeper.models.Report.shifts>`.
+
+    :param shift: A shift.
+    :type shift: :py:obj:`~terminusgps_timekeeper.models.EmployeeShift`
+    :returns: Start, end and duration of the shift.
+    :rtype: :py:obj:`tuple`
+
+    """
+    if getattr(shift, "clipped_duration", None) is None:
+        return shift.start_datetime, shift.end_datetime, shift.duration
+    return shift.clipped_start, shift.clipped_end, shift.clipped_duration
+
+
+@dataclasses.dataclass
+class EmployeeReportData:
+    """Shifts and aggregates for a single employee in a report period."""
+
+    employee: Employee
+    """An employee."""
+    shifts: list[EmployeeShift] = dataclasses.field(default_factory=list)
+    """The employee's shifts in the report period."""
+    total_duration: datetime.timedelta = datetime.timedelta(0)
+    """Total time worked in the report period."""
+    weekday_hours: dict[str, float] = dataclasses.field(
+        default_factory=lambda: {day: 0.0 for day in WEEKDAYS}
+    )
+    """Hours worked by day of week."""
+
+    @property
+    def name(self) -> str:
+        """The employee's display name."""
+        return str(self.employee)
+
+    @property
+    def hours(self) -> float:
+        """Total hours worked in the report period."""
+        return self.total_duration.total_seconds() / 3600
+
+    def add_shift(self, shift: EmployeeShift, count_hours: bool = True) -> None:
+        """
+        Adds a shift to the employee's shift table and, optionally, to the employee's aggregates.
+
+        :param shift: A shift worked by the employee.
+        :type shift: :py:obj:`~terminusgps_timekeeper.models.EmployeeShift`
+        :param count_hours: Whether or not to add the shift duration to the aggregates. Default is :py:obj:`True`.
+        :type count_hours: :py:obj:`bool`
+        :returns: Nothing.
+        :rtype: :py:obj:`None`
+
+        """
+        self.add_shifts([shift], count_hours=count_hours)
+
+    def add_shifts(self, shifts: list[EmployeeShift], count_hours: bool = True) -> None:
+        """
+        Adds shifts to the employee's shift table and, optionally, to the employee's aggregates.
+
+        Shifts are split at local midnight in one pass, so overnight shifts count towards every weekday they were worked on.
+
+        :param shifts: Shifts worked by the employee.
+        :type shifts: :py:obj:`list`
+        :param count_hours: Whether or not to add the shift durations to the aggregates. Default is :py:obj:`True`.
+        :type count_hours: :py:obj:`bool`
+        :returns: Nothing.
+        :rtype: :py:obj:`None`
+
+        """
+        self.shifts.extend(shifts)
+        if not count_hours or not shifts:
+            return
+
+        starts, ends, durations = zip(*map(get_clipped_interval, shifts))
+        totals = aggregate_intervals(split_intervals(starts, ends, durations))
+        for date, seconds in zip(totals.index, totals["seconds"].tolist()):
+            self.add_hours(date, seconds)
+
+    def add_hours(self, date: datetime.date, seconds: float) -> None:
+        """
+        Adds time worked on a local date to the employee's aggregates.
+
+        :param date: Local date the time was worked on.
+        :type date: :py:obj:`~datetime.date`
+        :param seconds: Seconds worked.
+        :type seconds: :py:obj:`float`
+        :returns: Nothing.
+        :rtype: :py:obj:`None`
+
+        """
+        self.total_duration += datetime.timedelta(seconds=seconds)
+        self.weekday_hours[WEEKDAYS[date.weekday()]] += seconds / 3600
+
+    @property
+    def intervals(
+        self,
+    ) -> list[tuple[datetime.datetime, datetime.datetime, datetime.timedelta]]:
+        """Local start, end and duration of each shift, clipped to the report period."""
+        return [
+            (timezone.localtime(start), timezone.localtime(end), duration)
+            for start, end, duration in map(get_clipped_interval, self.shifts)
+        ]
+
+    def get_table_rows(self) -> list[list[str]]:
+        """
+        Returns the employee's shift table, including a header and a total row.
+
+        :returns: A list of table rows.
+        :rtype: :py:obj:`list`
+
+        """
+        return build_shift_table(self.intervals)
+
+
+class ReportDataset:
+    """
+    All shift data needed to render a report, loaded in two queries.
+
+    Per-employee totals and weekday hours are read from the :py:class:`~terminusgps_timekeeper.models.EmployeeDailyHours` rollup, and shifts are only loaded for table rows, so the number of queries does not grow with the number of employees.
+
+    """
+
+    def __init__(
+        self, report: Report, employees: list[EmployeeReportData] | None = None
+    ) -> None:
+        """
+        Loads every shift in the report period and groups them by employee.
+
+        :param report: A report.
+        :type report: :py:obj:`~terminusgps_timekeeper.models.Report`
+        :param employees: Optional pre-built employee data. If provided, nothing is loaded from the database.
+        :type employees: :py:obj:`list` | :py:obj:`None`
+        :returns: Nothing.
+        :rtype: :py:obj:`None`
+
+        """
+        self.report: Report = report
+        self.employees: list[EmployeeReportData] = (
+            employees if employees is not None else self._load(report)
+        )
+
+    def __bool__(self) -> bool:
+        """Whether or not any shifts were recorded in the report period."""
+        return bool(self.employees)
+
+    @property
+    def employee_hours(self) -> dict[str, float]:
+        """Total hours worked by each employee, keyed by employee name."""
+        return {data.name: data.hours for data in self.employees}
+
+    @staticmethod
+    def _load(report: Report) -> list[EmployeeReportData]:
+        """
+        Groups the report's daily hours and shifts by employee, ordered by username.
+
+        :param report: A report.
+        :type report: :py:obj:`~terminusgps_timekeeper.models.Report`
+        :returns: A list of per-employee report data.
+        :rtype: :py:obj:`list`
+
+        """
+        grouped: dict[int, EmployeeReportData] = {}
+        for daily in report.daily_hours.select_related("employee__user"):
+            if daily.employee_id not in grouped:
+                grouped[daily.employee_id] = EmployeeReportData(daily.employee)
+            grouped[daily.employee_id].add_hours(daily.date, daily.seconds)
+        for shift in report.shifts.filter(employee_id__in=grouped):
+            grouped[shift.employee_id].add_shift(shift, count_hours=False)
+        return sorted(grouped.values(), key=lambda data: data.employee.user.username)
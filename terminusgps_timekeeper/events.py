@@ -0,0 +1,216 @@
+import datetime
+import functools
+from collections.abc import Iterable
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from terminusgps_timekeeper.artifacts import invalidate_report_artifacts
+from terminusgps_timekeeper.models import (
+    EmployeeShift,
+    PunchEvent,
+    PunchEventCheckpoint,
+)
+from terminusgps_timekeeper.rollups import (
+    apply_shift_hours,
+    get_shift_interval,
+    rebuild_daily_hours,
+)
+
+SHIFT_DERIVER: str = "shifts"
+"""Checkpoint name used by the shift deriver."""
+
+
+def get_settle_delay() -> datetime.timedelta:
+    """Returns how long a punch event must exist before it's derived into a shift."""
+    return datetime.timedelta(
+        seconds=getattr(settings, "TIMEKEEPER_PUNCH_EVENT_SETTLE", 0)
+    )
+
+
+def pair_punch_events(
+    events: Iterable[PunchEvent], open_punches: dict[int, datetime.datetime]
+) -> list[EmployeeShift]:
+    """
+    Pairs punch in and punch out events into unsaved shifts.
+
+    A punch out without an open punch in is ignored. ``open_punches`` is updated in place, so it can be carried across batches.
+
+    :param events: Punch events, in order.
+    :type events: :py:obj:`~collections.abc.Iterable`
+    :param open_punches: Open punch in times, keyed by employee id.
+    :type open_punches: :py:obj:`dict`
+    :returns: A list of unsaved shifts.
+    :rtype: :py:obj:`list`
+
+    """
+    shifts = []
+    for event in events:
+        if event.direction == PunchEvent.Direction.IN:
+            open_punches[event.employee_id] = event.timestamp
+            continue
+        start = open_punches.pop(event.employee_id, None)
+        if start is None:
+            continue
+        end = max(event.timestamp, start)
+        shifts.append(
+            EmployeeShift(
+                employee_id=event.employee_id,
+                start_datetime=start,
+                end_datetime=end,
+                duration=end - start,
+                punch_out_event_id=event.pk,
+            )
+        )
+    return shifts
+
+
+def get_open_punches(
+    employee_ids: Iterable[int], last_event_id: int
+) -> dict[int, datetime.datetime]:
+    """
+    Returns the open punch in time for each employee, as of a punch event.
+
+    :param employee_ids: Employee ids.
+    :type employee_ids: :py:obj:`~collections.abc.Iterable`
+    :param last_event_id: Only consider events up to and including this id.
+    :type last_event_id: :py:obj:`int`
+    :returns: Punch in times, keyed by employee id, for employees whose latest event was a punch in.
+    :rtype: :py:obj:`dict`
+
+    """
+    latest = (
+        PunchEvent.objects.filter(employee_id__in=employee_ids, pk__lte=last_event_id)
+        .values("employee_id")
+        .annotate(latest=Max("pk"))
+        .values("latest")
+    )
+    return dict(
+        PunchEvent.objects.filter(
+            pk__in=latest, direction=PunchEvent.Direction.IN
+        ).values_list("employee_id", "timestamp")
+    )
+
+
+def derive_shifts(batch_size: int = 1000) -> int:
+    """
+    Derives shifts from punch events recorded since the shift deriver's checkpoint.
+
+    Each batch claims its range of events by moving the checkpoint with a conditional ``UPDATE``, in the same transaction that creates the shifts. Concurrent derivers never derive the same events twice.
+
+    Cached report pdf files overlapping each batch are invalidated once the caller's transaction commits, or right away outside a transaction. Invalidating earlier would let a concurrent request regenerate a pdf file from the uncommitted data and cache it.
+
+    :param batch_size: Number of events to derive per transaction. Default is ``1000``.
+    :type batch_size: :py:obj:`int`
+    :returns: Number of shifts created.
+    :rtype: :py:obj:`int`
+
+    """
+    created = 0
+    while (derived := _derive_batch(batch_size)) is not None:
+        shifts, event_count = derived
+        created += len(shifts)
+        if shifts:
+            transaction.on_commit(
+                functools.partial(
+                    invalidate_report_artifacts,
+                    timezone.localdate(min(s.start_datetime for s in shifts)),
+                    timezone.localdate(max(s.end_datetime for s in shifts)),
+                )
+            )
+        if event_count < batch_size:
+            break
+    return created
+
+
+def _derive_batch(batch_size: int) -> tuple[list[EmployeeShift], int] | None:
+    """Derives one batch of events and returns its shifts and event count, or :py:obj:`None` if there was nothing to claim."""
+    cutoff = timezone.now() - get_settle_delay()
+    with transaction.atomic():
+        checkpoint, _ = PunchEventCheckpoint.objects.get_or_create(name=SHIFT_DERIVER)
+        last_event_id = checkpoint.last_event_id
+        events = []
+        for event in PunchEvent.objects.filter(pk__gt=last_event_id).order_by("pk")[
+            :batch_size
+        ]:
+            # Stop at the first unsettled event, so the checkpoint never skips past it
+            if event.recorded_at > cutoff:
+                break
+            events.append(event)
+        if not events:
+            return None
+
+        claimed = PunchEventCheckpoint.objects.filter(
+            pk=checkpoint.pk, last_event_id=last_event_id
+        ).update(last_event_id=events[-1].pk, updated_at=timezone.now())
+        if not claimed:
+            return None
+
+        open_punches = get_open_punches(
+            {event.employee_id for event in events}, last_event_id
+        )
+        shifts = EmployeeShift.objects.bulk_create(
+            pair_punch_events(events, open_punches)
+        )
+        apply_shift_hours(get_shift_interval(shift) for shift in shifts)
+    return shifts, len(events)
+
+
+def replay_shifts(chunk_size: int = 10_000) -> int:
+    """
+    Rebuilds every event-derived shift from the full punch event history.
+
+    Events are paired per employee in timestamp order, shifts are created in bulk, and the daily hours rollup is rebuilt. Shifts that weren't derived from punch events are kept.
+
+    Derived shifts are deleted with a raw ``DELETE`` and recreated with :py:meth:`~django.db.models.query.QuerySet.bulk_create`, so no shift signals are sent. Instead, the rollup is rebuilt with :py:func:`~terminusgps_timekeeper.rollups.rebuild_daily_hours` in the same transaction, and every cached report pdf file is invalidated with :py:func:`~terminusgps_timekeeper.artifacts.invalidate_report_artifacts` once the replay commits.
+
+    :param chunk_size: Number of events to read and shifts to create at a time. Default is ``10000``.
+    :type chunk_size: :py:obj:`int`
+    :returns: Number of shifts created.
+    :rtype: :py:obj:`int`
+
+    """
+    created = 0
+    with transaction.atomic():
+        last_event_id = PunchEvent.objects.aggregate(latest=Max("pk"))["latest"] or 0
+        derived = EmployeeShift.objects.filter(punch_out_event__isnull=False)
+        # Nothing references shifts, so skip per-row delete signals, which would update the rollup and invalidate artifacts row by row; both are redone in full below
+        derived._raw_delete(derived.db)
+
+        events = (
+            PunchEvent.objects.filter(pk__lte=last_event_id)
+            .order_by("employee_id", "timestamp", "pk")
+            .iterator(chunk_size=chunk_size)
+        )
+        open_punches: dict[int, datetime.datetime] = {}
+        batch: list[PunchEvent] = []
+        for event in events:
+            batch.append(event)
+            if len(batch) >= chunk_size:
+                created += len(_create_shifts(batch, open_punches, chunk_size))
+                batch = []
+        created += len(_create_shifts(batch, open_punches, chunk_size))
+
+        PunchEventCheckpoint.objects.update_or_create(
+            name=SHIFT_DERIVER, defaults={"last_event_id": last_event_id}
+        )
+        rebuild_daily_hours()
+        transaction.on_commit(
+            functools.partial(
+                invalidate_report_artifacts, datetime.date.min, datetime.date.max
+            )
+        )
+    return created
+
+
+def _create_shifts(
+    events: list[PunchEvent],
+    open_punches: dict[int, datetime.datetime],
+    batch_size: int,
+) -> list[EmployeeShift]:
+    """Pairs events into shifts and inserts them without sending signals."""
+    return EmployeeShift.objects.bulk_create(
+        pair_punch_events(events, open_punches), batch_size=batch_size
+    )
@@ -3,11 +3,13 @@ from uuid import uuid4
 from django import forms
 from django.core.validators import validate_email, validate_image_file_extension
 from django.forms import widgets
+from django.utils.translation import gettext_lazy as _
 
-from terminusgps_timekeeper.models import Report
+from terminusgps_timekeeper.models import Employee, Report
 from terminusgps_timekeeper.validators import (
     validate_spreadsheet_file,
     validate_email_unique,
+    validate_code_unique,
 )
 
 
@@ -72,6 +74,7 @@ class EmployeeBatchCreateForm(forms.Form):
             attrs={"class": "p-2 rounded bg-white border border-gray-600"}
         ),
     )
+    token = forms.UUIDField(required=False, widget=widgets.HiddenInput())
 
 
 class EmployeeCreateForm(forms.Form):
@@ -117,6 +120,7 @@ class EmployeeCreateForm(forms.Form):
     code = forms.CharField(
         label="Fingerprint Code",
         required=False,
+        validators=[validate_code_unique],
         widget=widgets.TextInput(
             attrs={
                 "class": "p-2 rounded bg-white border border-gray-600",
@@ -124,3 +128,19 @@ class EmployeeCreateForm(forms.Form):
             }
         ),
     )
+
+
+class EmployeeSetFingerprintForm(forms.ModelForm):
+    class Meta:
+        model = Employee
+        fields = ("code",)
+
+    def clean_code(self) -> str:
+        """Raises :py:exec:`~django.core.exceptions.ValidationError` if another employee already has the fingerprint code."""
+        code: str = self.cleaned_data["code"]
+        if Employee.objects.code_in_use(code, exclude=self.instance.pk):
+            raise forms.ValidationError(
+                _("Whoops! That fingerprint code belongs to another employee."),
+                code="invalid",
+            )
+        return code
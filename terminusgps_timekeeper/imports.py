@@ -0,0 +1,398 @@
+import dataclasses
+import itertools
+import uuid
+from collections.abc import Callable, Iterator
+
+import openpyxl
+import pandas as pd
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import IntegrityError, transaction
+from django.db.models.functions import Lower
+
+from terminusgps_timekeeper.models import Employee, EmployeePunchCard
+
+IMPORT_COLUMNS: tuple[str, ...] = ("Email", "Phone", "Title")
+"""Columns allowed in an employee import file."""
+
+
+def get_import_chunk_size() -> int:
+    """Returns the number of spreadsheet rows to import at a time."""
+    return getattr(settings, "TIMEKEEPER_IMPORT_CHUNK_SIZE", 1000)
+
+
+def iter_spreadsheet_chunks(input_file, chunk_size: int) -> Iterator[pd.DataFrame]:
+    """
+    Yields the rows of a ``.csv`` or ``.xlsx`` file in fixed-size :py:obj:`~pandas.DataFrame` chunks.
+
+    Only one chunk is held in memory at a time. Each chunk is indexed by data row, starting at ``0`` for the row after the header.
+
+    :param input_file: A ``.csv`` or ``.xlsx`` file.
+    :type input_file: :py:obj:`~django.core.files.File`
+    :param chunk_size: Maximum number of rows per chunk.
+    :type chunk_size: :py:obj:`int`
+    :raises ValueError: If the file type is invalid.
+    :yields: Chunks of spreadsheet rows, as strings.
+    :ytype: :py:obj:`~pandas.DataFrame`
+
+    """
+    ext = input_file.name.rsplit(".", 1)[-1].lower()
+    match ext:
+        case "csv":
+            yield from pd.read_csv(input_file, dtype=str, chunksize=chunk_size)
+        case "xlsx":
+            yield from _iter_xlsx_chunks(input_file, chunk_size)
+        case _:
+            raise ValueError(f"Invalid input file type: '{ext}'.")
+
+
+def _iter_xlsx_chunks(input_file, chunk_size: int) -> Iterator[pd.DataFrame]:
+    """Yields rows from the first worksheet of an ``.xlsx`` file, streamed in read-only mode."""
+    workbook = openpyxl.load_workbook(input_file, read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        columns = [str(cell).strip() if cell is not None else "" for cell in header]
+        while columns and not columns[-1]:
+            columns.pop()
+        width = len(columns)
+
+        start = 0
+        while batch := list(itertools.islice(rows, chunk_size)):
+            yield pd.DataFrame.from_records(
+                [row[:width] for row in batch],
+                columns=columns,
+                index=range(start, start + len(batch)),
+            )
+            start += len(batch)
+    finally:
+        workbook.close()
+
+
+@dataclasses.dataclass
+class ImportRowError:
+    """A row that could not be imported."""
+
+    row: int
+    """Spreadsheet row number, counting the header as row 1."""
+    email: str
+    """Email address in the row, if any."""
+    message: str
+    """Why the row was skipped."""
+
+
+@dataclasses.dataclass
+class ImportResult:
+    """Outcome of an employee import."""
+
+    created: int = 0
+    """Number of employees created."""
+    errors: list[ImportRowError] = dataclasses.field(default_factory=list)
+    """Rows that could not be imported."""
+
+    def __bool__(self) -> bool:
+        """Whether or not every row was imported."""
+        return not self.errors
+
+    def merge(self, other: "ImportResult") -> None:
+        """
+        Adds another import result to this one.
+
+        :param other: Another import result.
+        :type other: :py:obj:`~terminusgps_timekeeper.imports.ImportResult`
+        :returns: Nothing.
+        :rtype: :py:obj:`None`
+
+        """
+        self.created += other.created
+        self.errors.extend(other.errors)
+
+
+def get_import_progress_key(token: uuid.UUID) -> str:
+    """Returns the cache key for an upload's import progress."""
+    return f"timekeeper:import-progress:{token}"
+
+
+def set_import_progress(
+    token: uuid.UUID, result: ImportResult, processed: int, done: bool = False
+) -> None:
+    """
+    Stores import progress for an upload in the cache.
+
+    :param token: Upload token.
+    :type token: :py:obj:`~uuid.UUID`
+    :param result: The running import result.
+    :type result: :py:obj:`~terminusgps_timekeeper.imports.ImportResult`
+    :param processed: Number of rows processed so far.
+    :type processed: :py:obj:`int`
+    :param done: Whether or not the import has finished. Default is :py:obj:`False`.
+    :type done: :py:obj:`bool`
+    :returns: Nothing.
+    :rtype: :py:obj:`None`
+
+    """
+    cache.set(
+        get_import_progress_key(token),
+        {
+            "processed": processed,
+            "created": result.created,
+            "skipped": len(result.errors),
+            "done": done,
+        },
+        timeout=60 * 60,
+    )
+
+
+def get_import_progress(token: uuid.UUID) -> dict[str, int | bool] | None:
+    """
+    Returns import progress for an upload, or :py:obj:`None` if it hasn't started.
+
+    :param token: Upload token.
+    :type token: :py:obj:`~uuid.UUID`
+    :returns: Rows processed, created and skipped, and whether or not the import is done.
+    :rtype: :py:obj:`dict` | :py:obj:`None`
+
+    """
+    return cache.get(get_import_progress_key(token))
+
+
+@dataclasses.dataclass
+class EmployeeRow:
+    """A validated row from an employee import file."""
+
+    row: int
+    """Spreadsheet row number, counting the header as row 1."""
+    email: str
+    """Email address, used as the username."""
+    phone: str | None = None
+    """Optional phone number."""
+    title: str | None = None
+    """Optional employee title."""
+
+
+class EmployeeImporter:
+    """
+    Creates employees from spreadsheet rows in bulk.
+
+    Every row is validated before anything is written. Users are created with unusable passwords, so no password hashing happens during an import. Users, employees and punch cards are then created with batched :py:meth:`~django.db.models.query.QuerySet.bulk_create` calls inside one transaction.
+
+    Invalid rows are reported as :py:obj:`ImportRowError` and skipped without aborting the rest of the import.
+
+    """
+
+    def __init__(self, batch_size: int = 500) -> None:
+        """
+        Sets the import batch size.
+
+        :param batch_size: Maximum number of rows per ``INSERT`` statement. Default is ``500``.
+        :type batch_size: :py:obj:`int`
+        :returns: Nothing.
+        :rtype: :py:obj:`None`
+
+        """
+        self.batch_size = batch_size
+
+    @staticmethod
+    def validate_columns(columns) -> None:
+        """
+        Raises :py:exc:`ValueError` if any unknown columns, or no ``Email`` column, are present.
+
+        :param columns: Column names.
+        :type columns: :py:obj:`~collections.abc.Iterable`
+        :raises ValueError: If the columns are invalid.
+        :returns: Nothing.
+        :rtype: :py:obj:`None`
+
+        """
+        columns = list(columns)
+        bad_cols: list[str] = [col for col in columns if col not in IMPORT_COLUMNS]
+        if bad_cols:
+            raise ValueError(f"Invalid column names: '{bad_cols}'")
+        if "Email" not in columns:
+            raise ValueError("Missing required column: 'Email'")
+
+    def import_dataframe(self, df: pd.DataFrame) -> ImportResult:
+        """
+        Validates and imports every row in the :py:obj:`~pandas.DataFrame`.
+
+        Rows are numbered from the index, where index ``0`` is spreadsheet row 2.
+
+        :param df: Employee rows with columns from :py:data:`IMPORT_COLUMNS`.
+        :type df: :py:obj:`~pandas.DataFrame`
+        :raises ValueError: If the columns are invalid.
+        :returns: The import result.
+        :rtype: :py:obj:`~terminusgps_timekeeper.imports.ImportResult`
+
+        """
+        self.validate_columns(df.columns)
+        df = df.reindex(columns=IMPORT_COLUMNS)
+        records = (
+            (int(i) + 2, email, phone, title)
+            for i, email, phone, title in df.itertuples()
+        )
+        return self.import_records(records)
+
+    def import_file(
+        self,
+        input_file,
+        chunk_size: int | None = None,
+        progress: Callable[[ImportResult, int], None] | None = None,
+    ) -> ImportResult:
+        """
+        Streams a ``.csv`` or ``.xlsx`` file and imports it one chunk at a time.
+
+        Each chunk is validated and written in its own transaction, so memory use doesn't grow with the file size.
+
+        :param input_file: A ``.csv`` or ``.xlsx`` file.
+        :type input_file: :py:obj:`~django.core.files.File`
+        :param chunk_size: Rows per chunk. Default is :confval:`TIMEKEEPER_IMPORT_CHUNK_SIZE`.
+        :type chunk_size: :py:obj:`int` | :py:obj:`None`
+        :param progress: Optional callable, called with the running result and number of rows processed after each chunk.
+        :type progress: :py:obj:`~collections.abc.Callable` | :py:obj:`None`
+        :raises ValueError: If the file type or columns are invalid.
+        :returns: The import result.
+        :rtype: :py:obj:`~terminusgps_timekeeper.imports.ImportResult`
+
+        """
+        chunk_size = chunk_size or get_import_chunk_size()
+        result, processed = ImportResult(), 0
+        for chunk in iter_spreadsheet_chunks(input_file, chunk_size):
+            result.merge(self.import_dataframe(chunk))
+            processed += len(chunk)
+            if progress is not None:
+                progress(result, processed)
+        return result
+
+    def import_records(self, records) -> ImportResult:
+        """
+        Validates and imports ``(row, email, phone, title)`` records.
+
+        :param records: Row numbers and raw cell values.
+        :type records: :py:obj:`~collections.abc.Iterable`
+        :returns: The import result.
+        :rtype: :py:obj:`~terminusgps_timekeeper.imports.ImportResult`
+
+        """
+        rows, errors = self.clean_records(records)
+        result = ImportResult(errors=errors)
+        if rows:
+            result.merge(self.create_employees(rows))
+            result.errors.sort(key=lambda error: error.row)
+        return result
+
+    def clean_records(self, records) -> tuple[list[EmployeeRow], list[ImportRowError]]:
+        """
+        Validates records and drops duplicate or taken email addresses.
+
+        Existing usernames are checked with a single query.
+
+        :param records: Row numbers and raw cell values.
+        :type records: :py:obj:`~collections.abc.Iterable`
+        :returns: Valid rows and errors for invalid rows.
+        :rtype: :py:obj:`tuple`
+
+        """
+        rows: dict[str, EmployeeRow] = {}
+        errors: list[ImportRowError] = []
+        for row, email, phone, title in records:
+            email = self.clean_cell(email) or ""
+            try:
+                validate_email(email)
+            except ValidationError:
+                errors.append(ImportRowError(row, email, "Invalid email address."))
+                continue
+            if email.lower() in rows:
+                errors.append(ImportRowError(row, email, "Duplicate email address."))
+                continue
+            phone, title = self.clean_cell(phone), self.clean_cell(title)
+            if phone is not None and len(phone) > 12:
+                errors.append(ImportRowError(row, email, "Phone number is too long."))
+                continue
+            if title is not None and len(title) > 64:
+                errors.append(ImportRowError(row, email, "Title is too long."))
+                continue
+            rows[email.lower()] = EmployeeRow(row, email, phone, title)
+
+        taken = set(
+            get_user_model()
+            .objects.annotate(username_lower=Lower("username"))
+            .filter(username_lower__in=rows)
+            .values_list("username_lower", flat=True)
+        )
+        for key in taken:
+            row = rows.pop(key)
+            errors.append(ImportRowError(row.row, row.email, "Email is taken."))
+        return list(rows.values()), errors
+
+    def create_employees(self, rows: list[EmployeeRow]) -> ImportResult:
+        """
+        Creates users, employees and punch cards for valid rows.
+
+        If the batch conflicts with rows written concurrently, each row is retried on its own so only the conflicting rows are reported.
+
+        :param rows: Validated rows.
+        :type rows: :py:obj:`list`
+        :returns: The import result.
+        :rtype: :py:obj:`~terminusgps_timekeeper.imports.ImportResult`
+
+        """
+        try:
+            with transaction.atomic():
+                self._bulk_create(rows)
+            return ImportResult(created=len(rows))
+        except IntegrityError:
+            pass
+
+        result = ImportResult()
+        for row in rows:
+            try:
+                with transaction.atomic():
+                    self._bulk_create([row])
+                result.created += 1
+            except IntegrityError:
+                result.errors.append(
+                    ImportRowError(row.row, row.email, "Email is taken.")
+                )
+        return result
+
+    def _bulk_create(self, rows: list[EmployeeRow]) -> None:
+        """Inserts users, employees and punch cards for the rows."""
+        user_model = get_user_model()
+        users = []
+        for row in rows:
+            user = user_model(username=row.email)
+            user.set_unusable_password()
+            users.append(user)
+        user_model.objects.bulk_create(users, batch_size=self.batch_size)
+
+        user_ids = dict(
+            user_model.objects.filter(
+                username__in=[row.email for row in rows]
+            ).values_list("username", "pk")
+        )
+        employees = Employee.objects.bulk_create(
+            (
+                Employee(user_id=user_ids[row.email], phone=row.phone, title=row.title)
+                for row in rows
+            ),
+            batch_size=self.batch_size,
+        )
+        if any(employee.pk is None for employee in employees):
+            employees = Employee.objects.filter(user_id__in=user_ids.values())
+        EmployeePunchCard.objects.bulk_create(
+            (EmployeePunchCard(employee=employee) for employee in employees),
+            batch_size=self.batch_size,
+        )
+
+    @staticmethod
+    def clean_cell(value) -> str | None:
+        """Returns the cell as a stripped string, or :py:obj:`None` if it's empty."""
+        if value is None or (not isinstance(value, str) and pd.isna(value)):
+            return None
+        value = str(value).strip()
+        return value or None
@@ -0,0 +1,170 @@
+import datetime
+from collections.abc import Sequence
+
+import numpy as np
+import pandas as pd
+from django.utils import timezone
+
+PERIODS: tuple[str, ...] = ("day", "weekday", "week")
+"""Periods :py:func:`aggregate_intervals` can group hours by."""
+
+
+def split_interval(
+    start: datetime.datetime,
+    end: datetime.datetime,
+    duration: datetime.timedelta | None = None,
+    tz: datetime.tzinfo | None = None,
+) -> dict[datetime.date, float]:
+    """
+    Splits a single time interval at local midnight.
+
+    Gives the same results as :py:func:`split_intervals`, without the overhead of building arrays for one interval.
+
+    :param start: Aware start of the interval.
+    :type start: :py:obj:`~datetime.datetime`
+    :param end: Aware end of the interval.
+    :type end: :py:obj:`~datetime.datetime`
+    :param duration: Optional duration of the interval. Default is ``end - start``.
+    :type duration: :py:obj:`~datetime.timedelta` | :py:obj:`None`
+    :param tz: Timezone to split days in. Default is the current timezone.
+    :type tz: :py:obj:`~datetime.tzinfo` | :py:obj:`None`
+    :returns: Seconds worked, keyed by local date.
+    :rtype: :py:obj:`dict`
+
+    """
+    tz = tz or timezone.get_current_timezone()
+    start, end = start.astimezone(datetime.UTC), end.astimezone(datetime.UTC)
+    length = (end - start).total_seconds()
+    total = length if duration is None else duration.total_seconds()
+    day = start.astimezone(tz).date()
+    if length <= 0:
+        return {day: total}
+
+    last = (end - datetime.timedelta(microseconds=1)).astimezone(tz).date()
+    days = {}
+    while day <= last:
+        next_day = day + datetime.timedelta(days=1)
+        worked = min(end, _midnight(next_day, tz)) - max(start, _midnight(day, tz))
+        days[day] = worked.total_seconds() * total / length
+        day = next_day
+    return days
+
+
+def split_intervals(
+    starts: Sequence[datetime.datetime],
+    ends: Sequence[datetime.datetime],
+    durations: Sequence[datetime.timedelta | None] | None = None,
+    keys: Sequence[object] | None = None,
+    tz: datetime.tzinfo | None = None,
+) -> pd.DataFrame:
+    """
+    Splits time intervals at local midnight, in one vectorized pass.
+
+    Each interval gets a row for every local date it touches, holding the seconds worked on that date. Days are split at real midnights, so days on which daylight saving time starts or ends are 23 or 25 hours long. An interval ending exactly at midnight doesn't touch the next date.
+
+    If ``durations`` are provided, each day gets its share of the interval's duration, in proportion to the time worked on it. Intervals with a duration but no length attribute their whole duration to the date they started on.
+
+    :param starts: Aware start of each interval.
+    :type starts: :py:obj:`~collections.abc.Sequence`
+    :param ends: Aware end of each interval.
+    :type ends: :py:obj:`~collections.abc.Sequence`
+    :param durations: Optional duration of each interval. Default is ``ends - starts``.
+    :type durations: :py:obj:`~collections.abc.Sequence` | :py:obj:`None`
+    :param keys: Optional key for each interval, i.e. an employee id, copied to a ``key`` column.
+    :type keys: :py:obj:`~collections.abc.Sequence` | :py:obj:`None`
+    :param tz: Timezone to split days in. Default is the current timezone.
+    :type tz: :py:obj:`~datetime.tzinfo` | :py:obj:`None`
+    :returns: A frame with ``interval`` (position in the input), ``date`` and ``seconds`` columns, plus ``key`` if ``keys`` were provided.
+    :rtype: :py:obj:`~pandas.DataFrame`
+
+    """
+    tz = tz or timezone.get_current_timezone()
+    start = pd.DatetimeIndex(pd.to_datetime(starts, utc=True)).as_unit("ns")
+    end = pd.DatetimeIndex(pd.to_datetime(ends, utc=True)).as_unit("ns")
+    # Zero-length intervals still touch the date they started on
+    last = end.where(end > start, start + pd.Timedelta(1, "us")) - pd.Timedelta(1, "us")
+    first_day = start.tz_convert(tz).tz_localize(None).normalize()
+    last_day = last.tz_convert(tz).tz_localize(None).normalize()
+    days = np.asarray((last_day - first_day).days, dtype=np.int64) + 1
+
+    interval = np.repeat(np.arange(len(start)), days)
+    offsets = np.arange(days.sum()) - np.repeat(np.cumsum(days) - days, days)
+    day = pd.DatetimeIndex(
+        first_day.values[interval] + offsets * np.timedelta64(1, "D")
+    ).as_unit("ns")
+    day_start = _localize_midnights(day, tz)
+    day_end = _localize_midnights(day + pd.Timedelta(days=1), tz)
+
+    start_ns = start.asi8[interval]
+    end_ns = end.asi8[interval]
+    seconds = (
+        np.clip(np.minimum(end_ns, day_end) - np.maximum(start_ns, day_start), 0, None)
+        / 1e9
+    )
+    if durations is not None:
+        length = (end.asi8 - start.asi8) / 1e9
+        duration = (
+            pd.to_timedelta(pd.Series(durations, dtype=object))
+            .dt.total_seconds()
+            .to_numpy()
+        )
+        duration = np.where(np.isnan(duration), length, duration)
+        # Stretch each day's share of the length to the duration
+        with np.errstate(divide="ignore", invalid="ignore"):
+            scale = np.where(length > 0, duration / length, 0.0)
+        seconds = seconds * scale[interval]
+        first = offsets == 0
+        seconds[first] += np.where(length > 0, 0.0, duration)[interval[first]]
+
+    frame = pd.DataFrame({"interval": interval, "date": day, "seconds": seconds})
+    if keys is not None:
+        frame.insert(0, "key", np.asarray(keys, dtype=object)[interval])
+    return frame
+
+
+def aggregate_intervals(frame: pd.DataFrame, by: str = "day") -> pd.DataFrame:
+    """
+    Sums the seconds, and counts the intervals, of split intervals for each period.
+
+    :param frame: Intervals split by :py:func:`split_intervals`.
+    :type frame: :py:obj:`~pandas.DataFrame`
+    :param by: ``"day"`` to group by local date, ``"weekday"`` by :py:meth:`~datetime.date.weekday` or ``"week"`` by the Monday starting each week. Default is ``"day"``.
+    :type by: :py:obj:`str`
+    :raises ValueError: If ``by`` isn't one of :py:data:`PERIODS`.
+    :returns: A frame with ``seconds`` and ``count`` columns, indexed by ``key`` (if the intervals had keys) and ``by``.
+    :rtype: :py:obj:`~pandas.DataFrame`
+
+    """
+    dates = frame["date"].dt
+    match by:
+        case "day":
+            period = dates.date
+        case "weekday":
+            period = dates.weekday
+        case "week":
+            period = (frame["date"] - pd.to_timedelta(dates.weekday, unit="D")).dt.date
+        case _:
+            raise ValueError(
+                f"Can't group intervals by '{by}', expected one of {PERIODS}"
+            )
+
+    groups = [frame["key"]] if "key" in frame else []
+    groups.append(period.rename(by))
+    return frame.groupby(groups, sort=True).agg(
+        seconds=("seconds", "sum"), count=("interval", "nunique")
+    )
+
+
+def _midnight(date: datetime.date, tz: datetime.tzinfo) -> datetime.datetime:
+    """Returns local midnight as UTC, moving midnights skipped by daylight saving time forward."""
+    # fold=0 reads skipped times with the offset before the change, which lands after it
+    return datetime.datetime.combine(date, datetime.time.min, tzinfo=tz).astimezone(
+        datetime.UTC
+    )
+
+
+def _localize_midnights(days: pd.DatetimeIndex, tz: datetime.tzinfo) -> np.ndarray:
+    """Returns local midnights as UTC nanoseconds, moving midnights skipped by daylight saving time forward."""
+    return days.tz_localize(
+        tz, ambiguous=np.ones(len(days), dtype=bool), nonexistent="shift_forward"
+    ).asi8
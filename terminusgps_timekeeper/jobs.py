@@ -0,0 +1,136 @@
+import datetime
+import logging
+import os
+import socket
+import time
+import traceback
+import uuid
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils import timezone
+
+from terminusgps_timekeeper.artifacts import get_report_pdf
+from terminusgps_timekeeper.models import ReportJob
+from terminusgps_timekeeper.profiling import ReportProfile, get_trace_memory
+
+logger = logging.getLogger(__name__)
+
+
+def get_stale_timeout() -> datetime.timedelta:
+    """
+    Returns how long a job may run before another worker recovers it.
+
+    :returns: A timeout. Defaults to 10 minutes.
+    :rtype: :py:obj:`~datetime.timedelta`
+
+    """
+    seconds = getattr(settings, "TIMEKEEPER_JOB_STALE_TIMEOUT", 600)
+    return datetime.timedelta(seconds=seconds)
+
+
+def get_retry_delay(attempts: int) -> datetime.timedelta:
+    """
+    Returns an exponential backoff delay for a failed job.
+
+    :param attempts: Number of attempts made so far.
+    :type attempts: :py:obj:`int`
+    :returns: A delay before the job may run again.
+    :rtype: :py:obj:`~datetime.timedelta`
+
+    """
+    return datetime.timedelta(seconds=min(2**attempts * 5, 300))
+
+
+class ReportJobWorker:
+    """Claims queued report jobs from the database and generates their pdf files."""
+
+    def __init__(
+        self,
+        worker_id: str | None = None,
+        poll_interval: float = 1.0,
+        stale_timeout: datetime.timedelta | None = None,
+    ) -> None:
+        """
+        Sets a unique worker id, a poll interval and a stale job timeout.
+
+        :param worker_id: A unique worker id. Default is ``"<HOSTNAME>:<PID>:<RANDOM>"``.
+        :type worker_id: :py:obj:`str` | :py:obj:`None`
+        :param poll_interval: Seconds to wait when the queue is empty.
+        :type poll_interval: :py:obj:`float`
+        :param stale_timeout: How long a job may run before it's recovered. Default is :py:func:`get_stale_timeout`.
+        :type stale_timeout: :py:obj:`~datetime.timedelta` | :py:obj:`None`
+        :returns: Nothing.
+        :rtype: :py:obj:`None`
+
+        """
+        self.worker_id: str = worker_id or (
+            f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        )
+        self.poll_interval: float = poll_interval
+        self.stale_timeout: datetime.timedelta = stale_timeout or get_stale_timeout()
+        self.stopped: bool = False
+
+    def run(self, burst: bool = False) -> int:
+        """
+        Runs jobs until :py:attr:`stopped` is set.
+
+        :param burst: Whether or not to return once the queue is empty.
+        :type burst: :py:obj:`bool`
+        :returns: Number of jobs run.
+        :rtype: :py:obj:`int`
+
+        """
+        processed = 0
+        while not self.stopped:
+            close_old_connections()
+            ReportJob.objects.recover_stale(self.stale_timeout)
+            job = ReportJob.objects.claim(self.worker_id)
+            if job is None:
+                if burst:
+                    break
+                time.sleep(self.poll_interval)
+                continue
+
+            self.run_job(job)
+            processed += 1
+        return processed
+
+    def run_job(self, job: ReportJob) -> None:
+        """
+        Generates the job's report pdf file and records the outcome.
+
+        Each attempt's :py:class:`~terminusgps_timekeeper.profiling.ReportProfile` is saved to :py:attr:`~terminusgps_timekeeper.models.ReportJob.profile`. Failed jobs are retried with an exponential backoff until :py:attr:`~terminusgps_timekeeper.models.ReportJob.max_attempts` is reached.
+
+        :param job: A claimed report job.
+        :type job: :py:obj:`~terminusgps_timekeeper.models.ReportJob`
+        :returns: Nothing.
+        :rtype: :py:obj:`None`
+
+        """
+        logger.info("%s running %s", self.worker_id, job)
+        now = timezone.now()
+        profile = ReportProfile(trace_memory=get_trace_memory())
+        try:
+            get_report_pdf(job.report, job.author, profile)
+        except Exception:
+            logger.exception("%s failed to run %s", self.worker_id, job)
+            outcome = {"error": traceback.format_exc()}
+            if job.attempts >= job.max_attempts:
+                outcome.update(status=ReportJob.Status.FAILED, finished_at=now)
+            else:
+                outcome.update(
+                    status=ReportJob.Status.PENDING,
+                    run_after=now + get_retry_delay(job.attempts),
+                )
+        else:
+            outcome = {
+                "status": ReportJob.Status.SUCCEEDED,
+                "finished_at": timezone.now(),
+                "error": None,
+            }
+
+        # Only record the outcome if the job wasn't recovered by another worker
+        ReportJob.objects.filter(pk=job.pk, locked_by=self.worker_id).update(
+            locked_by=None, locked_at=None, profile=profile.as_dict(), **outcome
+        )
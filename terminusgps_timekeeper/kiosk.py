@@ -0,0 +1,100 @@
+import threading
+
+from django.core.cache import cache
+
+from terminusgps_timekeeper.models import Employee, EmployeePunchCard, PunchEvent
+from terminusgps_timekeeper.punches import punch_in, punch_out
+from terminusgps_timekeeper.utils import hash_fingerprint_code
+
+CODE_CACHE_VERSION_KEY: str = "timekeeper:employee-codes:version"
+"""Cache key holding the version of the fingerprint code to employee id mapping."""
+
+_code_cache: dict[str, int] = {}
+_code_cache_version: int | None = None
+_code_cache_lock = threading.Lock()
+
+
+def get_code_cache_version() -> int:
+    """Returns the current version of the fingerprint code to employee id mapping."""
+    return cache.get_or_set(CODE_CACHE_VERSION_KEY, 1, timeout=None)
+
+
+def invalidate_code_cache() -> None:
+    """
+    Invalidates every process's fingerprint code to employee id mapping.
+
+    Each process drops its mapping the next time it resolves a code. Processes only share invalidations through a shared cache backend.
+
+    :returns: Nothing.
+    :rtype: :py:obj:`None`
+
+    """
+    try:
+        cache.incr(CODE_CACHE_VERSION_KEY)
+    except ValueError:
+        cache.set(CODE_CACHE_VERSION_KEY, 2, timeout=None)
+
+
+def get_employee_id_by_code(code: str) -> int | None:
+    """
+    Returns the id of the employee with the fingerprint code.
+
+    Ids are kept in a per-process mapping of code digests, so repeat scans don't touch the database. The mapping is dropped whenever :py:func:`invalidate_code_cache` bumps the cached version.
+
+    :param code: A scanned fingerprint code.
+    :type code: :py:obj:`str`
+    :returns: An employee id, or :py:obj:`None` if no employee has the code.
+    :rtype: :py:obj:`int` | :py:obj:`None`
+
+    """
+    global _code_cache_version
+
+    digest = hash_fingerprint_code(code)
+    if digest is None:
+        return None
+
+    version = get_code_cache_version()
+    with _code_cache_lock:
+        if version != _code_cache_version:
+            _code_cache.clear()
+            _code_cache_version = version
+        employee_id = _code_cache.get(digest)
+    if employee_id is not None:
+        return employee_id
+
+    employee_id = (
+        Employee.objects.filter(code_digest=digest).values_list("pk", flat=True).first()
+    )
+    if employee_id is not None:
+        with _code_cache_lock:
+            # Another thread may have moved to a newer version since this one read it
+            if version == _code_cache_version:
+                _code_cache[digest] = employee_id
+    return employee_id
+
+
+def toggle_punch(employee_id: int) -> bool:
+    """
+    Punches an employee in if they're punched out, or out if they're punched in.
+
+    :param employee_id: An employee id.
+    :type employee_id: :py:obj:`int`
+    :returns: Whether or not the employee is now punched in.
+    :rtype: :py:obj:`bool`
+
+    """
+    source = PunchEvent.Source.KIOSK
+    cards = EmployeePunchCard.objects.filter(employee_id=employee_id)
+    # Try the likely punch first, so most scans only open one write transaction
+    if cards.filter(punched_in=True).exists():
+        if punch_out(employee_id, source=source):
+            return False
+        if punch_in(employee_id, source=source):
+            return True
+    else:
+        if punch_in(employee_id, source=source):
+            return True
+        if punch_out(employee_id, source=source):
+            return False
+    # Other punches won both races, report the card as it is now
+    return cards.filter(punched_in=True).exists()
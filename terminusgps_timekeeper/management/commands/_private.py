@@ -0,0 +1,24 @@
+import django
+
+
+def run_worker_process(poll_interval: float, burst: bool) -> None:
+    """
+    Entrypoint for worker processes spawned by the ``runworker`` command.
+
+    Sets up Django before importing any models, since spawned processes start from a fresh interpreter.
+
+    :param poll_interval: Seconds to wait when the queue is empty.
+    :type poll_interval: :py:obj:`float`
+    :param burst: Whether or not to exit once the queue is empty.
+    :type burst: :py:obj:`bool`
+    :returns: Nothing.
+    :rtype: :py:obj:`None`
+
+    """
+    django.setup()
+    from terminusgps_timekeeper.jobs import ReportJobWorker
+
+    try:
+        ReportJobWorker(poll_interval=poll_interval).run(burst=burst)
+    except KeyboardInterrupt:
+        pass
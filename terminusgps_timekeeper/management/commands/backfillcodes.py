@@ -0,0 +1,109 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from terminusgps_timekeeper.kiosk import invalidate_code_cache
+from terminusgps_timekeeper.models import Employee
+from terminusgps_timekeeper.utils import hash_fingerprint_code
+
+
+class Command(BaseCommand):
+    help = "Backfills fingerprint code digests for existing employees"
+
+    def add_arguments(self, parser):
+        """Adds argument ``--chunk-size``."""
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=500,
+            help="Number of employees to process per chunk",
+        )
+
+    def handle(self, *args, **options):
+        """
+        Recomputes :py:attr:`~terminusgps_timekeeper.models.Employee.code_digest` for every employee, one chunk at a time.
+
+        Run this after adding the digest column or rotating ``SECRET_KEY``.
+
+        Digests are unique, so each chunk is checked for employees sharing a fingerprint code before it's written. Chunks written before a clash is found are kept.
+
+        :param chunk_size: Number of employees to process per chunk.
+        :type chunk_size: :py:obj:`int`
+        :raises CommandError: If ``chunk_size`` was less than 1.
+        :raises CommandError: If two employees have the same fingerprint code.
+        :returns: Nothing.
+        :rtype: :py:obj:`None`
+
+        """
+        chunk_size: int = options["chunk_size"]
+        if chunk_size < 1:
+            raise CommandError(
+                "Chunk size must be at least 1, got '%(size)s'." % {"size": chunk_size}
+            )
+
+        last_pk, total, updated = 0, 0, 0
+        try:
+            while True:
+                chunk = list(
+                    Employee.objects.filter(pk__gt=last_pk)
+                    .only("pk", "code", "code_digest")
+                    .order_by("pk")[:chunk_size]
+                )
+                if not chunk:
+                    break
+
+                changed, owners = [], {}
+                for employee in chunk:
+                    digest = hash_fingerprint_code(employee.code)
+                    if digest is not None and digest in owners:
+                        self.raise_duplicate_code(owners[digest], employee.pk)
+                    owners[digest] = employee.pk
+                    if employee.code_digest != digest:
+                        employee.code_digest = digest
+                        changed.append(employee)
+
+                with transaction.atomic():
+                    # Employees outside the chunk hold either a backfilled digest or one keyed with an old secret, so a match is a real duplicate
+                    clash = (
+                        Employee.objects.filter(
+                            code_digest__in=[e.code_digest for e in changed]
+                        )
+                        .exclude(pk__in=[e.pk for e in chunk])
+                        .values_list("code_digest", "pk")
+                        .first()
+                    )
+                    if clash is not None:
+                        self.raise_duplicate_code(owners[clash[0]], clash[1])
+                    Employee.objects.bulk_update(changed, ["code_digest"])
+                last_pk = chunk[-1].pk
+                total += len(chunk)
+                updated += len(changed)
+        finally:
+            if updated:
+                invalidate_code_cache()
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                "Processed %(total)s employees, updated %(updated)s code digests."
+                % {"total": total, "updated": updated}
+            )
+        )
+
+    @staticmethod
+    def raise_duplicate_code(first: int, second: int) -> None:
+        """
+        Raises :py:exc:`~django.core.management.base.CommandError` for two employees sharing a fingerprint code.
+
+        :param first: An employee id.
+        :type first: :py:obj:`int`
+        :param second: Another employee id with the same fingerprint code.
+        :type second: :py:obj:`int`
+        :raises CommandError: Always.
+        :returns: Nothing.
+        :rtype: :py:obj:`None`
+
+        """
+        first, second = sorted((first, second))
+        raise CommandError(
+            "Employees #%(first)s and #%(second)s have the same fingerprint code. Give one of them a new code and run the command again."
+            % {"first": first, "second": second}
+        )
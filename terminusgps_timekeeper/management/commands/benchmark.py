@@ -0,0 +1,765 @@
+import argparse
+import asyncio
+import concurrent.futures
+import datetime
+import importlib
+import io
+import json
+import pathlib
+import random
+import statistics
+import tempfile
+import time
+import tracemalloc
+import types
+import uuid
+from collections.abc import Callable
+
+from django.contrib.auth import get_user_model
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import AsyncClient, Client, override_settings
+from django.urls import path, reverse
+from django.utils import timezone
+
+from terminusgps_timekeeper.charts import CHART_BACKENDS
+from terminusgps_timekeeper.datasets import EmployeeReportData, ReportDataset
+from terminusgps_timekeeper.models import (
+    Employee,
+    EmployeePunchCard,
+    EmployeeShift,
+    PunchEvent,
+    Report,
+)
+from terminusgps_timekeeper.pdf_generators import (
+    PDFReportGenerator,
+    generate_report_pdf,
+)
+from terminusgps_timekeeper.punches import ingest_punch_events, set_punch_status
+from terminusgps_timekeeper.views import AsyncEmployeeDetailView, EmployeeDetailView
+
+
+class Command(BaseCommand):
+    help = "Benchmarks timekeeper hot paths"
+
+    def add_arguments(self, parser: argparse.ArgumentParser) -> None:
+        """
+        Adds subcommand arguments to the ``benchmark`` command.
+
+        +--------------+--------------------------------------------------------------------+
+        | Subcommand   | Action                                                             |
+        +==============+====================================================================+
+        | ``sections`` | Compares serial and parallel employee section rendering in reports.|
+        +--------------+--------------------------------------------------------------------+
+        | ``charts``   | Compares report generation time and pdf size per chart backend.    |
+        +--------------+--------------------------------------------------------------------+
+        | ``ingest``   | Times punch event batch ingestion.                                 |
+        +--------------+--------------------------------------------------------------------+
+        | ``kiosk``    | Measures kiosk punch request latency percentiles.                  |
+        +--------------+--------------------------------------------------------------------+
+        | ``views``    | Compares sync WSGI and async ASGI punch view throughput.           |
+        +--------------+--------------------------------------------------------------------+
+        | ``suite``    | Times punch, list, report and import hot paths and writes JSON.    |
+        +--------------+--------------------------------------------------------------------+
+
+        :param parser: An argument parser.
+        :type parser: :py:obj:`argparse.ArgumentParser`
+        :returns: Nothing.
+        :rtype: :py:obj:`None`
+
+        """
+        subparsers = parser.add_subparsers(dest="subcommand")
+        sections = subparsers.add_parser(
+            "sections", help="Benchmark parallel report section rendering"
+        )
+        sections.add_argument(
+            "--employees",
+            type=int,
+            nargs="+",
+            default=[5, 25, 100],
+            help="Employee counts to benchmark",
+        )
+        sections.add_argument(
+            "--workers", type=int, default=4, help="Worker processes for parallel runs"
+        )
+        sections.add_argument(
+            "--shifts", type=int, default=20, help="Shifts per employee"
+        )
+
+        charts = subparsers.add_parser("charts", help="Benchmark report chart backends")
+        charts.add_argument(
+            "--employees",
+            type=int,
+            nargs="+",
+            default=[5, 25, 100],
+            help="Employee counts to benchmark",
+        )
+        charts.add_argument(
+            "--shifts", type=int, default=20, help="Shifts per employee"
+        )
+
+        ingest = subparsers.add_parser(
+            "ingest", help="Benchmark punch event batch ingestion"
+        )
+        ingest.add_argument(
+            "--events",
+            type=int,
+            nargs="+",
+            default=[1000, 10_000],
+            help="Batch sizes to benchmark",
+        )
+        ingest.add_argument(
+            "--employees", type=int, default=100, help="Employees punching"
+        )
+
+        kiosk = subparsers.add_parser("kiosk", help="Benchmark kiosk punch latency")
+        kiosk.add_argument(
+            "--requests", type=int, default=1000, help="Kiosk punches to send"
+        )
+        kiosk.add_argument(
+            "--employees", type=int, default=50, help="Employees punching"
+        )
+
+        views = subparsers.add_parser(
+            "views", help="Benchmark sync and async punch view throughput"
+        )
+        views.add_argument(
+            "--requests", type=int, default=1000, help="Punches to send per run"
+        )
+        views.add_argument(
+            "--concurrency",
+            type=int,
+            nargs="+",
+            default=[1, 8, 32],
+            help="Concurrent requests to benchmark",
+        )
+        views.add_argument(
+            "--employees", type=int, default=50, help="Employees punching"
+        )
+
+        suite = subparsers.add_parser(
+            "suite", help="Benchmark punch, list, report and import hot paths"
+        )
+        suite.add_argument(
+            "--employees",
+            type=int,
+            nargs="+",
+            default=[10, 100],
+            help="Dataset sizes to benchmark, in employees",
+        )
+        suite.add_argument(
+            "--years", type=float, default=1.0, help="Years of shift history"
+        )
+        suite.add_argument(
+            "--repeat", type=int, default=3, help="Timed runs per benchmark"
+        )
+        suite.add_argument(
+            "--output",
+            type=pathlib.Path,
+            default=pathlib.Path("benchmark.json"),
+            help="File to write JSON results to",
+        )
+
+    def handle(self, *args, **options):
+        """
+        Runs the benchmark for the provided subcommand.
+
+        :raises CommandError: If the subcommand is invalid.
+        :returns: Nothing.
+        :rtype: :py:obj:`None`
+
+        """
+        match options["subcommand"]:
+            case "sections":
+                self.benchmark_sections(
+                    options["employees"], options["workers"], options["shifts"]
+                )
+            case "charts":
+                self.benchmark_charts(options["employees"], options["shifts"])
+            case "ingest":
+                self.benchmark_ingest(options["events"], options["employees"])
+            case "kiosk":
+                self.benchmark_kiosk(options["requests"], options["employees"])
+            case "views":
+                self.benchmark_views(
+                    options["requests"], options["concurrency"], options["employees"]
+                )
+            case "suite":
+                self.benchmark_suite(
+                    options["employees"],
+                    options["years"],
+                    options["repeat"],
+                    options["output"],
+                )
+            case _:
+                raise CommandError(
+                    "Invalid subcommand '%(cmd)s'" % {"cmd": options["subcommand"]}
+                )
+
+    def benchmark_sections(
+        self, employee_counts: list[int], workers: int, shifts: int
+    ) -> None:
+        """
+        Times report generation with serial and parallel section rendering for each employee count.
+
+        :param employee_counts: Employee counts to benchmark.
+        :type employee_counts: :py:obj:`list`
+        :param workers: Worker processes for parallel runs.
+        :type workers: :py:obj:`int`
+        :param shifts: Shifts per employee.
+        :type shifts: :py:obj:`int`
+        :returns: Nothing.
+        :rtype: :py:obj:`None`
+
+        """
+        self.stdout.write(
+            f"{'employees':>10} {'serial (s)':>12} {'parallel (s)':>14} {'speedup':>8}"
+        )
+        for count in employee_counts:
+            report, employees = self.build_dataset(count, shifts)
+            timings = []
+            for worker_count in (1, workers):
+                dataset = ReportDataset(report, employees=employees)
+                generator = PDFReportGenerator(
+                    report,
+                    workers=worker_count,
+                    dataset=dataset,
+                    chart_backend="matplotlib",
+                )
+                start = time.perf_counter()
+                generator.generate()
+                timings.append(time.perf_counter() - start)
+            serial, parallel = timings
+            self.stdout.write(
+                f"{count:>10} {serial:>12.2f} {parallel:>14.2f} {serial / parallel:>7.2f}x"
+            )
+
+    def benchmark_charts(self, employee_counts: list[int], shifts: int) -> None:
+        """
+        Times report generation and measures pdf size with each chart backend for each employee count.
+
+        :param employee_counts: Employee counts to benchmark.
+        :type employee_counts: :py:obj:`list`
+        :param shifts: Shifts per employee.
+        :type shifts: :py:obj:`int`
+        :returns: Nothing.
+        :rtype: :py:obj:`None`
+
+        """
+        self.stdout.write(
+            f"{'employees':>10} {'backend':>11} {'time (s)':>9} {'size (KiB)':>11}"
+        )
+        for count in employee_counts:
+            report, employees = self.build_dataset(count, shifts)
+            for backend in CHART_BACKENDS:
+                dataset = ReportDataset(report, employees=employees)
+                generator = PDFReportGenerator(
+                    report, workers=1, dataset=dataset, chart_backend=backend
+                )
+                start = time.perf_counter()
+                size = len(generator.generate().getvalue())
+                elapsed = time.perf_counter() - start
+                self.stdout.write(
+                    f"{count:>10} {backend:>11} {elapsed:>9.2f} {size / 1024:>11.1f}"
+                )
+
+    def benchmark_ingest(self, event_counts: list[int], employees: int) -> None:
+        """
+        Times punch event batch ingestion for each batch size.
+
+        Every run's database writes are rolled back. Deriving shifts invalidates cached report pdf files, so runs point :confval:`TIMEKEEPER_REPORT_DIR` at a temporary directory, and the real cache is left alone.
+
+        :param event_counts: Batch sizes to benchmark.
+        :type event_counts: :py:obj:`list`
+        :param employees: Employees punching.
+        :type employees: :py:obj:`int`
+        :returns: Nothing.
+        :rtype: :py:obj:`None`
+
+        """
+        self.stdout.write(
+            f"{'events':>8} {'applied':>8} {'time (s)':>9} {'events/s':>10} {'replay (ms)':>12}"
+        )
+        for count in event_counts:
+            with (
+                tempfile.TemporaryDirectory() as report_dir,
+                override_settings(TIMEKEEPER_REPORT_DIR=pathlib.Path(report_dir)),
+                transaction.atomic(),
+            ):
+                employee_ids = self.create_employees(employees)
+                events = self.build_punch_events(employee_ids, count)
+                token = uuid.uuid4()
+
+                start = time.perf_counter()
+                batch, _ = ingest_punch_events(token, events)
+                elapsed = time.perf_counter() - start
+                start = time.perf_counter()
+                ingest_punch_events(token, events)
+                replay = time.perf_counter() - start
+                transaction.set_rollback(True)
+            self.stdout.write(
+                f"{count:>8} {batch.applied:>8} {elapsed:>9.2f} {count / elapsed:>10.0f} {replay * 1000:>12.1f}"
+            )
+
+    def benchmark_kiosk(self, requests: int, employees: int) -> None:
+        """
+        Sends kiosk punches through the full middleware stack and reports latency percentiles.
+
+        The benchmark employees, their shifts and their punch events are deleted afterwards.
+
+        :param requests: Kiosk punches to send.
+        :type requests: :py:obj:`int`
+        :param employees: Employees punching.
+        :type employees: :py:obj:`int`
+        :returns: Nothing.
+        :rtype: :py:obj:`None`
+
+        """
+        prefix = uuid.uuid4().hex[:8]
+        codes = [f"{prefix}-{i}" for i in range(employees)]
+        created = [
+            Employee.objects.create(
+                user=get_user_model().objects.create_user(
+                    username=f"kiosk{prefix}{i:05d}@terminusgps.com"
+                ),
+                code=code,
+            )
+            for i, code in enumerate(codes)
+        ]
+        try:
+            with override_settings(
+                ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"]
+            ):
+                client = Client()
+                client.force_login(created[0].user)
+                url = reverse("kiosk punch")
+                timings = []
+                for i in range(requests):
+                    start = time.perf_counter()
+                    client.post(url, {"code": codes[i % employees]})
+                    timings.append(time.perf_counter() - start)
+        finally:
+            get_user_model().objects.filter(
+                pk__in=[employee.user_id for employee in created]
+            ).delete()
+
+        quantiles = statistics.quantiles(timings, n=100)
+        self.stdout.write(
+            f"{'requests':>9} {'p50 (ms)':>9} {'p95 (ms)':>9} {'p99 (ms)':>9} {'max (ms)':>9}"
+        )
+        self.stdout.write(
+            f"{requests:>9} {quantiles[49] * 1000:>9.2f} {quantiles[94] * 1000:>9.2f} "
+            f"{quantiles[98] * 1000:>9.2f} {max(timings) * 1000:>9.2f}"
+        )
+
+    def benchmark_views(
+        self, requests: int, concurrency_levels: list[int], employees: int
+    ) -> None:
+        """
+        Compares punch throughput through the sync detail view on the WSGI handler and the async detail view on the ASGI handler.
+
+        Sync requests are sent from a thread pool, async requests from concurrent tasks on one event loop. The benchmark employees are deleted afterwards.
+
+        :param requests: Punches to send per run.
+        :type requests: :py:obj:`int`
+        :param concurrency_levels: Concurrent requests to benchmark.
+        :type concurrency_levels: :py:obj:`list`
+        :param employees: Employees punching.
+        :type employees: :py:obj:`int`
+        :returns: Nothing.
+        :rtype: :py:obj:`None`
+
+        """
+        # Mount both views side by side, whichever one the project routes to
+        urlconf = types.ModuleType("benchmark_urls")
+        urlconf.urlpatterns = [
+            *importlib.import_module(settings.ROOT_URLCONF).urlpatterns,
+            path("sync/<int:pk>/", EmployeeDetailView.as_view()),
+            path("async/<int:pk>/", AsyncEmployeeDetailView.as_view()),
+        ]
+        employee_ids = self.create_employees(employees)
+        headers = {"HX-Request": "true"}
+
+        def punch_sync(i: int) -> float:
+            status = "false" if (i // employees) % 2 else "true"
+            start = time.perf_counter()
+            Client().patch(
+                f"/sync/{employee_ids[i % employees]}/?status={status}", headers=headers
+            )
+            return time.perf_counter() - start
+
+        async def punch_async(
+            client: AsyncClient, semaphore: asyncio.Semaphore, i: int
+        ) -> float:
+            status = "false" if (i // employees) % 2 else "true"
+            async with semaphore:
+                start = time.perf_counter()
+                await client.patch(
+                    f"/async/{employee_ids[i % employees]}/?status={status}",
+                    headers=headers,
+                )
+                return time.perf_counter() - start
+
+        async def run_async(concurrency: int) -> list[float]:
+            client = AsyncClient()
+            semaphore = asyncio.Semaphore(concurrency)
+            return await asyncio.gather(
+                *(punch_async(client, semaphore, i) for i in range(requests))
+            )
+
+        self.stdout.write(
+            f"{'handler':>8} {'concurrency':>12} {'req/s':>8} {'p50 (ms)':>9} {'p99 (ms)':>9}"
+        )
+        try:
+            with override_settings(
+                ROOT_URLCONF=urlconf,
+                ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"],
+            ):
+                for concurrency in concurrency_levels:
+                    start = time.perf_counter()
+                    with concurrent.futures.ThreadPoolExecutor(concurrency) as pool:
+                        timings = list(pool.map(punch_sync, range(requests)))
+                    self.write_throughput(
+                        "wsgi", concurrency, timings, time.perf_counter() - start
+                    )
+
+                    start = time.perf_counter()
+                    timings = asyncio.run(run_async(concurrency))
+                    self.write_throughput(
+                        "asgi", concurrency, timings, time.perf_counter() - start
+                    )
+        finally:
+            get_user_model().objects.filter(employee__pk__in=employee_ids).delete()
+
+    def benchmark_suite(
+        self,
+        employee_counts: list[int],
+        years: float,
+        repeat: int,
+        output: pathlib.Path,
+    ) -> None:
+        """
+        Times punch, list, report and import hot paths for each dataset size, and writes the results as JSON.
+
+        Each dataset is seeded with :program:`seed_timekeeper` and deleted afterwards. Every benchmark is run ``repeat`` times for wall time and query count, then once more under :py:mod:`tracemalloc` for peak memory, since tracing slows the code down.
+
+        +-------------------+-------------------------------------------------------+
+        | Benchmark         | One run                                               |
+        +===================+=======================================================+
+        | ``punch``         | Punches every employee in, then out.                  |
+        +-------------------+-------------------------------------------------------+
+        | ``employee_list`` | Renders :py:obj:`EmployeeListView`.                   |
+        +-------------------+-------------------------------------------------------+
+        | ``shift_list``    | Renders :py:obj:`ShiftListView` for one employee.     |
+        +-------------------+-------------------------------------------------------+
+        | ``report_<range>``| Generates a daily, weekly, monthly or yearly report.  |
+        +-------------------+-------------------------------------------------------+
+        | ``import``        | Uploads a csv file with a row for every employee.     |
+        +-------------------+-------------------------------------------------------+
+
+        :param employee_counts: Dataset sizes to benchmark, in employees.
+        :type employee_counts: :py:obj:`list`
+        :param years: Years of shift history.
+        :type years: :py:obj:`float`
+        :param repeat: Timed runs per benchmark.
+        :type repeat: :py:obj:`int`
+        :param output: File to write JSON results to.
+        :type output: :py:obj:`~pathlib.Path`
+        :raises CommandError: If ``repeat`` is less than 1.
+        :returns: Nothing.
+        :rtype: :py:obj:`None`
+
+        """
+        if repeat < 1:
+            raise CommandError(f"Repeat must be at least 1, got '{repeat}'.")
+
+        results = []
+        self.stdout.write(
+            f"{'employees':>10} {'benchmark':>15} {'median (ms)':>12} {'queries':>8} {'peak (KiB)':>11}"
+        )
+        for count in employee_counts:
+            prefix = f"benchmark{uuid.uuid4().hex[:8]}"
+            call_command(
+                "seed_timekeeper",
+                employees=count,
+                years=years,
+                open_ratio=0,
+                prefix=prefix,
+                stdout=io.StringIO(),
+            )
+            try:
+                # Render reports in this process, so their memory is traced
+                with override_settings(
+                    ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"],
+                    TIMEKEEPER_REPORT_WORKERS=1,
+                ):
+                    for name, operations, benchmark in self.get_suite_benchmarks(
+                        prefix, count
+                    ):
+                        result = {
+                            "benchmark": name,
+                            "employees": count,
+                            "operations": operations,
+                            **self.measure(benchmark, repeat),
+                        }
+                        results.append(result)
+                        self.stdout.write(
+                            f"{count:>10} {name:>15} {result['wall_time']['median'] * 1000:>12.1f} "
+                            f"{result['queries']:>8} {result['peak_memory'] / 1024:>11.0f}"
+                        )
+            finally:
+                get_user_model().objects.filter(
+                    username__startswith=f"{prefix}-"
+                ).delete()
+
+        output.write_text(
+            json.dumps(
+                {
+                    "created": timezone.now().isoformat(),
+                    "database": connection.vendor,
+                    "years": years,
+                    "repeat": repeat,
+                    "results": results,
+                },
+                indent=2,
+            )
+        )
+        self.stdout.write(self.style.SUCCESS(f"Wrote results to '{output}'."))
+
+    def get_suite_benchmarks(
+        self, prefix: str, count: int
+    ) -> list[tuple[str, int, Callable[[], object]]]:
+        """
+        Returns the suite's benchmarks for a seeded dataset.
+
+        :param prefix: Username prefix of the seeded employees.
+        :type prefix: :py:obj:`str`
+        :param count: Number of seeded employees.
+        :type count: :py:obj:`int`
+        :returns: Benchmark names, operations per run and functions running them once.
+        :rtype: :py:obj:`list`
+
+        """
+        employees = list(
+            Employee.objects.filter(user__username__startswith=f"{prefix}-")
+            .select_related("user")
+            .order_by("pk")
+        )
+        client = Client()
+        client.force_login(employees[0].user)
+        runs = iter(range(1_000_000))
+
+        def punch() -> None:
+            now = timezone.now()
+            for employee in employees:
+                set_punch_status(employee.pk, True, now - datetime.timedelta(hours=8))
+            for employee in employees:
+                set_punch_status(employee.pk, False, now)
+
+        def upload() -> None:
+            run = next(runs)
+            rows = "".join(
+                f"{prefix}-import{run}-{i}@terminusgps.com,,\n" for i in range(count)
+            )
+            client.post(
+                reverse("create employee batch"),
+                {
+                    "input_file": SimpleUploadedFile(
+                        "employees.csv",
+                        f"Email,Phone,Title\n{rows}".encode(),
+                        content_type="text/csv",
+                    )
+                },
+            )
+
+        yesterday = timezone.localdate() - datetime.timedelta(days=1)
+        benchmarks = [
+            ("punch", count * 2, punch),
+            (
+                "employee_list",
+                1,
+                lambda: client.get(reverse("list employees"), {"q": prefix}),
+            ),
+            (
+                "shift_list",
+                1,
+                lambda: client.get(reverse("list shifts", args=[employees[0].pk])),
+            ),
+        ]
+        for name, days in (
+            ("daily", 1),
+            ("weekly", 7),
+            ("monthly", 30),
+            ("yearly", 365),
+        ):
+            report = Report(
+                start_date=yesterday - datetime.timedelta(days=days - 1),
+                end_date=yesterday,
+            )
+            benchmarks.append(
+                (f"report_{name}", 1, lambda report=report: generate_report_pdf(report))
+            )
+        benchmarks.append(("import", count, upload))
+        return benchmarks
+
+    @staticmethod
+    def measure(benchmark: Callable[[], object], repeat: int) -> dict[str, object]:
+        """
+        Runs a benchmark ``repeat`` times, then once more while tracing memory.
+
+        :param benchmark: A function running the benchmark once.
+        :type benchmark: :py:obj:`~collections.abc.Callable`
+        :param repeat: Timed runs.
+        :type repeat: :py:obj:`int`
+        :returns: Wall time in seconds (``min``, ``median``, ``max`` and every run), the median query count and peak traced memory in bytes.
+        :rtype: :py:obj:`dict`
+
+        """
+        timings, queries = [], []
+        executed = 0
+
+        def count_query(execute, sql, params, many, context):
+            nonlocal executed
+            executed += 1
+            return execute(sql, params, many, context)
+
+        for _ in range(repeat):
+            executed = 0
+            with connection.execute_wrapper(count_query):
+                start = time.perf_counter()
+                benchmark()
+                timings.append(time.perf_counter() - start)
+            queries.append(executed)
+
+        tracemalloc.start()
+        try:
+            benchmark()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        return {
+            "wall_time": {
+                "min": min(timings),
+                "median": statistics.median(timings),
+                "max": max(timings),
+                "runs": timings,
+            },
+            "queries": int(statistics.median(queries)),
+            "peak_memory": peak,
+        }
+
+    def write_throughput(
+        self, handler: str, concurrency: int, timings: list[float], elapsed: float
+    ) -> None:
+        """Writes a row of request throughput and latency percentiles."""
+        quantiles = statistics.quantiles(timings, n=100)
+        self.stdout.write(
+            f"{handler:>8} {concurrency:>12} {len(timings) / elapsed:>8.0f} "
+            f"{quantiles[49] * 1000:>9.2f} {quantiles[98] * 1000:>9.2f}"
+        )
+
+    @staticmethod
+    def create_employees(count: int) -> list[int]:
+        """
+        Creates employees with punch cards in bulk.
+
+        :param count: Number of employees.
+        :type count: :py:obj:`int`
+        :returns: Employee ids.
+        :rtype: :py:obj:`list`
+
+        """
+        prefix = uuid.uuid4().hex[:8]
+        users = get_user_model().objects.bulk_create(
+            get_user_model()(username=f"benchmark{prefix}{i:05d}@terminusgps.com")
+            for i in range(count)
+        )
+        employees = Employee.objects.bulk_create(
+            Employee(user=user, code="") for user in users
+        )
+        EmployeePunchCard.objects.bulk_create(
+            EmployeePunchCard(employee=employee) for employee in employees
+        )
+        return [employee.pk for employee in employees]
+
+    @staticmethod
+    def build_punch_events(
+        employee_ids: list[int], count: int, seed: int = 0
+    ) -> list[PunchEvent]:
+        """
+        Builds unsaved, alternating punch in/out events, with a few repeats, in shuffled order.
+
+        :param employee_ids: Employee ids.
+        :type employee_ids: :py:obj:`list`
+        :param count: Number of events.
+        :type count: :py:obj:`int`
+        :param seed: Random seed.
+        :type seed: :py:obj:`int`
+        :returns: A list of unsaved punch events.
+        :rtype: :py:obj:`list`
+
+        """
+        rng = random.Random(seed)
+        start = timezone.now() - datetime.timedelta(days=count // len(employee_ids))
+        events = []
+        for i in range(count):
+            employee_id = employee_ids[i % len(employee_ids)]
+            n = i // len(employee_ids)
+            events.append(
+                PunchEvent(
+                    employee_id=employee_id,
+                    direction=PunchEvent.Direction.OUT
+                    if n % 2
+                    else PunchEvent.Direction.IN,
+                    timestamp=start + datetime.timedelta(hours=12 * n, minutes=i % 60),
+                )
+            )
+        events += rng.sample(events, count // 100)
+        rng.shuffle(events)
+        return events
+
+    @staticmethod
+    def build_dataset(
+        employee_count: int, shifts: int, seed: int = 0
+    ) -> tuple[Report, list[EmployeeReportData]]:
+        """
+        Builds an unsaved report and in-memory employee data, so no database writes are needed.
+
+        :param employee_count: Number of employees.
+        :type employee_count: :py:obj:`int`
+        :param shifts: Shifts per employee.
+        :type shifts: :py:obj:`int`
+        :param seed: Random seed.
+        :type seed: :py:obj:`int`
+        :returns: A report and a list of per-employee report data.
+        :rtype: :py:obj:`tuple`
+
+        """
+        rng = random.Random(seed)
+        end = timezone.localtime().replace(hour=0, minute=0, second=0, microsecond=0)
+        start = end - datetime.timedelta(days=shifts)
+        report = Report(start_date=start.date(), end_date=end.date())
+
+        employees = []
+        for i in range(employee_count):
+            user = get_user_model()(username=f"employee{i:05d}@terminusgps.com")
+            data = EmployeeReportData(Employee(user=user))
+            employee_shifts = []
+            for day in range(shifts):
+                shift_start = start + datetime.timedelta(
+                    days=day, hours=rng.randint(6, 10)
+                )
+                duration = datetime.timedelta(minutes=rng.randint(240, 600))
+                employee_shifts.append(
+                    EmployeeShift(
+                        start_datetime=shift_start,
+                        end_datetime=shift_start + duration,
+                        duration=duration,
+                    )
+                )
+            data.add_shifts(employee_shifts)
+            employees.append(data)
+        return report, employees
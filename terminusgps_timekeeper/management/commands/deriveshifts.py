@@ -0,0 +1,57 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from terminusgps_timekeeper.events import derive_shifts, replay_shifts
+
+
+class Command(BaseCommand):
+    help = "Derives employee shifts from punch events"
+
+    def add_arguments(self, parser):
+        """Adds arguments ``--batch-size``, ``--replay`` and ``--chunk-size``."""
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Number of new punch events to derive per transaction",
+        )
+        parser.add_argument(
+            "--replay",
+            action="store_true",
+            help="Rebuild every event-derived shift from the full punch event history",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=10_000,
+            help="Number of punch events to read at a time when replaying",
+        )
+
+    def handle(self, *args, **options):
+        """
+        Derives shifts from punch events recorded since the last run, or replays every punch event.
+
+        :param batch_size: Number of new punch events to derive per transaction.
+        :type batch_size: :py:obj:`int`
+        :param replay: Whether or not to replay the full punch event history.
+        :type replay: :py:obj:`bool`
+        :param chunk_size: Number of punch events to read at a time when replaying.
+        :type chunk_size: :py:obj:`int`
+        :raises CommandError: If ``batch_size`` or ``chunk_size`` was less than 1.
+        :returns: Nothing.
+        :rtype: :py:obj:`None`
+
+        """
+        for option in ("batch_size", "chunk_size"):
+            if options[option] < 1:
+                raise CommandError(
+                    "%(option)s must be at least 1, got '%(size)s'."
+                    % {"option": option, "size": options[option]}
+                )
+
+        if options["replay"]:
+            created = replay_shifts(options["chunk_size"])
+        else:
+            created = derive_shifts(options["batch_size"])
+        self.stdout.write(
+            self.style.SUCCESS("Derived %(count)s shifts." % {"count": created})
+        )
@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from terminusgps_timekeeper.rollups import rebuild_daily_hours
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the daily hours rollup from employee shifts"
+
+    def add_arguments(self, parser):
+        """Adds arguments ``--employee`` and ``--chunk-size``."""
+        parser.add_argument(
+            "--employee",
+            type=int,
+            nargs="+",
+            dest="employee_ids",
+            help="Only rebuild hours for these employee ids",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=10_000,
+            help="Number of shifts to read from the database at a time",
+        )
+
+    def handle(self, *args, **options):
+        """
+        Deletes and recomputes daily hours rollup rows from shifts.
+
+        :param employee_ids: Optional employee ids to rebuild.
+        :type employee_ids: :py:obj:`list` | :py:obj:`None`
+        :param chunk_size: Number of shifts to read from the database at a time.
+        :type chunk_size: :py:obj:`int`
+        :raises CommandError: If ``chunk_size`` was less than 1.
+        :returns: Nothing.
+        :rtype: :py:obj:`None`
+
+        """
+        chunk_size: int = options["chunk_size"]
+        if chunk_size < 1:
+            raise CommandError(
+                "Chunk size must be at least 1, got '%(size)s'." % {"size": chunk_size}
+            )
+
+        created = rebuild_daily_hours(options["employee_ids"], chunk_size)
+        self.stdout.write(
+            self.style.SUCCESS(
+                "Rebuilt %(count)s daily hours rows." % {"count": created}
+            )
+        )
@@ -0,0 +1,88 @@
+import multiprocessing
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from terminusgps_timekeeper.jobs import ReportJobWorker
+
+from ._private import run_worker_process
+
+
+class Command(BaseCommand):
+    help = "Runs background workers that generate queued report pdf files"
+
+    def add_arguments(self, parser):
+        """Adds arguments ``--workers``, ``--poll-interval`` and ``--burst``."""
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=getattr(settings, "TIMEKEEPER_WORKER_CONCURRENCY", 1),
+            help="Number of concurrent worker processes",
+        )
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=1.0,
+            help="Seconds to wait when the queue is empty",
+        )
+        parser.add_argument(
+            "--burst", action="store_true", help="Exit once the queue is empty"
+        )
+
+    def handle(self, *args, **options):
+        """
+        Runs one or more report job workers until interrupted.
+
+        :param workers: Number of concurrent worker processes.
+        :type workers: :py:obj:`int`
+        :param poll_interval: Seconds to wait when the queue is empty.
+        :type poll_interval: :py:obj:`float`
+        :param burst: Whether or not to exit once the queue is empty.
+        :type burst: :py:obj:`bool`
+        :raises CommandError: If ``workers`` was less than 1.
+        :returns: Nothing.
+        :rtype: :py:obj:`None`
+
+        """
+        workers: int = options["workers"]
+        poll_interval: float = options["poll_interval"]
+        burst: bool = options["burst"]
+
+        if workers < 1:
+            raise CommandError(
+                "Worker count must be at least 1, got '%(count)s'." % {"count": workers}
+            )
+
+        self.stdout.write(
+            self.style.NOTICE(
+                "Starting %(count)s report worker(s)..." % {"count": workers}
+            )
+        )
+        if workers == 1:
+            try:
+                processed = ReportJobWorker(poll_interval=poll_interval).run(burst)
+            except KeyboardInterrupt:
+                return
+            self.stdout.write(
+                self.style.SUCCESS(
+                    "Ran %(count)s report job(s)." % {"count": processed}
+                )
+            )
+            return
+
+        connections.close_all()
+        context = multiprocessing.get_context("spawn")
+        processes = [
+            context.Process(target=run_worker_process, args=(poll_interval, burst))
+            for _ in range(workers)
+        ]
+        for process in processes:
+            process.start()
+        try:
+            for process in processes:
+                process.join()
+        except KeyboardInterrupt:
+            for process in processes:
+                process.join()
+        self.stdout.write(self.style.SUCCESS("All report workers stopped."))
@@ -0,0 +1,394 @@
+import datetime
+import time
+
+import numpy as np
+import pandas as pd
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Model
+from django.utils import timezone
+
+from terminusgps_timekeeper.intervals import aggregate_intervals, split_intervals
+from terminusgps_timekeeper.models import (
+    Employee,
+    EmployeeDailyHours,
+    EmployeePunchCard,
+    EmployeeShift,
+    PunchEvent,
+)
+from terminusgps_timekeeper.utils import hash_fingerprint_code
+
+PROFILES: tuple[tuple[str, float, float, float], ...] = (
+    ("day", 0.6, 7.0, 8.5),
+    ("evening", 0.25, 15.0, 8.0),
+    ("night", 0.15, 22.0, 9.0),
+)
+"""Shift profiles: name, share of employees, usual local start hour and usual length in hours. Night shifts cross midnight."""
+
+WEEKDAYS: frozenset[int] = frozenset(range(5))
+"""Monday to Friday."""
+WEEKEND_ROTATION: frozenset[int] = frozenset(range(2, 7))
+"""Wednesday to Sunday."""
+
+
+class Command(BaseCommand):
+    help = "Seeds a deterministic, synthetic timekeeper dataset for load testing"
+
+    def add_arguments(self, parser):
+        """Adds arguments ``--employees``, ``--years``, ``--seed``, ``--until``, ``--open-ratio``, ``--batch-size``, ``--prefix`` and ``--skip-rollup``."""
+        parser.add_argument(
+            "--employees", type=int, default=100, help="Number of employees to create"
+        )
+        parser.add_argument(
+            "--years", type=float, default=2.0, help="Years of shift history"
+        )
+        parser.add_argument(
+            "--seed", type=int, default=0, help="Random seed for the dataset"
+        )
+        parser.add_argument(
+            "--until",
+            type=datetime.date.fromisoformat,
+            default=None,
+            help="Local date open punches are on, as YYYY-MM-DD. Shift history ends the day before. Default is today",
+        )
+        parser.add_argument(
+            "--open-ratio",
+            type=float,
+            default=0.1,
+            help="Share of employees left punched in",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=100_000,
+            help="Number of rows to insert per query",
+        )
+        parser.add_argument(
+            "--prefix", default="seed", help="Username prefix for seeded employees"
+        )
+        parser.add_argument(
+            "--skip-rollup",
+            action="store_true",
+            help="Don't build the daily hours rollup for seeded employees",
+        )
+
+    def handle(self, *args, **options):
+        """
+        Creates employees with punch cards and years of shift history.
+
+        Every employee gets a shift profile (day, evening or overnight), a Monday to Friday or Wednesday to Sunday schedule, occasional absences and extra shifts, and jittered start times and lengths. Shifts are generated with NumPy, one employee at a time, and written in batches with :py:func:`insert_rows`. Each batch's daily hours rollup rows are computed from the generated shifts and written with them. Shift history runs up to the day before :option:`--until`, when some employees are left punched in.
+
+        The same options always produce the same employees and shifts.
+
+        :param employees: Number of employees to create.
+        :type employees: :py:obj:`int`
+        :param years: Years of shift history.
+        :type years: :py:obj:`float`
+        :param seed: Random seed for the dataset.
+        :type seed: :py:obj:`int`
+        :param until: Local date open punches are on.
+        :type until: :py:obj:`~datetime.date` | :py:obj:`None`
+        :param open_ratio: Share of employees left punched in.
+        :type open_ratio: :py:obj:`float`
+        :param batch_size: Number of rows to insert per query.
+        :type batch_size: :py:obj:`int`
+        :param prefix: Username prefix for seeded employees.
+        :type prefix: :py:obj:`str`
+        :param skip_rollup: Whether or not to skip building the daily hours rollup.
+        :type skip_rollup: :py:obj:`bool`
+        :raises CommandError: If an option was out of range, or employees were already seeded with the prefix.
+        :returns: Nothing.
+        :rtype: :py:obj:`None`
+
+        """
+        count: int = options["employees"]
+        batch_size: int = options["batch_size"]
+        open_ratio: float = options["open_ratio"]
+        prefix: str = options["prefix"]
+        skip_rollup: bool = options["skip_rollup"]
+        if count < 1:
+            raise CommandError(f"Employees must be at least 1, got '{count}'.")
+        if batch_size < 1:
+            raise CommandError(f"Batch size must be at least 1, got '{batch_size}'.")
+        if not 0 <= open_ratio <= 1:
+            raise CommandError(
+                f"Open ratio must be between 0 and 1, got '{open_ratio}'."
+            )
+        if get_user_model().objects.filter(username__startswith=f"{prefix}-").exists():
+            raise CommandError(
+                f"Employees were already seeded with prefix '{prefix}', use another --prefix."
+            )
+
+        until: datetime.date = options["until"] or timezone.localdate()
+        days = int(options["years"] * 365.25)
+        dates = pd.date_range(until - datetime.timedelta(days=days), until, freq="D")
+        start = time.perf_counter()
+
+        employee_ids = self.create_employees(count, prefix, options["seed"])
+        open_ids = []
+        batch: list[tuple[int, np.ndarray, np.ndarray]] = []
+        buffered = shifts = rows = 0
+        for i, employee_id in enumerate(employee_ids):
+            rng = np.random.default_rng([options["seed"], i])
+            starts, ends = self.generate_shifts(rng, dates)
+            if rng.random() < open_ratio:
+                last_start = pd.Timestamp(starts[-1], tz=datetime.UTC).to_pydatetime()
+                open_ids.append((employee_id, min(last_start, timezone.now())))
+            # The last shift is on --until, which isn't over yet
+            batch.append((employee_id, starts[:-1], ends[:-1]))
+            buffered += len(starts) - 1
+            if buffered >= batch_size or i == len(employee_ids) - 1:
+                created = self.flush(batch, batch_size, rollup=not skip_rollup)
+                shifts, rows = shifts + created[0], rows + created[1]
+                batch.clear()
+                buffered = 0
+
+        self.punch_in(open_ids)
+        self.stdout.write(
+            f"Created {count} employees, {shifts} shifts and {rows} daily hours rows in {time.perf_counter() - start:.1f}s."
+        )
+        self.stdout.write(self.style.SUCCESS("Seeded the timekeeper dataset."))
+
+    @staticmethod
+    def create_employees(count: int, prefix: str, seed: int) -> list[int]:
+        """
+        Creates employees with unusable passwords and punch cards in bulk.
+
+        :param count: Number of employees.
+        :type count: :py:obj:`int`
+        :param prefix: Username prefix.
+        :type prefix: :py:obj:`str`
+        :param seed: Random seed, used in fingerprint codes.
+        :type seed: :py:obj:`int`
+        :returns: Employee ids, in creation order.
+        :rtype: :py:obj:`list`
+
+        """
+        password = make_password(None)
+        with transaction.atomic():
+            users = get_user_model().objects.bulk_create(
+                (
+                    get_user_model()(
+                        username=f"{prefix}-{i:07d}@terminusgps.com",
+                        email=f"{prefix}-{i:07d}@terminusgps.com",
+                        password=password,
+                    )
+                    for i in range(count)
+                ),
+                batch_size=1000,
+            )
+            codes = [f"{prefix}-{seed}-{i}" for i in range(count)]
+            employees = Employee.objects.bulk_create(
+                (
+                    Employee(
+                        user=user, code=code, code_digest=hash_fingerprint_code(code)
+                    )
+                    for user, code in zip(users, codes)
+                ),
+                batch_size=1000,
+            )
+            EmployeePunchCard.objects.bulk_create(
+                (EmployeePunchCard(employee=employee) for employee in employees),
+                batch_size=1000,
+            )
+        return [employee.pk for employee in employees]
+
+    @staticmethod
+    def generate_shifts(
+        rng: np.random.Generator, dates: pd.DatetimeIndex
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Generates one employee's shift history.
+
+        :param rng: The employee's random generator.
+        :type rng: :py:obj:`~numpy.random.Generator`
+        :param dates: Local dates to generate shifts on.
+        :type dates: :py:obj:`~pandas.DatetimeIndex`
+        :returns: Shift starts and ends as UTC ``datetime64[s]`` arrays, in order. The last shift is on the last date.
+        :rtype: :py:obj:`tuple`
+
+        """
+        _, shares, start_hours, lengths = zip(*PROFILES)
+        profile = rng.choice(len(PROFILES), p=shares)
+        schedule = WEEKEND_ROTATION if rng.random() < 0.2 else WEEKDAYS
+
+        scheduled = np.isin(dates.weekday, list(schedule))
+        roll = rng.random(len(dates))
+        # Rare absences on scheduled days, and rare extra shifts on days off
+        works = np.where(scheduled, roll < 0.94, roll < 0.03)
+        works[-1] = True
+        count = int(works.sum())
+
+        start_minutes = rng.normal(start_hours[profile] * 60, 20, count).clip(-90, None)
+        length_minutes = rng.normal(lengths[profile] * 60, 40, count).clip(180, 720)
+        local_starts = dates[works] + pd.to_timedelta(start_minutes.round(), unit="m")
+        starts = (
+            local_starts.tz_localize(
+                timezone.get_current_timezone(),
+                ambiguous=np.zeros(count, dtype=bool),
+                nonexistent="shift_forward",
+            )
+            .tz_convert(None)
+            .to_numpy(dtype="datetime64[s]")
+        )
+        ends = starts + length_minutes.round().astype("timedelta64[m]")
+        return starts, ends
+
+    @staticmethod
+    def flush(
+        batch: list[tuple[int, np.ndarray, np.ndarray]], batch_size: int, rollup: bool
+    ) -> tuple[int, int]:
+        """
+        Inserts a batch of employees' shifts, and their daily hours rollup rows.
+
+        Every employee's shifts are in a single batch, so rollup rows are complete without reading shifts back.
+
+        :param batch: Employee ids with their shift starts and ends.
+        :type batch: :py:obj:`list`
+        :param batch_size: Number of rows to insert per query.
+        :type batch_size: :py:obj:`int`
+        :param rollup: Whether or not to insert daily hours rollup rows.
+        :type rollup: :py:obj:`bool`
+        :returns: Number of shifts and rollup rows inserted.
+        :rtype: :py:obj:`tuple`
+
+        """
+        employee_ids = np.concatenate(
+            [np.full(len(starts), employee_id) for employee_id, starts, _ in batch]
+        )
+        starts = np.concatenate([starts for _, starts, _ in batch])
+        ends = np.concatenate([ends for _, _, ends in batch])
+        with transaction.atomic():
+            shifts = insert_rows(
+                EmployeeShift,
+                {
+                    "employee_id": employee_ids,
+                    "start_datetime": starts,
+                    "end_datetime": ends,
+                    "duration": ends - starts,
+                },
+                batch_size,
+            )
+            if not rollup or not shifts:
+                return shifts, 0
+            totals = aggregate_intervals(
+                split_intervals(starts, ends, keys=employee_ids)
+            )
+            rows = insert_rows(
+                EmployeeDailyHours,
+                {
+                    "employee_id": totals.index.get_level_values("key").to_numpy(
+                        dtype=np.int64
+                    ),
+                    "date": np.array(
+                        totals.index.get_level_values("day"), dtype="datetime64[D]"
+                    ),
+                    "seconds": totals["seconds"].to_numpy(),
+                    "shift_count": totals["count"].to_numpy(),
+                },
+                batch_size,
+            )
+        return shifts, rows
+
+    @staticmethod
+    def punch_in(open_punches: list[tuple[int, datetime.datetime]]) -> None:
+        """Punches employees in, recording their punch in events so their next punch out derives a shift."""
+        if not open_punches:
+            return
+        with transaction.atomic():
+            cards = list(
+                EmployeePunchCard.objects.filter(
+                    employee_id__in=[employee_id for employee_id, _ in open_punches]
+                )
+            )
+            times = dict(open_punches)
+            for card in cards:
+                card.punched_in = True
+                card._prev_punch_state = True
+                card.last_punch_in_time = times[card.employee_id]
+            EmployeePunchCard.objects.bulk_update(
+                cards, ["punched_in", "_prev_punch_state", "last_punch_in_time"]
+            )
+            PunchEvent.objects.bulk_create(
+                PunchEvent(
+                    employee_id=employee_id,
+                    direction=PunchEvent.Direction.IN,
+                    timestamp=timestamp,
+                    source=PunchEvent.Source.ADMIN,
+                )
+                for employee_id, timestamp in open_punches
+            )
+
+
+def insert_rows(
+    model: type[Model], columns: dict[str, np.ndarray], batch_size: int
+) -> int:
+    """
+    Inserts rows of a model from column arrays.
+
+    On SQLite, values are converted to their stored form a column at a time and inserted with :py:meth:`~sqlite3.Cursor.executemany`, skipping the per-value conversion :py:meth:`~django.db.models.query.QuerySet.bulk_create` does and its limit of 999 values per query. Other databases use :py:meth:`~django.db.models.query.QuerySet.bulk_create`. Neither sends signals or calls :py:meth:`~django.db.models.Model.save`.
+
+    :param model: A model class.
+    :type model: :py:obj:`type`
+    :param columns: Equal length arrays of values, keyed by field attribute name. ``datetime64`` values are whole second UTC datetimes, or dates if their unit is days.
+    :type columns: :py:obj:`dict`
+    :param batch_size: Number of rows to insert per query.
+    :type batch_size: :py:obj:`int`
+    :returns: Number of rows inserted.
+    :rtype: :py:obj:`int`
+
+    """
+    names = list(columns)
+    if connection.vendor != "sqlite":
+        values = [_to_python(array) for array in columns.values()]
+        model.objects.bulk_create(
+            (model(**dict(zip(names, row))) for row in zip(*values)),
+            batch_size=batch_size,
+        )
+        return len(values[0])
+
+    fields = [model._meta.get_field(name) for name in names]
+    values = [_to_sqlite(array) for array in columns.values()]
+    sql = "INSERT INTO {} ({}) VALUES ({})".format(
+        connection.ops.quote_name(model._meta.db_table),
+        ", ".join(connection.ops.quote_name(field.column) for field in fields),
+        ", ".join(["%s"] * len(fields)),
+    )
+    rows = list(zip(*values))
+    with connection.cursor() as cursor:
+        cursor.execute("PRAGMA cache_size = -262144")
+        for offset in range(0, len(rows), batch_size):
+            cursor.executemany(sql, rows[offset : offset + batch_size])
+    return len(rows)
+
+
+def _to_python(array: np.ndarray) -> list:
+    """Returns array values as the Python objects Django fields expect."""
+    match array.dtype.kind:
+        case "M" if np.datetime_data(array.dtype)[0] == "D":
+            return array.astype(object).tolist()
+        case "M":
+            return list(
+                pd.DatetimeIndex(array).tz_localize(datetime.UTC).to_pydatetime()
+            )
+        case "m":
+            return array.astype("timedelta64[us]").astype(object).tolist()
+        case _:
+            return array.tolist()
+
+
+def _to_sqlite(array: np.ndarray) -> list:
+    """Returns array values as Django stores them in SQLite."""
+    match array.dtype.kind:
+        case "M" if np.datetime_data(array.dtype)[0] == "D":
+            return np.datetime_as_string(array, unit="D").tolist()
+        case "M":
+            # Naive UTC without microseconds, matching str() of a whole second datetime
+            strings = np.datetime_as_string(array.astype("datetime64[s]"), unit="s")
+            return np.char.replace(strings, "T", " ").tolist()
+        case "m":
+            return (array // np.timedelta64(1, "us")).tolist()
+        case _:
+            return array.tolist()
@@ -1,5 +1,5 @@
 from django.core.management.base import BaseCommand, CommandError
-from terminusgps_authenticator.models import AuthenticatorEmployee
+from terminusgps_timekeeper.models import Employee
 
 
 class Command(BaseCommand):
@@ -21,6 +21,7 @@ class Command(BaseCommand):
         :raises CommandError: If ``employee_id`` was not provided.
         :raises CommandError: If ``fingerprint_code`` was not provided.
         :raises CommandError: If the employee wasn't found by id.
+        :raises CommandError: If another employee already has the fingerprint code.
         :returns: Nothing.
         :rtype: :py:obj:`None`
 
@@ -38,8 +39,14 @@ class Command(BaseCommand):
                 % {"code": fingerprint_code}
             )
 
+        if Employee.objects.code_in_use(fingerprint_code, exclude=employee_id):
+            raise CommandError(
+                "Fingerprint code is already used by another employee, employee #%(id)s was not updated."
+                % {"id": employee_id}
+            )
+
         try:
-            employee = AuthenticatorEmployee.objects.get(pk=employee_id)
+            employee = Employee.objects.get(pk=employee_id)
             employee.code = fingerprint_code
             employee.save()
             self.stdout.write(
@@ -48,7 +55,7 @@ class Command(BaseCommand):
                     % {"id": employee_id}
                 )
             )
-        except AuthenticatorEmployee.DoesNotExist:
+        except Employee.DoesNotExist:
             raise CommandError(
                 "Employee #%(id)s was not found, it may not exist."
                 % {"id": employee_id}
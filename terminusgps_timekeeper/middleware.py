@@ -0,0 +1,261 @@
+import contextvars
+import dataclasses
+import heapq
+import json
+import logging
+import random
+import time
+from collections.abc import Callable
+from typing import Any
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.http import HttpRequest, HttpResponseBase
+from django.template.response import SimpleTemplateResponse
+
+logger = logging.getLogger(__name__)
+
+SLOWEST_QUERIES: int = 5
+"""Number of slowest SQL statements logged with a slow request."""
+
+_request_timing: contextvars.ContextVar["RequestTiming | None"] = (
+    contextvars.ContextVar("request_timing", default=None)
+)
+
+
+def get_sample_rate() -> float:
+    """Returns the share of requests instrumented by :py:obj:`ServerTimingMiddleware`."""
+    return float(getattr(settings, "TIMEKEEPER_SERVER_TIMING_SAMPLE_RATE", 1.0))
+
+
+def get_slow_request_threshold() -> float:
+    """Returns how many milliseconds an instrumented request takes before it's logged as slow."""
+    return float(getattr(settings, "TIMEKEEPER_SLOW_REQUEST_THRESHOLD", 500))
+
+
+@dataclasses.dataclass
+class RequestTiming:
+    """SQL, view and template timings for a single request, in seconds."""
+
+    start: float = dataclasses.field(default_factory=time.perf_counter)
+    """When the request reached the middleware."""
+    end: float | None = None
+    """When the response left the middleware."""
+    view_start: float | None = None
+    """When the view was about to be called."""
+    render_start: float | None = None
+    """When the template response started rendering."""
+    render_end: float | None = None
+    """When the template response finished rendering."""
+    queries: int = 0
+    """Number of SQL statements executed."""
+    sql: float = 0.0
+    """Total time spent executing SQL."""
+    slowest: list[tuple[float, int, str]] = dataclasses.field(default_factory=list)
+    """Heap of the slowest SQL statements, as duration, order and SQL."""
+
+    def add_query(self, sql: str, duration: float) -> None:
+        """
+        Records an executed SQL statement.
+
+        :param sql: The SQL statement, without parameters.
+        :type sql: :py:obj:`str`
+        :param duration: Seconds the statement took.
+        :type duration: :py:obj:`float`
+        :returns: Nothing.
+        :rtype: :py:obj:`None`
+
+        """
+        self.queries += 1
+        self.sql += duration
+        entry = (duration, self.queries, sql)
+        if len(self.slowest) < SLOWEST_QUERIES:
+            heapq.heappush(self.slowest, entry)
+        else:
+            heapq.heappushpop(self.slowest, entry)
+
+    @property
+    def total(self) -> float:
+        """Time spent in the middleware and everything below it."""
+        return (self.end or time.perf_counter()) - self.start
+
+    @property
+    def template(self) -> float:
+        """Time spent rendering the template response, or ``0`` if the response wasn't one."""
+        if self.render_start is None or self.render_end is None:
+            return 0.0
+        return self.render_end - self.render_start
+
+    @property
+    def view(self) -> float:
+        """Time spent from calling the view to the response coming back, less template rendering."""
+        if self.view_start is None:
+            return 0.0
+        return (self.end or time.perf_counter()) - self.view_start - self.template
+
+    def get_server_timing(self) -> str:
+        """Returns the timings as a ``Server-Timing`` header value, in milliseconds."""
+        metrics = [
+            ("sql", self.sql, f"{self.queries} queries"),
+            ("view", self.view, "View"),
+            ("template", self.template, "Template"),
+            ("total", self.total, "Total"),
+        ]
+        return ", ".join(
+            f'{name};dur={seconds * 1000:.1f};desc="{desc}"'
+            for name, seconds, desc in metrics
+        )
+
+    def as_dict(self) -> dict[str, Any]:
+        """Returns the timings in milliseconds, with the slowest SQL statements, slowest first."""
+        return {
+            "total_ms": round(self.total * 1000, 1),
+            "view_ms": round(self.view * 1000, 1),
+            "template_ms": round(self.template * 1000, 1),
+            "sql_ms": round(self.sql * 1000, 1),
+            "queries": self.queries,
+            "slowest_queries": [
+                {"sql": sql, "duration_ms": round(duration * 1000, 1)}
+                for duration, _, sql in sorted(self.slowest, reverse=True)
+            ],
+        }
+
+
+def record_query(
+    execute: Callable, sql: str, params: Any, many: bool, context: dict
+) -> Any:
+    """Database execute wrapper that times SQL statements for the current request's :py:obj:`RequestTiming`, if it has one."""
+    timing = _request_timing.get()
+    if timing is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timing.add_query(sql, time.perf_counter() - start)
+
+
+def install_query_recorder(connection, **kwargs) -> None:
+    """Adds :py:func:`record_query` to a database connection's execute wrappers, once."""
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+connection_created.connect(install_query_recorder)
+
+
+class ServerTimingMiddleware:
+    """
+    Records SQL, view and template timings for a sample of requests.
+
+    Instrumented responses get a ``Server-Timing`` header. Instrumented requests slower than :confval:`TIMEKEEPER_SLOW_REQUEST_THRESHOLD` are logged as warnings, with their slowest SQL statements. SQL is logged without parameters. Requests left out of the sample by :confval:`TIMEKEEPER_SERVER_TIMING_SAMPLE_RATE` aren't instrumented at all.
+
+    Place it first in :py:data:`MIDDLEWARE`, so view time starts as close to the view as possible and template time only covers rendering. Template time is only known for template responses, other views include rendering in their view time.
+
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response: Callable) -> None:
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+            # Hooks match the handler's mode, so they don't cost a thread switch
+            self.process_view = self.aprocess_view
+            self.process_template_response = self.aprocess_template_response
+
+    def __call__(self, request: HttpRequest) -> HttpResponseBase:
+        if self.is_async:
+            return self.__acall__(request)
+        timing = self.start_timing()
+        if timing is None:
+            return self.get_response(request)
+        for connection in connections.all(initialized_only=True):
+            install_query_recorder(connection)
+        token = _request_timing.set(timing)
+        try:
+            response = self.get_response(request)
+        finally:
+            _request_timing.reset(token)
+        return self.finish_timing(request, response, timing)
+
+    async def __acall__(self, request: HttpRequest) -> HttpResponseBase:
+        timing = self.start_timing()
+        if timing is None:
+            return await self.get_response(request)
+        # Queries run in sync_to_async threads, which copy this context
+        token = _request_timing.set(timing)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _request_timing.reset(token)
+        return self.finish_timing(request, response, timing)
+
+    def process_view(self, request: HttpRequest, *args) -> None:
+        """Marks when the view is about to be called."""
+        self.mark_view_start()
+
+    async def aprocess_view(self, request: HttpRequest, *args) -> None:
+        """Async version of :py:meth:`process_view`."""
+        self.mark_view_start()
+
+    def process_template_response(
+        self, request: HttpRequest, response: SimpleTemplateResponse
+    ) -> SimpleTemplateResponse:
+        """Marks when the template response starts and finishes rendering."""
+        return self.mark_render(response)
+
+    async def aprocess_template_response(
+        self, request: HttpRequest, response: SimpleTemplateResponse
+    ) -> SimpleTemplateResponse:
+        """Async version of :py:meth:`process_template_response`."""
+        return self.mark_render(response)
+
+    @staticmethod
+    def mark_view_start() -> None:
+        """Marks when the view is about to be called, if the request is instrumented."""
+        if (timing := _request_timing.get()) is not None:
+            timing.view_start = time.perf_counter()
+
+    @staticmethod
+    def mark_render(response: SimpleTemplateResponse) -> SimpleTemplateResponse:
+        """Marks when a template response starts rendering, and has it mark when it finishes, if the request is instrumented."""
+        if (timing := _request_timing.get()) is not None:
+
+            def finish_render(response: SimpleTemplateResponse) -> None:
+                timing.render_end = time.perf_counter()
+
+            timing.render_start = time.perf_counter()
+            response.add_post_render_callback(finish_render)
+        return response
+
+    @staticmethod
+    def start_timing() -> RequestTiming | None:
+        """Returns a new request timing, or :py:obj:`None` if the request wasn't sampled."""
+        rate = get_sample_rate()
+        if rate <= 0 or (rate < 1 and random.random() >= rate):
+            return None
+        return RequestTiming()
+
+    @staticmethod
+    def finish_timing(
+        request: HttpRequest, response: HttpResponseBase, timing: RequestTiming
+    ) -> HttpResponseBase:
+        """Adds the ``Server-Timing`` header to the response, and logs the request if it was slow."""
+        timing.end = time.perf_counter()
+        response.headers["Server-Timing"] = timing.get_server_timing()
+        if timing.total * 1000 >= get_slow_request_threshold():
+            data = {
+                "method": request.method,
+                "path": request.path,
+                "status": response.status_code,
+                **timing.as_dict(),
+            }
+            logger.warning(
+                "Slow request: %s", json.dumps(data), extra={"request_timing": data}
+            )
+        return response
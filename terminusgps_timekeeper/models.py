@@ -2,13 +2,51 @@ import datetime
 
 from django.contrib.auth import get_user_model
 from django.db import models
+from django.db.models.functions import Greatest, Least
 from django.urls import reverse
 from django.utils import timezone
 
 from django.utils.functional import cached_property
 from encrypted_model_fields.fields import EncryptedCharField
 
-from terminusgps_timekeeper.utils import display_duration
+from terminusgps_timekeeper.utils import display_duration, hash_fingerprint_code
+
+
+class EmployeeManager(models.Manager):
+    def get_by_code(self, code: str) -> "Employee":
+        """
+        Returns the employee with the provided fingerprint code.
+
+        Resolves the code with a single indexed lookup on :py:attr:`Employee.code_digest`.
+
+        :param code: A scanned fingerprint code.
+        :type code: :py:obj:`str`
+        :raises Employee.DoesNotExist: If no employee has the code.
+        :returns: An employee.
+        :rtype: :py:obj:`~terminusgps_timekeeper.models.Employee`
+
+        """
+        digest: str | None = hash_fingerprint_code(code)
+        if digest is None:
+            raise self.model.DoesNotExist("Fingerprint code cannot be empty.")
+        return self.get(code_digest=digest)
+
+    def code_in_use(self, code: str, exclude: int | None = None) -> bool:
+        """
+        Returns whether or not another employee already has the provided fingerprint code.
+
+        :param code: A fingerprint code.
+        :type code: :py:obj:`str`
+        :param exclude: An employee id to ignore, i.e. the employee being updated. Default is :py:obj:`None`.
+        :type exclude: :py:obj:`int` | :py:obj:`None`
+        :returns: Whether or not the code is taken. Empty codes are never taken.
+        :rtype: :py:obj:`bool`
+
+        """
+        digest: str | None = hash_fingerprint_code(code)
+        if digest is None:
+            return False
+        return self.filter(code_digest=digest).exclude(pk=exclude).exists()
 
 
 class Employee(models.Model):
@@ -16,6 +54,10 @@ class Employee(models.Model):
     """A Django user."""
     code = EncryptedCharField(verbose_name="fingerprint code", max_length=2048)
     """A fingerprint code."""
+    code_digest = models.CharField(
+        max_length=64, null=True, blank=True, default=None, editable=False, unique=True
+    )
+    """A keyed hash of :py:attr:`code`, used to look up employees by fingerprint. Unique, so a fingerprint code resolves to one employee at most; employees without a code store :py:obj:`None`."""
     phone = models.CharField(max_length=12, blank=True, null=True, default=None)
     """An optional phone number."""
     pfp = models.ImageField(
@@ -29,6 +71,8 @@ class Employee(models.Model):
     )
     """A Wialon driver id."""
 
+    objects = EmployeeManager()
+
     class Meta:
         verbose_name = "employee"
         verbose_name_plural = "employees"
@@ -38,7 +82,16 @@ class Employee(models.Model):
         return str(self.user.username)
 
     def save(self, **kwargs) -> None:
-        """Creates a :py:obj:`~terminusgps_authenticator.models.EmployeePunchCard` for the employee, if it doesn't exist."""
+        """
+        Creates a :py:obj:`~terminusgps_authenticator.models.EmployeePunchCard` for the employee, if it doesn't exist.
+
+        Also keeps :py:attr:`code_digest` in sync with :py:attr:`code`.
+
+        """
+        self.code_digest = hash_fingerprint_code(self.code)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "code" in update_fields:
+            kwargs["update_fields"] = {*update_fields, "code_digest"}
         if self.pk:
             EmployeePunchCard.objects.get_or_create(employee=self)
         super().save(**kwargs)
@@ -53,6 +106,51 @@ class Employee(models.Model):
         return self.punch_card.punched_in if hasattr(self, "punch_card") else False
 
 
+class EmployeeShiftQuerySet(models.QuerySet):
+    def overlapping(
+        self, start: datetime.datetime, end: datetime.datetime
+    ) -> "EmployeeShiftQuerySet":
+        """
+        Returns shifts that overlap the half-open period from ``start`` to ``end``, including shifts crossing either boundary.
+
+        :param start: Start of the period.
+        :type start: :py:obj:`~datetime.datetime`
+        :param end: End of the period, exclusive.
+        :type end: :py:obj:`~datetime.datetime`
+        :returns: A queryset of shifts.
+        :rtype: :py:obj:`~terminusgps_timekeeper.models.EmployeeShiftQuerySet`
+
+        """
+        return self.filter(start_datetime__lt=end, end_datetime__gt=start)
+
+    def clipped(
+        self, start: datetime.datetime, end: datetime.datetime
+    ) -> "EmployeeShiftQuerySet":
+        """
+        Returns shifts that overlap a period, annotated with the part of each shift inside it.
+
+        Each shift gets ``clipped_start``, ``clipped_end`` and ``clipped_duration`` annotations, so shifts crossing a boundary only count the time worked inside the period.
+
+        :param start: Start of the period.
+        :type start: :py:obj:`~datetime.datetime`
+        :param end: End of the period, exclusive.
+        :type end: :py:obj:`~datetime.datetime`
+        :returns: A queryset of annotated shifts.
+        :rtype: :py:obj:`~terminusgps_timekeeper.models.EmployeeShiftQuerySet`
+
+        """
+        field = models.DateTimeField()
+        clipped_start = Greatest("start_datetime", models.Value(start, field))
+        clipped_end = Least("end_datetime", models.Value(end, field))
+        return self.overlapping(start, end).annotate(
+            clipped_start=clipped_start,
+            clipped_end=clipped_end,
+            clipped_duration=models.ExpressionWrapper(
+                clipped_end - clipped_start, output_field=models.DurationField()
+            ),
+        )
+
+
 class EmployeeShift(models.Model):
     employee = models.ForeignKey(
         "terminusgps_timekeeper.Employee",
@@ -66,10 +164,36 @@ class EmployeeShift(models.Model):
     """End date and time for the shift."""
     duration = models.DurationField(blank=True, null=True, default=None)
     """Duration of the shift."""
+    punch_out_event = models.OneToOneField(
+        "terminusgps_timekeeper.PunchEvent",
+        on_delete=models.SET_NULL,
+        related_name="shift",
+        null=True,
+        blank=True,
+        default=None,
+        editable=False,
+    )
+    """Punch out event the shift was derived from, if any."""
+
+    objects = EmployeeShiftQuerySet.as_manager()
 
     class Meta:
         verbose_name = "shift"
         verbose_name_plural = "shifts"
+        indexes = [
+            # Period overlap, in report order
+            models.Index(
+                fields=["end_datetime", "start_datetime"], name="shift_period_idx"
+            ),
+            # An employee's shifts in a period
+            models.Index(
+                fields=["employee", "start_datetime"], name="shift_employee_start_idx"
+            ),
+            # An employee's shift history, paginated by cursor
+            models.Index(
+                fields=["employee", "end_datetime", "id"], name="shift_employee_end_idx"
+            ),
+        ]
 
     def __str__(self) -> str:
         """Returns ``"<EMPLOYEE_EMAIL> shift #<SHIFT_ID>"``."""
@@ -86,6 +210,40 @@ class EmployeeShift(models.Model):
         return display_duration(self.duration.total_seconds())
 
 
+class EmployeeDailyHours(models.Model):
+    employee = models.ForeignKey(
+        "terminusgps_timekeeper.Employee",
+        on_delete=models.CASCADE,
+        related_name="daily_hours",
+    )
+    """Employee that worked the hours."""
+    date = models.DateField()
+    """Local date the hours were worked on."""
+    seconds = models.FloatField(default=0)
+    """Total seconds worked on :py:attr:`date`."""
+    shift_count = models.PositiveIntegerField(default=0)
+    """Number of shifts counted towards :py:attr:`date`."""
+
+    class Meta:
+        verbose_name = "daily hours"
+        verbose_name_plural = "daily hours"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["employee", "date"], name="unique_employee_daily_hours"
+            )
+        ]
+        indexes = [models.Index(fields=["date", "employee"])]
+
+    def __str__(self) -> str:
+        """Returns ``"<EMPLOYEE_EMAIL> hours on <DATE>"``."""
+        return f"{self.employee} hours on {self.date}"
+
+    @property
+    def hours(self) -> float:
+        """Total hours worked on :py:attr:`date`."""
+        return self.seconds / 3600
+
+
 class EmployeePunchCard(models.Model):
     employee = models.OneToOneField(
         "terminusgps_timekeeper.Employee",
@@ -100,6 +258,13 @@ class EmployeePunchCard(models.Model):
     _prev_punch_state = models.BooleanField(default=False)
     """Previous punch in state for the employee."""
 
+    PUNCH_FIELDS: tuple[str, ...] = (
+        "punched_in",
+        "last_punch_in_time",
+        "_prev_punch_state",
+    )
+    """Fields only written by :py:mod:`~terminusgps_timekeeper.punches`."""
+
     class Meta:
         verbose_name = "punch card"
         verbose_name_plural = "punch cards"
@@ -109,20 +274,115 @@ class EmployeePunchCard(models.Model):
         return f"{self.employee.user.username}'s Punch Card"
 
     def save(self, **kwargs) -> None:
-        """Generates a shift for the employee if the employee is now punched out."""
+        """
+        Punches the employee in or out if :py:attr:`punched_in` changed.
+
+        Punches go through :py:func:`~terminusgps_timekeeper.punches.set_punch_status`, so they record punch events and derive shifts like every other punch. The punch columns are then only read back, never written, so a punch committed in between isn't overwritten.
+
+        """
         if self.pk and self._prev_punch_state != self.punched_in:
-            if self._prev_punch_state is True and self.punched_in is False:
-                EmployeeShift.objects.create(
-                    employee=self.employee,
-                    start_datetime=self.last_punch_in_time,
-                    end_datetime=timezone.now(),
-                )
-            else:
-                self.last_punch_in_time = timezone.now()
-            self._prev_punch_state = self.punched_in
+            # punches imports this module
+            from terminusgps_timekeeper.punches import set_punch_status
+
+            set_punch_status(
+                self.employee_id, self.punched_in, source=PunchEvent.Source.ADMIN
+            )
+            self.refresh_from_db(fields=self.PUNCH_FIELDS)
+            update_fields = kwargs.get("update_fields")
+            if update_fields is None:
+                update_fields = [
+                    field.name
+                    for field in self._meta.concrete_fields
+                    if not field.primary_key
+                ]
+            kwargs["update_fields"] = [
+                name for name in update_fields if name not in self.PUNCH_FIELDS
+            ]
+            if not kwargs["update_fields"]:
+                return
         super().save(**kwargs)
 
 
+class PunchEvent(models.Model):
+    class Direction(models.TextChoices):
+        IN = "in", "Punch in"
+        OUT = "out", "Punch out"
+
+    class Source(models.TextChoices):
+        WEB = "web", "Web"
+        KIOSK = "kiosk", "Kiosk"
+        ADMIN = "admin", "Admin"
+        API = "api", "API"
+
+    employee = models.ForeignKey(
+        "terminusgps_timekeeper.Employee",
+        on_delete=models.CASCADE,
+        related_name="punch_events",
+    )
+    """Employee that punched."""
+    direction = models.CharField(max_length=3, choices=Direction.choices)
+    """Whether the employee punched in or out."""
+    timestamp = models.DateTimeField()
+    """Date and time of the punch."""
+    source = models.CharField(max_length=8, choices=Source.choices, default=Source.WEB)
+    """Where the punch came from."""
+    recorded_at = models.DateTimeField(auto_now_add=True)
+    """Date and time the event was written."""
+
+    class Meta:
+        verbose_name = "punch event"
+        verbose_name_plural = "punch events"
+        indexes = [models.Index(fields=["employee", "timestamp"])]
+
+    def __str__(self) -> str:
+        """Returns ``"<EMPLOYEE_EMAIL> punch <DIRECTION> at <TIMESTAMP>"``."""
+        return f"{self.employee} punch {self.direction} at {self.timestamp}"
+
+
+class PunchEventCheckpoint(models.Model):
+    name = models.CharField(max_length=64, unique=True)
+    """Name of the event consumer."""
+    last_event_id = models.PositiveBigIntegerField(default=0)
+    """Id of the last punch event the consumer processed."""
+    updated_at = models.DateTimeField(auto_now=True)
+    """Date and time the checkpoint last moved."""
+
+    class Meta:
+        verbose_name = "punch event checkpoint"
+        verbose_name_plural = "punch event checkpoints"
+
+    def __str__(self) -> str:
+        """Returns ``"<NAME> at event #<LAST_EVENT_ID>"``."""
+        return f"{self.name} at event #{self.last_event_id}"
+
+
+class PunchBatch(models.Model):
+    token = models.UUIDField(unique=True)
+    """Idempotency token sent with the batch."""
+    source = models.CharField(
+        max_length=8, choices=PunchEvent.Source.choices, default=PunchEvent.Source.KIOSK
+    )
+    """Where the batch came from."""
+    received = models.PositiveIntegerField(default=0)
+    """Number of punch events in the batch."""
+    applied = models.PositiveIntegerField(default=0)
+    """Number of punch events recorded."""
+    duplicates = models.PositiveIntegerField(default=0)
+    """Number of punch events that were repeated in the batch."""
+    skipped = models.PositiveIntegerField(default=0)
+    """Number of punch events that didn't change a punch card, or were older than an employee's latest punch."""
+    created_at = models.DateTimeField(auto_now_add=True)
+    """Date and time the batch was applied."""
+
+    class Meta:
+        verbose_name = "punch batch"
+        verbose_name_plural = "punch batches"
+
+    def __str__(self) -> str:
+        """Returns ``"Punch batch <TOKEN>"``."""
+        return f"Punch batch {self.token}"
+
+
 class Report(models.Model):
     start_date = models.DateField()
     """Start of the report date range."""
@@ -144,17 +404,167 @@ class Report(models.Model):
     @cached_property
     def employees(self) -> models.QuerySet[Employee | Employee]:
         """All unique employees present in the report."""
-        return Employee.objects.filter(shifts__in=self.shifts).distinct()
+        return (
+            Employee.objects.filter(
+                daily_hours__date__range=(self.start_date, self.end_date)
+            )
+            .select_related("user")
+            .distinct()
+        )
+
+    @cached_property
+    def daily_hours(self) -> models.QuerySet[EmployeeDailyHours | EmployeeDailyHours]:
+        """All daily hour rollups between :py:attr:`start_date` and :py:attr:`end_date`."""
+        return EmployeeDailyHours.objects.filter(
+            date__range=(self.start_date, self.end_date)
+        )
+
+    @property
+    def period(self) -> tuple[datetime.datetime, datetime.datetime]:
+        """Start of :py:attr:`start_date` and start of the day after :py:attr:`end_date`, in the current timezone."""
+        tz = timezone.get_current_timezone()
+        return (
+            datetime.datetime.combine(self.start_date, datetime.time.min, tzinfo=tz),
+            datetime.datetime.combine(
+                self.end_date + datetime.timedelta(days=1), datetime.time.min, tzinfo=tz
+            ),
+        )
 
     @cached_property
-    def shifts(self) -> models.QuerySet[EmployeeShift | EmployeeShift]:
-        """All shifts between :py:attr:`start_date` and :py:attr:`end_date`."""
-        lower_bound = datetime.datetime.combine(
-            self.start_date, datetime.time.min, tzinfo=timezone.get_current_timezone()
+    def shifts(self) -> EmployeeShiftQuerySet:
+        """
+        All shifts overlapping :py:attr:`start_date` through :py:attr:`end_date`.
+
+        Shifts crossing either end of the period are included, clipped to the period. See :py:meth:`EmployeeShiftQuerySet.clipped`.
+
+        """
+        return EmployeeShift.objects.clipped(*self.period).order_by("end_datetime")
+
+
+class ReportJobManager(models.Manager):
+    def enqueue(self, report: Report, author: str | None = None) -> "ReportJob":
+        """
+        Queues a pdf generation job for the report, reusing an unfinished job if one exists.
+
+        :param report: A report.
+        :type report: :py:obj:`~terminusgps_timekeeper.models.Report`
+        :param author: An optional pdf author.
+        :type author: :py:obj:`str` | :py:obj:`None`
+        :returns: A report job.
+        :rtype: :py:obj:`~terminusgps_timekeeper.models.ReportJob`
+
+        """
+        unfinished = [ReportJob.Status.PENDING, ReportJob.Status.RUNNING]
+        job = self.filter(report=report, status__in=unfinished).first()
+        if job is None:
+            job = self.create(report=report, author=author)
+        return job
+
+    def claim(self, worker_id: str) -> "ReportJob | None":
+        """
+        Atomically claims the next runnable job for a worker.
+
+        A job is only claimed if its status was still pending when the update ran, so concurrent workers never claim the same job.
+
+        :param worker_id: A unique worker id.
+        :type worker_id: :py:obj:`str`
+        :returns: The claimed job, or :py:obj:`None` if no job was runnable.
+        :rtype: :py:obj:`~terminusgps_timekeeper.models.ReportJob` | :py:obj:`None`
+
+        """
+        now = timezone.now()
+        candidates = self.filter(
+            status=ReportJob.Status.PENDING, run_after__lte=now
+        ).order_by("run_after", "pk")
+        for pk in candidates.values_list("pk", flat=True)[:10]:
+            claimed = self.filter(pk=pk, status=ReportJob.Status.PENDING).update(
+                status=ReportJob.Status.RUNNING,
+                locked_by=worker_id,
+                locked_at=now,
+                attempts=models.F("attempts") + 1,
+            )
+            if claimed:
+                return self.select_related("report").get(pk=pk)
+        return None
+
+    def recover_stale(self, timeout: datetime.timedelta) -> int:
+        """
+        Requeues running jobs whose worker hasn't finished them within ``timeout``.
+
+        Stale jobs that have used all of their attempts are marked as failed instead.
+
+        :param timeout: How long a job may run before it's considered stale.
+        :type timeout: :py:obj:`~datetime.timedelta`
+        :returns: Number of stale jobs recovered.
+        :rtype: :py:obj:`int`
+
+        """
+        now = timezone.now()
+        stale = self.filter(
+            status=ReportJob.Status.RUNNING, locked_at__lt=now - timeout
         )
-        upper_bound = datetime.datetime.combine(
-            self.end_date, datetime.time.max, tzinfo=timezone.get_current_timezone()
+        failed = stale.filter(attempts__gte=models.F("max_attempts")).update(
+            status=ReportJob.Status.FAILED,
+            error="Worker stopped responding.",
+            finished_at=now,
         )
-        return EmployeeShift.objects.filter(
-            start_datetime__gte=lower_bound, end_datetime__lte=upper_bound
-        ).order_by("end_datetime")
+        requeued = stale.update(
+            status=ReportJob.Status.PENDING, locked_by=None, locked_at=None
+        )
+        return failed + requeued
+
+
+class ReportJob(models.Model):
+    class Status(models.TextChoices):
+        PENDING = "pending", "Pending"
+        RUNNING = "running", "Running"
+        SUCCEEDED = "succeeded", "Succeeded"
+        FAILED = "failed", "Failed"
+
+    report = models.ForeignKey(
+        "terminusgps_timekeeper.Report", on_delete=models.CASCADE, related_name="jobs"
+    )
+    """Report to generate a pdf file for."""
+    status = models.CharField(
+        max_length=16, choices=Status.choices, default=Status.PENDING, db_index=True
+    )
+    """Current status of the job."""
+    author = models.CharField(max_length=128, null=True, blank=True, default=None)
+    """An optional pdf author."""
+    attempts = models.PositiveSmallIntegerField(default=0)
+    """Number of times a worker has claimed the job."""
+    max_attempts = models.PositiveSmallIntegerField(default=3)
+    """Number of attempts before the job is marked as failed."""
+    run_after = models.DateTimeField(default=timezone.now)
+    """Earliest date and time the job may run."""
+    locked_by = models.CharField(max_length=64, null=True, blank=True, default=None)
+    """Id of the worker running the job."""
+    locked_at = models.DateTimeField(null=True, blank=True, default=None)
+    """Date and time the job was claimed by a worker."""
+    created_at = models.DateTimeField(auto_now_add=True)
+    """Date and time the job was queued."""
+    finished_at = models.DateTimeField(null=True, blank=True, default=None)
+    """Date and time the job succeeded or failed."""
+    error = models.TextField(null=True, blank=True, default=None)
+    """Last error raised while running the job."""
+    profile = models.JSONField(null=True, blank=True, default=None)
+    """Stage-by-stage profile of the last attempt, from :py:meth:`~terminusgps_timekeeper.profiling.ReportProfile.as_dict`."""
+
+    objects = ReportJobManager()
+
+    class Meta:
+        verbose_name = "report job"
+        verbose_name_plural = "report jobs"
+
+    def __str__(self) -> str:
+        """Returns ``"Report job #<JOB_ID>"``."""
+        return f"Report job #{self.pk}"
+
+    def get_absolute_url(self) -> str:
+        """Returns a URL pointing to the job's status view."""
+        return reverse("report job status", kwargs={"pk": self.pk})
+
+    @property
+    def is_finished(self) -> bool:
+        """Whether or not the job succeeded or failed."""
+        return self.status in (self.Status.SUCCEEDED, self.Status.FAILED)
@@ -0,0 +1,149 @@
+import base64
+import dataclasses
+import json
+from collections.abc import Iterator, Sequence
+from typing import Any
+
+from django.core.paginator import InvalidPage
+from django.db.models import Model, Q, QuerySet
+
+
+class InvalidCursor(InvalidPage):
+    """Raised when a pagination cursor can't be decoded."""
+
+
+@dataclasses.dataclass
+class KeysetPage:
+    """A page of objects read after a cursor."""
+
+    object_list: list[Model]
+    """Objects on the page."""
+    next_cursor: str | None = None
+    """Cursor for the next page, or :py:obj:`None` if this is the last page."""
+
+    def __iter__(self) -> Iterator[Model]:
+        return iter(self.object_list)
+
+    def __len__(self) -> int:
+        return len(self.object_list)
+
+    @property
+    def has_next(self) -> bool:
+        """Whether or not there's a page after this one."""
+        return self.next_cursor is not None
+
+
+class KeysetPaginator:
+    """
+    Paginates a queryset by seeking past the last object of the previous page, instead of with ``OFFSET``.
+
+    Every page costs the same single query no matter how deep it is, and nothing is counted. Pages are read forwards only, from opaque cursors returned with each page.
+
+    """
+
+    def __init__(
+        self,
+        queryset: QuerySet,
+        per_page: int,
+        ordering: Sequence[str] = ("-end_datetime", "-id"),
+    ) -> None:
+        """
+        Sets :py:attr:`queryset`, :py:attr:`per_page` and :py:attr:`ordering`.
+
+        :param queryset: A queryset to paginate.
+        :type queryset: :py:obj:`~django.db.models.QuerySet`
+        :param per_page: Maximum number of objects per page.
+        :type per_page: :py:obj:`int`
+        :param ordering: Fields to order and seek by, prefixed with ``-`` for descending order. The last field must be unique. Default is ``("-end_datetime", "-id")``.
+        :type ordering: :py:obj:`~collections.abc.Sequence`
+        :returns: Nothing.
+        :rtype: :py:obj:`None`
+
+        """
+        self.queryset = queryset.order_by(*ordering)
+        self.per_page = per_page
+        self.ordering = tuple(ordering)
+        self.fields = [
+            queryset.model._meta.get_field(name.removeprefix("-"))
+            for name in self.ordering
+        ]
+
+    def encode_cursor(self, obj: Model) -> str:
+        """
+        Returns a cursor pointing just after an object.
+
+        :param obj: The last object on a page.
+        :type obj: :py:obj:`~django.db.models.Model`
+        :returns: An opaque, URL-safe cursor.
+        :rtype: :py:obj:`str`
+
+        """
+        values = [field.value_to_string(obj) for field in self.fields]
+        return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+    def decode_cursor(self, cursor: str) -> list[Any]:
+        """
+        Returns the ordering field values a cursor points after.
+
+        :param cursor: A cursor returned by :py:meth:`encode_cursor`.
+        :type cursor: :py:obj:`str`
+        :raises InvalidCursor: If the cursor can't be decoded.
+        :returns: A value for each ordering field.
+        :rtype: :py:obj:`list`
+
+        """
+        try:
+            values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            if not isinstance(values, list) or len(values) != len(self.fields):
+                raise ValueError("Wrong number of cursor values")
+            return [field.to_python(value) for field, value in zip(self.fields, values)]
+        except Exception as e:
+            raise InvalidCursor(f"Invalid cursor '{cursor}'") from e
+
+    def seek(self, cursor: str | None) -> QuerySet:
+        """
+        Returns the queryset filtered to objects after a cursor.
+
+        :param cursor: A cursor, or :py:obj:`None` to start from the first object.
+        :type cursor: :py:obj:`str` | :py:obj:`None`
+        :raises InvalidCursor: If the cursor can't be decoded.
+        :returns: A filtered queryset, limited to one more object than a page.
+        :rtype: :py:obj:`~django.db.models.QuerySet`
+
+        """
+        queryset = self.queryset
+        if cursor:
+            values = self.decode_cursor(cursor)
+            # (a, b) after (x, y) is "a after x, or a equals x and b after y"
+            after, equal = Q(), Q()
+            for name, value in zip(self.ordering, values):
+                lookup = "lt" if name.startswith("-") else "gt"
+                name = name.removeprefix("-")
+                after |= equal & Q(**{f"{name}__{lookup}": value})
+                equal &= Q(**{name: value})
+            queryset = queryset.filter(after)
+        # Read one extra object to tell whether there's a next page
+        return queryset[: self.per_page + 1]
+
+    def get_page(self, cursor: str | None = None) -> KeysetPage:
+        """
+        Returns the page after a cursor.
+
+        :param cursor: A cursor, or :py:obj:`None` for the first page. Default is :py:obj:`None`.
+        :type cursor: :py:obj:`str` | :py:obj:`None`
+        :raises InvalidCursor: If the cursor can't be decoded.
+        :returns: A page of objects.
+        :rtype: :py:obj:`~terminusgps_timekeeper.pagination.KeysetPage`
+
+        """
+        return self._build_page(list(self.seek(cursor)))
+
+    async def aget_page(self, cursor: str | None = None) -> KeysetPage:
+        """Async version of :py:meth:`get_page`."""
+        return self._build_page([obj async for obj in self.seek(cursor)])
+
+    def _build_page(self, objects: list[Model]) -> KeysetPage:
+        if len(objects) <= self.per_page:
+            return KeysetPage(objects)
+        objects = objects[: self.per_page]
+        return KeysetPage(objects, next_cursor=self.encode_cursor(objects[-1]))
@@ -1,52 +1,96 @@
-import datetime
+import concurrent.futures
 import io
+import multiprocessing
 import os
 import pathlib
 
-import matplotlib
-import matplotlib.pyplot as plt
-
 from django.conf import settings
-from django.db.models import Sum
 from django.utils import timezone
+from django.utils.functional import cached_property
 
 from reportlab import platypus
 from reportlab.lib import colors
 from reportlab.lib import pagesizes
 from reportlab.lib import styles
 from reportlab.lib import units
-from terminusgps_timekeeper.models import Employee, Report
+from terminusgps_timekeeper.charts import (
+    CHART_BACKENDS,
+    draw_weekday_chart,
+    render_employee_section,
+    render_weekday_chart,
+)
+from terminusgps_timekeeper.datasets import EmployeeReportData, ReportDataset
+from terminusgps_timekeeper.models import Report
+from terminusgps_timekeeper.profiling import ReportProfile
 from terminusgps_timekeeper.utils import display_duration
 
-matplotlib.use("agg")  # Forces matplotlib to run non-interactively
-
 
-def generate_report_pdf(report: Report, author: str | None = None) -> io.BytesIO:
+def generate_report_pdf(
+    report: Report, author: str | None = None, profile: ReportProfile | None = None
+) -> io.BytesIO:
     """
     Generates a pdf file for the provided report and saves it.
 
     :param report: A report.
     :type report: :py:obj:`~terminusgps_timekeeper.models.Report`
+    :param author: An optional pdf author.
+    :type author: :py:obj:`str` | :py:obj:`None`
+    :param profile: An optional profile to record generation stages in.
+    :type profile: :py:obj:`~terminusgps_timekeeper.profiling.ReportProfile` | :py:obj:`None`
     :returns: The report, with a pdf file generated and saved for it.
     :rtype: :py:obj:`~terminusgps_timekeeper.models.Report`
 
     """
-    return PDFReportGenerator(report, author).generate()
+    return PDFReportGenerator(report, author, profile=profile).generate()
 
 
 class PDFReportGenerator:
     """A generator class for report pdf files."""
 
-    def __init__(self, report: Report, author: str | None = None) -> None:
+    def __init__(
+        self,
+        report: Report,
+        author: str | None = None,
+        workers: int | None = None,
+        dataset: ReportDataset | None = None,
+        chart_backend: str | None = None,
+        profile: ReportProfile | None = None,
+    ) -> None:
         """
         Generates basic styles, sets :py:attr:`elements` to any empty list, sets :py:attr:`report` to the provided report and generates a filename for the pdf file.
 
         :param report: A report.
         :type report: :py:obj:`~terminusgps_timekeeper.models.Report`
+        :param author: An optional pdf author.
+        :type author: :py:obj:`str` | :py:obj:`None`
+        :param workers: Number of processes used to render employee sections. Default is :confval:`TIMEKEEPER_REPORT_WORKERS`.
+        :type workers: :py:obj:`int` | :py:obj:`None`
+        :param dataset: Optional pre-loaded report data. Default is loaded from :py:attr:`report` on first access.
+        :type dataset: :py:obj:`~terminusgps_timekeeper.datasets.ReportDataset` | :py:obj:`None`
+        :param chart_backend: ``"reportlab"`` or ``"matplotlib"``. Default is :confval:`TIMEKEEPER_REPORT_CHART_BACKEND`.
+        :type chart_backend: :py:obj:`str` | :py:obj:`None`
+        :param profile: Optional profile to record generation stages in. Default is a new profile.
+        :type profile: :py:obj:`~terminusgps_timekeeper.profiling.ReportProfile` | :py:obj:`None`
+        :raises ValueError: If the chart backend is invalid.
         :returns: Nothing.
         :rtype: :py:obj:`None`
 
         """
+        if workers is None:
+            workers = getattr(settings, "TIMEKEEPER_REPORT_WORKERS", 1)
+        if chart_backend is None:
+            chart_backend = getattr(
+                settings, "TIMEKEEPER_REPORT_CHART_BACKEND", "reportlab"
+            )
+        if chart_backend not in CHART_BACKENDS:
+            raise ValueError(f"Invalid chart backend: '{chart_backend}'.")
+        if dataset is not None:
+            self.dataset = dataset
+        self.workers: int = max(workers, 1)
+        self.chart_backend: str = chart_backend
+        self.profile: ReportProfile = (
+            profile if profile is not None else ReportProfile()
+        )
         self.filename: str = (
             f"report_{report.pk}_{report.start_date}_{report.end_date}.pdf"
         )
@@ -89,6 +133,11 @@ class PDFReportGenerator:
         """Returns a path to the Terminus GPS logo."""
         return settings.BASE_DIR / "static" / "src" / "img" / "logo.png"
 
+    @cached_property
+    def dataset(self) -> ReportDataset:
+        """All shift data for :py:attr:`report`, loaded on first access."""
+        return ReportDataset(self.report)
+
     @property
     def report_period(self) -> str:
         """Shortcut property for :py:meth:`get_report_period`"""
@@ -135,18 +184,7 @@ class PDFReportGenerator:
         :rtype: :py:obj:`dict`
 
         """
-        return {
-            str(employee): (
-                self.report.shifts.filter(employee=employee).aggregate(
-                    total=Sum("duration")
-                )["total"]
-                or datetime.timedelta(0)
-            ).total_seconds()
-            / 3600
-            for employee in Employee.objects.filter(
-                shifts__in=self.report.shifts
-            ).distinct()
-        }
+        return self.dataset.employee_hours
 
     def add_spacer(
         self, width: float = 1, height: float = 0.25, unit: float = units.inch
@@ -276,15 +314,22 @@ class PDFReportGenerator:
         """
         Generates a PDF file based on :py:attr:`report` and returns it.
 
+        Each stage is recorded in :py:attr:`profile`: loading the dataset, the cover page, the overview page, each employee's chart and table, and building the document.
+
         :returns: A PDF file data stream.
         :rtype: :py:obj:`~io.BytesIO`
 
         """
-        self._add_cover_page()
-        self._add_overview_page()
+        with self.profile.stage("dataset"):
+            self.dataset
+        with self.profile.stage("cover"):
+            self._add_cover_page()
+        with self.profile.stage("overview"):
+            self._add_overview_page()
         self._add_employee_shift_tables()
 
-        self.doc.build(self.elements)
+        with self.profile.stage("build"):
+            self.doc.build(self.elements)
         self.buffer.seek(0)
         return self.buffer
 
@@ -361,7 +406,7 @@ class PDFReportGenerator:
         """
         self.add_paragraph("Employee Hours", self.styles["Heading1"])
         self.add_spacer(1, 0.5)
-        if not self.report.shifts.exists():
+        if not self.dataset:
             self.add_paragraph(
                 "No shifts recorded for this period.", self.styles["Normal"]
             )
@@ -394,96 +439,102 @@ class PDFReportGenerator:
         """
         Adds an employee shift table to the document.
 
+        Sections rendered in a process pool are recorded in :py:attr:`profile` as a single ``"sections"`` stage, otherwise each employee's chart and table are recorded as their own stages.
+
         :returns: Nothing.
         :rtype: :py:obj:`None`
 
         """
-        if not self.report.shifts.exists():
-            return
-
-        employees = (
-            Employee.objects.filter(shifts__in=self.report.shifts)
-            .distinct()
-            .order_by("user__username")
-        )
-        for employee in employees:
-            employee_shifts = self.report.shifts.filter(employee=employee)
-            self.add_paragraph(f"Shift Report: {employee}", self.styles["Heading2"])
+        employees = self.dataset.employees
+        if self._uses_process_pool(employees):
+            with self.profile.stage("sections"):
+                sections = self._render_employee_sections(employees)
+        else:
+            sections = [(None, None)] * len(employees)
+        for i, (data, (chart, rows)) in enumerate(zip(employees, sections)):
+            self.add_paragraph(f"Shift Report: {data.name}", self.styles["Heading2"])
             self.add_spacer(1, 0.25)
-            self._add_employee_weekly_pattern_chart(employee)
+            with self.profile.stage(f"chart: {data.name}"):
+                self._add_employee_weekly_pattern_chart(data, chart)
             self.add_spacer(1, 0.25)
-            data = [["Start Date/Time", "End Date/Time", "Duration"]]
-            total_duration = datetime.timedelta(0)
-
-            for shift in employee_shifts:
-                start_time = f"{shift.start_datetime:%Y-%m-%d %I:%M %p}"
-                end_time = f"{shift.end_datetime:%Y-%m-%d %I:%M %p}"
-                duration = shift.get_duration_display()
-                data.append([start_time, end_time, duration])
-                total_duration += shift.duration
-
-            data.append(["Total", "", display_duration(total_duration.total_seconds())])
-            self.add_table(data)
+            with self.profile.stage(f"table: {data.name}"):
+                self.add_table(data.get_table_rows() if rows is None else rows)
             self.add_spacer(1, 0.5)
 
-            if employee != employees.last():
+            if i < len(employees) - 1:
                 self.add_pagebreak()
 
-    def _add_employee_weekly_pattern_chart(self, employee: Employee) -> None:
+    def _render_employee_sections(
+        self, employees: list[EmployeeReportData]
+    ) -> list[tuple[bytes | None, list[list[str]]]]:
+        """
+        Renders a weekday chart and table rows for each employee.
+
+        Sections are rendered in a process pool when :py:attr:`workers` is greater than 1, and returned in the same order as ``employees``.
+
+        Vector charts are cheap to draw, so they are drawn in :py:meth:`_add_employee_weekly_pattern_chart` instead.
+
+        :param employees: A list of per-employee report data.
+        :type employees: :py:obj:`list`
+        :returns: A list of png images and table rows.
+        :rtype: :py:obj:`list`
+
+        """
+        if self.chart_backend != "matplotlib":
+            return [(None, data.get_table_rows()) for data in employees]
+
+        payloads = [
+            (data.name, data.weekday_hours, data.intervals) for data in employees
+        ]
+        if not self._uses_process_pool(employees):
+            return [render_employee_section(*payload) for payload in payloads]
+
+        with concurrent.futures.ProcessPoolExecutor(
+            max_workers=min(self.workers, len(payloads)),
+            mp_context=multiprocessing.get_context("spawn"),
+        ) as executor:
+            return list(executor.map(render_employee_section, *zip(*payloads)))
+
+    def _uses_process_pool(self, employees: list[EmployeeReportData]) -> bool:
+        """Whether or not :py:meth:`_render_employee_sections` renders the employees' sections in a process pool."""
+        return (
+            self.chart_backend == "matplotlib"
+            and self.workers > 1
+            and len(employees) > 1
+        )
+
+    def _add_employee_weekly_pattern_chart(
+        self, data: EmployeeReportData, chart: bytes | None = None
+    ) -> None:
         """
         Adds an employee weekly shift pattern chart to the document.
 
-        :param employee: An employee.
-        :type employee: :py:obj:`~terminusgps_timekeeper.models.Employee`
+        :param data: An employee's report data.
+        :type data: :py:obj:`~terminusgps_timekeeper.datasets.EmployeeReportData`
+        :param chart: An optional pre-rendered png image, only used by the ``"matplotlib"`` backend. Default is rendered in-process.
+        :type chart: :py:obj:`bytes` | :py:obj:`None`
         :returns: Nothing.
         :rtype: :py:obj:`None`
 
         """
-        shifts = self.report.shifts.filter(employee=employee)
-        if not shifts.exists():
+        if not data.shifts:
             self.add_paragraph(
-                f"No shift data available for {employee} in this period.",
+                f"No shift data available for {data.name} in this period.",
                 self.styles["Normal"],
             )
             return
 
-        days = [
-            "Monday",
-            "Tuesday",
-            "Wednesday",
-            "Thursday",
-            "Friday",
-            "Saturday",
-            "Sunday",
-        ]
-        day_totals = {day: 0 for day in days}
-
-        for shift in shifts:
-            day_name = shift.start_datetime.strftime("%A")
-            hours = shift.duration.total_seconds() / 3600
-            day_totals[day_name] += hours
-
-        plt.figure(figsize=(8, 4))
-        bars = plt.bar(days, [day_totals[day] for day in days], color="skyblue")
-        for bar in bars:
-            height = bar.get_height()
-            if height > 0:
-                plt.text(
-                    bar.get_x() + bar.get_width() / 2.0,
-                    height + 0.1,
-                    f"{height:.1f}h",
-                    ha="center",
-                    va="bottom",
+        title = f"Hours Worked by Day of Week: {data.name}"
+        if self.chart_backend == "reportlab":
+            self.elements.append(
+                draw_weekday_chart(
+                    title, data.weekday_hours, 7 * units.inch, 4 * units.inch
                 )
-        plt.title(f"Hours Worked by Day of Week: {employee}")
-        plt.xlabel("Day of Week")
-        plt.ylabel("Total Hours")
-        plt.xticks(rotation=45)
-        plt.ylim(top=30.0)
-        plt.tight_layout()
-        img_buffer = io.BytesIO()
-        plt.savefig(img_buffer, format="png", bbox_inches="tight")
-        img_buffer.seek(0)
-        plt.close()
+            )
+            return
 
+        if chart is None:
+            img_buffer = render_weekday_chart(title, data.weekday_hours)
+        else:
+            img_buffer = io.BytesIO(chart)
         self.add_image_buffer(img_buffer, width=7 * units.inch, height=4 * units.inch)
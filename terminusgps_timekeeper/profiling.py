@@ -0,0 +1,116 @@
+import contextlib
+import dataclasses
+import time
+import tracemalloc
+from collections.abc import Callable, Iterator
+from typing import Any
+
+from django.conf import settings
+from django.db import connection
+
+
+def get_trace_memory() -> bool:
+    """Returns whether or not report job profiles trace memory allocations."""
+    return bool(getattr(settings, "TIMEKEEPER_REPORT_PROFILE_MEMORY", False))
+
+
+@dataclasses.dataclass
+class StageProfile:
+    """Wall time, SQL and memory allocation of a single report generation stage."""
+
+    name: str
+    """Name of the stage, i.e. ``"cover"`` or ``"table: <EMPLOYEE>"``."""
+    wall_time: float = 0.0
+    """Seconds the stage took."""
+    queries: int = 0
+    """Number of SQL statements executed during the stage."""
+    sql_time: float = 0.0
+    """Seconds spent executing SQL during the stage."""
+    allocated: int | None = None
+    """Bytes allocated during the stage and still held at its end, or :py:obj:`None` if memory wasn't traced."""
+    peak: int | None = None
+    """Peak bytes allocated during the stage, or :py:obj:`None` if memory wasn't traced."""
+
+    def as_dict(self) -> dict[str, Any]:
+        """Returns the stage's timings in milliseconds and its allocations in bytes."""
+        return {
+            "name": self.name,
+            "wall_ms": round(self.wall_time * 1000, 1),
+            "queries": self.queries,
+            "sql_ms": round(self.sql_time * 1000, 1),
+            "allocated_bytes": self.allocated,
+            "peak_bytes": self.peak,
+        }
+
+
+@dataclasses.dataclass
+class ReportProfile:
+    """
+    Stage-by-stage profile of a report pdf file's generation.
+
+    Stages are recorded with :py:meth:`stage`. Memory is traced with :py:mod:`tracemalloc`, which slows generation down considerably, so it's only traced if :py:attr:`trace_memory` is set. Tracing is process-wide, so allocations made by other threads during a stage are counted too.
+
+    """
+
+    trace_memory: bool = False
+    """Whether or not to trace memory allocations. Default is :py:obj:`False`."""
+    stages: list[StageProfile] = dataclasses.field(default_factory=list)
+    """Recorded stages, in the order they started."""
+
+    @property
+    def wall_time(self) -> float:
+        """Seconds taken by every recorded stage."""
+        return sum(stage.wall_time for stage in self.stages)
+
+    @contextlib.contextmanager
+    def stage(self, name: str) -> Iterator[StageProfile]:
+        """
+        Records a stage's wall time, SQL statements and, if :py:attr:`trace_memory` is set, memory allocations.
+
+        Tracing is started for the stage if it wasn't already running. Tracing resets :py:mod:`tracemalloc`'s peak, so don't nest stages, or trace memory while something else is reading the peak.
+
+        :param name: Name of the stage.
+        :type name: :py:obj:`str`
+        :yields: The stage being recorded.
+        :rtype: :py:obj:`~collections.abc.Iterator`
+
+        """
+        profile = StageProfile(name)
+        self.stages.append(profile)
+
+        def record_query(
+            execute: Callable, sql: str, params: Any, many: bool, context: dict
+        ) -> Any:
+            start = time.perf_counter()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                profile.queries += 1
+                profile.sql_time += time.perf_counter() - start
+
+        started = self.trace_memory and not tracemalloc.is_tracing()
+        if started:
+            tracemalloc.start()
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        try:
+            with connection.execute_wrapper(record_query):
+                yield profile
+        finally:
+            profile.wall_time = time.perf_counter() - start
+            if self.trace_memory:
+                current, peak = tracemalloc.get_traced_memory()
+                profile.allocated = current - before
+                profile.peak = peak - before
+            if started:
+                tracemalloc.stop()
+
+    def as_dict(self) -> dict[str, Any]:
+        """Returns the profile as JSON-serializable data, with timings in milliseconds and allocations in bytes."""
+        return {
+            "wall_ms": round(self.wall_time * 1000, 1),
+            "trace_memory": self.trace_memory,
+            "stages": [stage.as_dict() for stage in self.stages],
+        }
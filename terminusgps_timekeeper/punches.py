@@ -0,0 +1,424 @@
+import dataclasses
+import datetime
+import uuid
+from collections.abc import Iterable
+
+from django.db import IntegrityError, transaction
+from django.db.models import Max, OuterRef, Subquery
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from terminusgps_timekeeper.events import derive_shifts
+from terminusgps_timekeeper.models import EmployeePunchCard, PunchBatch, PunchEvent
+
+
+@dataclasses.dataclass
+class BulkPunchResult:
+    """Outcome of a bulk punch."""
+
+    success: int = 0
+    """Number of employees punched in/out."""
+    skipped: int = 0
+    """Number of employees that were already punched in/out, or have no punch card."""
+
+
+def punch_in(
+    employee_id: int,
+    now: datetime.datetime | None = None,
+    source: str = PunchEvent.Source.WEB,
+) -> bool:
+    """
+    Punches an employee in, if they are currently punched out.
+
+    The punch card is flipped with a single conditional ``UPDATE ... WHERE punched_in = false``, so concurrent punches can't both succeed. A :py:obj:`~terminusgps_timekeeper.models.PunchEvent` is only recorded when the card changed.
+
+    :param employee_id: An employee id.
+    :type employee_id: :py:obj:`int`
+    :param now: Punch in time. Default is :py:func:`~django.utils.timezone.now`.
+    :type now: :py:obj:`~datetime.datetime` | :py:obj:`None`
+    :param source: Where the punch came from. Default is ``"web"``.
+    :type source: :py:obj:`str`
+    :returns: Whether or not the employee was punched in.
+    :rtype: :py:obj:`bool`
+
+    """
+    now = now or timezone.now()
+    with transaction.atomic():
+        updated = EmployeePunchCard.objects.filter(
+            employee_id=employee_id, punched_in=False
+        ).update(punched_in=True, _prev_punch_state=True, last_punch_in_time=now)
+        if updated:
+            record_punch_events([employee_id], PunchEvent.Direction.IN, now, source)
+    return bool(updated)
+
+
+def punch_out(
+    employee_id: int,
+    now: datetime.datetime | None = None,
+    source: str = PunchEvent.Source.WEB,
+) -> bool:
+    """
+    Punches an employee out, if they are currently punched in.
+
+    The punch card is flipped with a conditional ``UPDATE`` that also matches the punch in time that was read, and a :py:obj:`~terminusgps_timekeeper.models.PunchEvent` is only recorded when that ``UPDATE`` changed a row. A concurrent punch out, or a punch out racing a new punch in, can't record a duplicate punch out.
+
+    Cards punched in without a punch in event, i.e. before punch events were recorded, get one at :py:attr:`~terminusgps_timekeeper.models.EmployeePunchCard.last_punch_in_time` first, so the punch out still derives a shift.
+
+    The employee's shift is derived from the event once the transaction commits.
+
+    :param employee_id: An employee id.
+    :type employee_id: :py:obj:`int`
+    :param now: Punch out time. Default is :py:func:`~django.utils.timezone.now`.
+    :type now: :py:obj:`~datetime.datetime` | :py:obj:`None`
+    :param source: Where the punch came from. Default is ``"web"``.
+    :type source: :py:obj:`str`
+    :returns: Whether or not the employee was punched out.
+    :rtype: :py:obj:`bool`
+
+    """
+    with transaction.atomic():
+        start, latest_direction = (
+            EmployeePunchCard.objects.filter(employee_id=employee_id, punched_in=True)
+            .annotate(latest_direction=_latest_direction())
+            .values_list("last_punch_in_time", "latest_direction")
+            .first()
+        ) or (None, None)
+        if start is None:
+            return False
+        # Read the clock after the punch in time, so a punch out that waited on a lock can't end before it started
+        now = max(now or timezone.now(), start)
+
+        updated = EmployeePunchCard.objects.filter(
+            employee_id=employee_id, punched_in=True, last_punch_in_time=start
+        ).update(punched_in=False, _prev_punch_state=False)
+        if updated:
+            if latest_direction != PunchEvent.Direction.IN:
+                _backfill_punch_ins({employee_id: start}, source)
+            record_punch_events([employee_id], PunchEvent.Direction.OUT, now, source)
+    return bool(updated)
+
+
+def set_punch_status(
+    employee_id: int,
+    punched_in: bool,
+    now: datetime.datetime | None = None,
+    source: str = PunchEvent.Source.WEB,
+) -> bool:
+    """
+    Punches an employee in or out.
+
+    :param employee_id: An employee id.
+    :type employee_id: :py:obj:`int`
+    :param punched_in: :py:obj:`True` to punch in, :py:obj:`False` to punch out.
+    :type punched_in: :py:obj:`bool`
+    :param now: Punch time. Default is :py:func:`~django.utils.timezone.now`.
+    :type now: :py:obj:`~datetime.datetime` | :py:obj:`None`
+    :param source: Where the punch came from. Default is ``"web"``.
+    :type source: :py:obj:`str`
+    :returns: Whether or not the punch card changed.
+    :rtype: :py:obj:`bool`
+
+    """
+    if punched_in:
+        return punch_in(employee_id, now, source)
+    return punch_out(employee_id, now, source)
+
+
+def bulk_punch_in(
+    employee_ids: Iterable[int],
+    now: datetime.datetime | None = None,
+    source: str = PunchEvent.Source.ADMIN,
+) -> BulkPunchResult:
+    """
+    Punches every punched out employee in with a single ``UPDATE``.
+
+    :param employee_ids: Employee ids.
+    :type employee_ids: :py:obj:`~collections.abc.Iterable`
+    :param now: Shared punch in time. Default is :py:func:`~django.utils.timezone.now`.
+    :type now: :py:obj:`~datetime.datetime` | :py:obj:`None`
+    :param source: Where the punches came from. Default is ``"admin"``.
+    :type source: :py:obj:`str`
+    :returns: Punched in and skipped employee counts.
+    :rtype: :py:obj:`~terminusgps_timekeeper.punches.BulkPunchResult`
+
+    """
+    employee_ids = set(employee_ids)
+    now = now or timezone.now()
+    with transaction.atomic():
+        punched_out = list(
+            EmployeePunchCard.objects.select_for_update()
+            .filter(employee_id__in=employee_ids, punched_in=False)
+            .values_list("employee_id", flat=True)
+        )
+        if punched_out:
+            EmployeePunchCard.objects.filter(
+                employee_id__in=punched_out, punched_in=False
+            ).update(punched_in=True, _prev_punch_state=True, last_punch_in_time=now)
+            record_punch_events(punched_out, PunchEvent.Direction.IN, now, source)
+    return BulkPunchResult(
+        success=len(punched_out), skipped=len(employee_ids) - len(punched_out)
+    )
+
+
+def bulk_punch_out(
+    employee_ids: Iterable[int],
+    now: datetime.datetime | None = None,
+    source: str = PunchEvent.Source.ADMIN,
+) -> BulkPunchResult:
+    """
+    Punches every punched in employee out.
+
+    Punched in cards are locked and flipped with a single ``UPDATE``, and every punch out event is recorded with one :py:meth:`~django.db.models.query.QuerySet.bulk_create` call at a shared timestamp. Their shifts are derived in bulk once the transaction commits. Cards punched in without a punch in event get one first, like in :py:func:`punch_out`.
+
+    :param employee_ids: Employee ids.
+    :type employee_ids: :py:obj:`~collections.abc.Iterable`
+    :param now: Shared punch out time. Default is :py:func:`~django.utils.timezone.now`.
+    :type now: :py:obj:`~datetime.datetime` | :py:obj:`None`
+    :param source: Where the punches came from. Default is ``"admin"``.
+    :type source: :py:obj:`str`
+    :returns: Punched out and skipped employee counts.
+    :rtype: :py:obj:`~terminusgps_timekeeper.punches.BulkPunchResult`
+
+    """
+    employee_ids = set(employee_ids)
+    with transaction.atomic():
+        cards = (
+            EmployeePunchCard.objects.select_for_update()
+            .filter(
+                employee_id__in=employee_ids,
+                punched_in=True,
+                last_punch_in_time__isnull=False,
+            )
+            .annotate(latest_direction=_latest_direction())
+            .values_list("employee_id", "last_punch_in_time", "latest_direction")
+        )
+        starts, unmatched = {}, {}
+        for employee_id, start, latest_direction in cards:
+            starts[employee_id] = start
+            if latest_direction != PunchEvent.Direction.IN:
+                unmatched[employee_id] = start
+        if not starts:
+            return BulkPunchResult(skipped=len(employee_ids))
+        now = max(now or timezone.now(), *starts.values())
+
+        EmployeePunchCard.objects.filter(
+            employee_id__in=starts, punched_in=True
+        ).update(punched_in=False, _prev_punch_state=False)
+        _backfill_punch_ins(unmatched, source)
+        record_punch_events(starts, PunchEvent.Direction.OUT, now, source)
+    return BulkPunchResult(success=len(starts), skipped=len(employee_ids) - len(starts))
+
+
+def record_punch_events(
+    employee_ids: Iterable[int],
+    direction: str,
+    timestamp: datetime.datetime,
+    source: str,
+) -> list[PunchEvent]:
+    """
+    Appends punch events for employees and derives shifts once the current transaction commits.
+
+    :param employee_ids: Employee ids.
+    :type employee_ids: :py:obj:`~collections.abc.Iterable`
+    :param direction: ``"in"`` or ``"out"``.
+    :type direction: :py:obj:`str`
+    :param timestamp: Punch time.
+    :type timestamp: :py:obj:`~datetime.datetime`
+    :param source: Where the punches came from.
+    :type source: :py:obj:`str`
+    :returns: The new punch events.
+    :rtype: :py:obj:`list`
+
+    """
+    events = PunchEvent.objects.bulk_create(
+        PunchEvent(
+            employee_id=employee_id,
+            direction=direction,
+            timestamp=timestamp,
+            source=source,
+        )
+        for employee_id in employee_ids
+    )
+    if direction == PunchEvent.Direction.OUT:
+        transaction.on_commit(derive_shifts, robust=True)
+    return events
+
+
+def parse_punch_events(data: object) -> list[PunchEvent]:
+    """
+    Parses a JSON array of punch events into unsaved punch events.
+
+    Each item must have an ``employee`` id, a ``direction`` of ``"in"`` or ``"out"`` and an ISO 8601 ``timestamp``. Timestamps without an offset are read in the current timezone.
+
+    :param data: Decoded JSON.
+    :type data: :py:obj:`object`
+    :raises ValueError: If any punch event is invalid.
+    :returns: A list of unsaved punch events, in the order they were sent.
+    :rtype: :py:obj:`list`
+
+    """
+    if not isinstance(data, list):
+        raise ValueError("Punch events must be a list.")
+
+    events = []
+    for i, item in enumerate(data):
+        if not isinstance(item, dict):
+            raise ValueError(f"Punch event #{i} must be an object.")
+        employee_id = item.get("employee")
+        if not isinstance(employee_id, int) or isinstance(employee_id, bool):
+            raise ValueError(f"Punch event #{i} has an invalid employee id.")
+        direction = item.get("direction")
+        if direction not in PunchEvent.Direction.values:
+            raise ValueError(f"Punch event #{i} has an invalid direction.")
+        try:
+            timestamp = parse_datetime(str(item.get("timestamp")))
+        except ValueError:
+            timestamp = None
+        if timestamp is None:
+            raise ValueError(f"Punch event #{i} has an invalid timestamp.")
+        if timezone.is_naive(timestamp):
+            timestamp = timezone.make_aware(timestamp)
+        events.append(
+            PunchEvent(
+                employee_id=employee_id, direction=direction, timestamp=timestamp
+            )
+        )
+    return events
+
+
+def ingest_punch_events(
+    token: uuid.UUID, events: list[PunchEvent], source: str = PunchEvent.Source.KIOSK
+) -> tuple[PunchBatch, bool]:
+    """
+    Applies a batch of punch events to punch cards and shifts in a single transaction.
+
+    Repeated events are dropped and the rest are applied in timestamp order. Events that don't change an employee's punch card, or are older than the employee's latest recorded punch, are skipped. Shifts for the batch are derived before the transaction commits.
+
+    Sending the same ``token`` again returns the original batch without applying anything.
+
+    :param token: An idempotency token.
+    :type token: :py:obj:`~uuid.UUID`
+    :param events: Unsaved punch events.
+    :type events: :py:obj:`list`
+    :param source: Where the punches came from. Default is ``"kiosk"``.
+    :type source: :py:obj:`str`
+    :returns: The batch, and whether or not it was applied by this call.
+    :rtype: :py:obj:`tuple`
+
+    """
+    existing = PunchBatch.objects.filter(token=token).first()
+    if existing is not None:
+        return existing, False
+
+    unique = order_punch_events(events)
+    try:
+        with transaction.atomic():
+            batch = PunchBatch.objects.create(
+                token=token,
+                source=source,
+                received=len(events),
+                duplicates=len(events) - len(unique),
+            )
+            applied = _apply_punch_events(unique, source)
+            batch.applied = len(applied)
+            batch.skipped = len(unique) - len(applied)
+            batch.save(update_fields=["applied", "skipped"])
+            if any(event.direction == PunchEvent.Direction.OUT for event in applied):
+                derive_shifts(batch_size=max(len(applied), 1000))
+    except IntegrityError:
+        # Another request applied the same token first
+        return PunchBatch.objects.get(token=token), False
+    return batch, True
+
+
+def order_punch_events(events: Iterable[PunchEvent]) -> list[PunchEvent]:
+    """
+    Drops repeated punch events and sorts the rest by timestamp.
+
+    Events with the same employee, direction and timestamp are repeats. Events with equal timestamps keep the order they were sent in.
+
+    :param events: Unsaved punch events.
+    :type events: :py:obj:`~collections.abc.Iterable`
+    :returns: Unique punch events in timestamp order.
+    :rtype: :py:obj:`list`
+
+    """
+    unique = {
+        (event.employee_id, event.direction, event.timestamp): event
+        for event in reversed(list(events))
+    }
+    return sorted(reversed(unique.values()), key=lambda event: event.timestamp)
+
+
+def _apply_punch_events(events: list[PunchEvent], source: str) -> list[PunchEvent]:
+    """Replays ordered events against locked punch cards, and records the events that changed one."""
+    employee_ids = {event.employee_id for event in events}
+    cards = {
+        card.employee_id: card
+        for card in EmployeePunchCard.objects.select_for_update()
+        .filter(employee_id__in=employee_ids)
+        .annotate(latest_direction=_latest_direction())
+        .only("pk", "employee_id", "punched_in", "last_punch_in_time")
+    }
+    latest = dict(
+        PunchEvent.objects.filter(employee_id__in=cards)
+        .values("employee_id")
+        .annotate(latest=Max("timestamp"))
+        .values_list("employee_id", "latest")
+    )
+
+    applied = []
+    unmatched = {}
+    for event in events:
+        card = cards.get(event.employee_id)
+        if card is None:
+            continue
+        last = latest.get(event.employee_id)
+        if last is not None and event.timestamp < last:
+            continue
+        if event.direction == PunchEvent.Direction.IN:
+            if card.punched_in:
+                continue
+            card.punched_in = card._prev_punch_state = True
+            card.last_punch_in_time = event.timestamp
+        else:
+            if not card.punched_in or card.last_punch_in_time is None:
+                continue
+            if card.latest_direction != PunchEvent.Direction.IN:
+                unmatched[card.employee_id] = card.last_punch_in_time
+            card.punched_in = card._prev_punch_state = False
+        card.latest_direction = event.direction
+        event.source = source
+        latest[event.employee_id] = event.timestamp
+        applied.append(event)
+
+    changed = {event.employee_id for event in applied}
+    EmployeePunchCard.objects.bulk_update(
+        [card for card in cards.values() if card.employee_id in changed],
+        ["punched_in", "_prev_punch_state", "last_punch_in_time"],
+        batch_size=500,
+    )
+    _backfill_punch_ins(unmatched, source)
+    return PunchEvent.objects.bulk_create(applied, batch_size=1000)
+
+
+def _latest_direction() -> Subquery:
+    """Returns an expression for the direction of a punch card's latest punch event, or ``NULL`` if it has none."""
+    return Subquery(
+        PunchEvent.objects.filter(employee_id=OuterRef("employee_id"))
+        .order_by("-pk")
+        .values("direction")[:1]
+    )
+
+
+def _backfill_punch_ins(starts: dict[int, datetime.datetime], source: str) -> None:
+    """Records punch in events for cards that were punched in without one, so their punch outs derive a shift."""
+    PunchEvent.objects.bulk_create(
+        PunchEvent(
+            employee_id=employee_id,
+            direction=PunchEvent.Direction.IN,
+            timestamp=start,
+            source=source,
+        )
+        for employee_id, start in starts.items()
+    )
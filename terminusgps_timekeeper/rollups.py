@@ -0,0 +1,238 @@
+import collections
+import datetime
+import itertools
+from collections.abc import Iterable
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from terminusgps_timekeeper.intervals import (
+    aggregate_intervals,
+    split_interval,
+    split_intervals,
+)
+from terminusgps_timekeeper.models import EmployeeDailyHours, EmployeeShift
+
+VECTORIZE_MIN_SHIFTS: int = 50
+"""Fewest shifts worth splitting with :py:func:`~terminusgps_timekeeper.intervals.split_intervals`. Building arrays costs more than splitting a few shifts one at a time, which matters on every punch out."""
+
+ShiftInterval = tuple[int, datetime.datetime, datetime.datetime, datetime.timedelta]
+"""An employee id, shift start, shift end and shift duration."""
+
+
+def get_shift_interval(shift: EmployeeShift) -> ShiftInterval:
+    """
+    Returns the shift as a :py:obj:`ShiftInterval`.
+
+    :param shift: A shift.
+    :type shift: :py:obj:`~terminusgps_timekeeper.models.EmployeeShift`
+    :returns: An employee id, shift start, shift end and shift duration.
+    :rtype: :py:obj:`tuple`
+
+    """
+    return (shift.employee_id, shift.start_datetime, shift.end_datetime, shift.duration)
+
+
+def get_shift_days(
+    start: datetime.datetime, end: datetime.datetime, duration: datetime.timedelta
+) -> dict[datetime.date, float]:
+    """
+    Returns the seconds a shift contributes to each local date.
+
+    The shift is split at local midnight, so overnight shifts count towards every date they were worked on. See :py:func:`~terminusgps_timekeeper.intervals.split_intervals`.
+
+    :param start: Start of the shift.
+    :type start: :py:obj:`~datetime.datetime`
+    :param end: End of the shift.
+    :type end: :py:obj:`~datetime.datetime`
+    :param duration: Duration of the shift.
+    :type duration: :py:obj:`~datetime.timedelta`
+    :returns: Seconds worked, keyed by local date.
+    :rtype: :py:obj:`dict`
+
+    """
+    return split_interval(start, end, duration)
+
+
+def get_daily_deltas(
+    intervals: Iterable[ShiftInterval], sign: int = 1, chunk_size: int = 100_000
+) -> dict[tuple[int, datetime.date], list[float]]:
+    """
+    Sums seconds and shift counts for each employee and local date.
+
+    Shifts are split at local midnight in vectorized chunks, so overnight shifts count towards every date they were worked on. Chunks smaller than :py:data:`VECTORIZE_MIN_SHIFTS` are split one shift at a time instead.
+
+    :param intervals: Shift intervals.
+    :type intervals: :py:obj:`~collections.abc.Iterable`
+    :param sign: ``1`` to add the shifts, ``-1`` to remove them.
+    :type sign: :py:obj:`int`
+    :param chunk_size: Number of shifts to split at a time. Default is ``100_000``.
+    :type chunk_size: :py:obj:`int`
+    :returns: Seconds and shift counts, keyed by employee id and local date.
+    :rtype: :py:obj:`dict`
+
+    """
+    deltas: dict[tuple[int, datetime.date], list[float]] = collections.defaultdict(
+        lambda: [0.0, 0]
+    )
+    intervals = iter(intervals)
+    while chunk := list(itertools.islice(intervals, chunk_size)):
+        if len(chunk) < VECTORIZE_MIN_SHIFTS:
+            for employee_id, start, end, duration in chunk:
+                for date, seconds in get_shift_days(start, end, duration).items():
+                    delta = deltas[(employee_id, date)]
+                    delta[0] += sign * seconds
+                    delta[1] += sign
+            continue
+
+        employee_ids, starts, ends, durations = zip(*chunk)
+        totals = aggregate_intervals(
+            split_intervals(starts, ends, durations, keys=employee_ids)
+        )
+        for key, seconds, count in zip(
+            totals.index, totals["seconds"].tolist(), totals["count"].tolist()
+        ):
+            delta = deltas[key]
+            delta[0] += sign * seconds
+            delta[1] += sign * count
+    return deltas
+
+
+def apply_shift_hours(intervals: Iterable[ShiftInterval], sign: int = 1) -> None:
+    """
+    Incrementally adds shifts to, or removes shifts from, the daily hours rollup.
+
+    A single row is updated in place with ``F()`` expressions. Larger batches lock the affected rows and update them with one :py:meth:`~django.db.models.query.QuerySet.bulk_update` call. Either way, concurrent updates don't lose hours.
+
+    :param intervals: Shift intervals.
+    :type intervals: :py:obj:`~collections.abc.Iterable`
+    :param sign: ``1`` to add the shifts, ``-1`` to remove them.
+    :type sign: :py:obj:`int`
+    :returns: Nothing.
+    :rtype: :py:obj:`None`
+
+    """
+    deltas = get_daily_deltas(intervals, sign)
+    if not deltas:
+        return
+
+    with transaction.atomic():
+        if len(deltas) == 1:
+            updated = {
+                key
+                for key, (seconds, count) in deltas.items()
+                if _increment(*key, seconds, count)
+            }
+        else:
+            updated = _bulk_increment(deltas)
+
+        if sign > 0:
+            missing = [
+                EmployeeDailyHours(
+                    employee_id=employee_id,
+                    date=date,
+                    seconds=seconds,
+                    shift_count=count,
+                )
+                for (employee_id, date), (seconds, count) in deltas.items()
+                if (employee_id, date) not in updated
+            ]
+            if missing:
+                _create_missing(missing)
+        else:
+            employee_ids = {employee_id for employee_id, _ in deltas}
+            dates = {date for _, date in deltas}
+            EmployeeDailyHours.objects.filter(
+                employee_id__in=employee_ids, date__in=dates, shift_count=0
+            ).delete()
+
+
+def rebuild_daily_hours(
+    employee_ids: Iterable[int] | None = None, chunk_size: int = 10_000
+) -> int:
+    """
+    Rebuilds the daily hours rollup from scratch.
+
+    :param employee_ids: Optional employee ids to rebuild. Default is every employee.
+    :type employee_ids: :py:obj:`~collections.abc.Iterable` | :py:obj:`None`
+    :param chunk_size: Number of shifts to read from the database at a time.
+    :type chunk_size: :py:obj:`int`
+    :returns: Number of rollup rows created.
+    :rtype: :py:obj:`int`
+
+    """
+    rollups = EmployeeDailyHours.objects.all()
+    shifts = EmployeeShift.objects.all()
+    if employee_ids is not None:
+        employee_ids = list(employee_ids)
+        rollups = rollups.filter(employee_id__in=employee_ids)
+        shifts = shifts.filter(employee_id__in=employee_ids)
+
+    intervals = shifts.values_list(
+        "employee_id", "start_datetime", "end_datetime", "duration"
+    ).iterator(chunk_size=chunk_size)
+    deltas = get_daily_deltas(intervals)
+
+    with transaction.atomic():
+        rollups.delete()
+        EmployeeDailyHours.objects.bulk_create(
+            (
+                EmployeeDailyHours(
+                    employee_id=employee_id,
+                    date=date,
+                    seconds=seconds,
+                    shift_count=count,
+                )
+                for (employee_id, date), (seconds, count) in deltas.items()
+            ),
+            batch_size=1000,
+        )
+    return len(deltas)
+
+
+def _increment(
+    employee_id: int, date: datetime.date, seconds: float, count: int
+) -> bool:
+    """Adds to an existing rollup row and returns whether or not it existed."""
+    return bool(
+        EmployeeDailyHours.objects.filter(employee_id=employee_id, date=date).update(
+            seconds=F("seconds") + seconds, shift_count=F("shift_count") + count
+        )
+    )
+
+
+def _bulk_increment(
+    deltas: dict[tuple[int, datetime.date], list[float]],
+) -> set[tuple[int, datetime.date]]:
+    """Locks and adds to existing rollup rows in bulk, and returns the keys that existed."""
+    employee_ids = {employee_id for employee_id, _ in deltas}
+    dates = {date for _, date in deltas}
+    rows = [
+        row
+        for row in EmployeeDailyHours.objects.select_for_update().filter(
+            employee_id__in=employee_ids, date__in=dates
+        )
+        if (row.employee_id, row.date) in deltas
+    ]
+    for row in rows:
+        seconds, count = deltas[(row.employee_id, row.date)]
+        row.seconds += seconds
+        row.shift_count += count
+    EmployeeDailyHours.objects.bulk_update(
+        rows, ["seconds", "shift_count"], batch_size=500
+    )
+    return {(row.employee_id, row.date) for row in rows}
+
+
+def _create_missing(rows: list[EmployeeDailyHours]) -> None:
+    """Creates new rollup rows, falling back to increments if another writer created them first."""
+    try:
+        with transaction.atomic():
+            EmployeeDailyHours.objects.bulk_create(rows)
+    except IntegrityError:
+        for row in rows:
+            try:
+                with transaction.atomic():
+                    row.save(force_insert=True)
+            except IntegrityError:
+                _increment(row.employee_id, row.date, row.seconds, row.shift_count)
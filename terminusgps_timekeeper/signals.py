@@ -1,10 +1,94 @@
+import functools
+
+from django.db import transaction
 from django.dispatch import receiver
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.utils import timezone
 
-from terminusgps_timekeeper.models import Employee, EmployeePunchCard
+from terminusgps_timekeeper.artifacts import invalidate_report_artifacts
+from terminusgps_timekeeper.kiosk import invalidate_code_cache
+from terminusgps_timekeeper.models import Employee, EmployeePunchCard, EmployeeShift
+from terminusgps_timekeeper.rollups import apply_shift_hours, get_shift_interval
 
 
 @receiver(post_save, sender=Employee)
 def create_punch_card(sender, instance, created, raw, using, update_fields, **kwargs):
     if not EmployeePunchCard.objects.filter(employee=instance).exists():
         EmployeePunchCard.objects.create(employee=instance)
+
+
+@receiver(pre_save, sender=Employee)
+def remember_previous_code(sender, instance, raw, update_fields, **kwargs):
+    instance._previous_code_digest = None
+    if instance.pk and not raw:
+        if update_fields is not None and "code_digest" not in update_fields:
+            instance._previous_code_digest = instance.code_digest
+            return
+        instance._previous_code_digest = (
+            Employee.objects.filter(pk=instance.pk)
+            .values_list("code_digest", flat=True)
+            .first()
+        )
+
+
+@receiver(post_save, sender=Employee)
+def invalidate_employee_codes(sender, instance, created, **kwargs):
+    previous = getattr(instance, "_previous_code_digest", None)
+    if created or previous != instance.code_digest:
+        invalidate_code_cache()
+
+
+@receiver(post_delete, sender=Employee)
+def forget_employee_code(sender, instance, **kwargs):
+    if instance.code_digest:
+        invalidate_code_cache()
+
+
+@receiver(post_save, sender=EmployeeShift)
+@receiver(post_delete, sender=EmployeeShift)
+def invalidate_shift_reports(sender, instance, **kwargs):
+    start = timezone.localtime(instance.start_datetime).date()
+    end = timezone.localtime(instance.end_datetime).date()
+    # Invalidating before the commit would let a concurrent request cache a pdf file of the old shifts
+    transaction.on_commit(functools.partial(invalidate_report_artifacts, start, end))
+
+
+@receiver(post_save, sender=EmployeeShift)
+def invalidate_previous_shift_reports(sender, instance, created, raw, **kwargs):
+    previous = getattr(instance, "_previous_interval", None)
+    if raw or previous is None:
+        return
+    _, start, end, _ = previous
+    transaction.on_commit(
+        functools.partial(
+            invalidate_report_artifacts,
+            timezone.localtime(start).date(),
+            timezone.localtime(end).date(),
+        )
+    )
+
+
+@receiver(pre_save, sender=EmployeeShift)
+def remember_previous_shift(sender, instance, raw, **kwargs):
+    instance._previous_interval = None
+    if instance.pk and not raw:
+        instance._previous_interval = (
+            EmployeeShift.objects.filter(pk=instance.pk)
+            .values_list("employee_id", "start_datetime", "end_datetime", "duration")
+            .first()
+        )
+
+
+@receiver(post_save, sender=EmployeeShift)
+def update_daily_hours(sender, instance, created, raw, **kwargs):
+    if raw:
+        return
+    previous = getattr(instance, "_previous_interval", None)
+    if previous is not None:
+        apply_shift_hours([previous], sign=-1)
+    apply_shift_hours([get_shift_interval(instance)])
+
+
+@receiver(post_delete, sender=EmployeeShift)
+def remove_daily_hours(sender, instance, **kwargs):
+    apply_shift_hours([get_shift_interval(instance)], sign=-1)
@@ -0,0 +1,159 @@
+import asyncio
+import json
+import logging
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db.models import Max
+from django.template.loader import render_to_string
+
+from terminusgps_timekeeper.models import PunchEvent
+
+logger = logging.getLogger(__name__)
+
+ROW_TEMPLATE: str = "terminusgps_timekeeper/employees/partials/_list_row.html"
+"""Template rendered for each punch state change."""
+
+
+def get_stream_interval() -> float:
+    """Returns how many seconds the punch stream waits between punch event polls."""
+    return float(getattr(settings, "TIMEKEEPER_PUNCH_STREAM_INTERVAL", 1.0))
+
+
+def get_latest_event_id() -> int:
+    """Returns the id of the latest punch event, or ``0`` if there are none."""
+    return PunchEvent.objects.aggregate(latest=Max("pk"))["latest"] or 0
+
+
+def get_punch_messages(last_event_id: int, limit: int = 500) -> tuple[list[str], int]:
+    """
+    Returns server-sent event messages for punch events after an event id.
+
+    Only the latest event for each employee is sent. Each message carries the employee id, their new punch state, the punch time and their rendered employee list row.
+
+    :param last_event_id: Only send events after this id.
+    :type last_event_id: :py:obj:`int`
+    :param limit: Maximum number of events to read. Default is ``500``.
+    :type limit: :py:obj:`int`
+    :returns: Encoded messages, and the id of the last event read.
+    :rtype: :py:obj:`tuple`
+
+    """
+    events = list(
+        PunchEvent.objects.filter(pk__gt=last_event_id)
+        .select_related("employee__user")
+        .order_by("pk")[:limit]
+    )
+    if not events:
+        return [], last_event_id
+
+    latest = {event.employee_id: event for event in events}
+    messages = []
+    for event in latest.values():
+        punched_in = event.direction == PunchEvent.Direction.IN
+        data = {
+            "employee": event.employee_id,
+            "punched_in": punched_in,
+            "timestamp": event.timestamp.isoformat(),
+            "html": render_to_string(
+                ROW_TEMPLATE, {"employee": event.employee, "punched_in": punched_in}
+            ),
+        }
+        messages.append(f"id: {event.pk}\nevent: punch\ndata: {json.dumps(data)}\n\n")
+    return messages, events[-1].pk
+
+
+class PunchStreamBroadcaster:
+    """
+    Fans punch state changes out to every connected punch stream in the process.
+
+    A single task polls for new punch events while at least one stream is subscribed, so idle connections never query the database.
+
+    """
+
+    queue_size: int = 100
+    """Maximum number of undelivered messages per subscriber. The oldest message is dropped when a slow subscriber's queue is full."""
+
+    def __init__(self) -> None:
+        self.subscribers: set[asyncio.Queue] = set()
+        self._task: asyncio.Task | None = None
+        self._ready: asyncio.Event | None = None
+        self._last_event_id: int | None = None
+
+    async def subscribe(self) -> asyncio.Queue:
+        """
+        Subscribes to punch state changes, starting the poller if it isn't running.
+
+        :returns: A queue that receives encoded server-sent event messages.
+        :rtype: :py:obj:`~asyncio.Queue`
+
+        """
+        loop = asyncio.get_running_loop()
+        if self._task is not None and self._task.get_loop() is not loop:
+            # Queues belong to the loop that created them, so start over on a new loop
+            self.subscribers.clear()
+            self._task = None
+            self._last_event_id = None
+
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        self.subscribers.add(queue)
+        if self._task is None or self._task.done():
+            self._ready = asyncio.Event()
+            self._task = loop.create_task(self._poll())
+        # Wait for the poller's starting point, so nothing after subscribing is missed
+        await self._ready.wait()
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue) -> None:
+        """
+        Unsubscribes a queue, stopping the poller once nothing is subscribed.
+
+        :param queue: A queue returned by :py:meth:`subscribe`.
+        :type queue: :py:obj:`~asyncio.Queue`
+        :returns: Nothing.
+        :rtype: :py:obj:`None`
+
+        """
+        self.subscribers.discard(queue)
+        if not self.subscribers and self._task is not None:
+            self._task.cancel()
+            self._task = None
+            self._last_event_id = None
+
+    def publish(self, message: str) -> None:
+        """
+        Sends a message to every subscriber.
+
+        :param message: An encoded server-sent event message.
+        :type message: :py:obj:`str`
+        :returns: Nothing.
+        :rtype: :py:obj:`None`
+
+        """
+        for queue in self.subscribers:
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(message)
+
+    async def _poll(self) -> None:
+        """Publishes new punch events until cancelled."""
+        try:
+            if self._last_event_id is None:
+                self._last_event_id = await sync_to_async(get_latest_event_id)()
+        finally:
+            self._ready.set()
+        while True:
+            try:
+                messages, self._last_event_id = await sync_to_async(get_punch_messages)(
+                    self._last_event_id
+                )
+            except Exception:
+                logger.exception("Failed to read punch events for streams")
+            else:
+                for message in messages:
+                    self.publish(message)
+            await asyncio.sleep(get_stream_interval())
+
+
+broadcaster = PunchStreamBroadcaster()
+"""The process-wide punch stream broadcaster."""
@@ -1,3 +1,2109 @@
-from django.test import TestCase
+import asyncio
+import concurrent.futures
+import contextlib
+import datetime
+import io
+import itertools
+import json
+import pathlib
+import random
+import tempfile
+import threading
+import uuid
+import zoneinfo
+from collections.abc import Callable
+from unittest import mock, skipUnless
 
-# Create your tests here.
+import openpyxl
+import pandas as pd
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import IntegrityError, OperationalError, connection, transaction
+from django.http import HttpResponse
+from asgiref.sync import sync_to_async
+from django.test import (
+    AsyncRequestFactory,
+    RequestFactory,
+    SimpleTestCase,
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+)
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from reportlab import platypus, rl_config
+from reportlab.graphics.shapes import Drawing
+
+from terminusgps_timekeeper.artifacts import (
+    get_period_directory,
+    get_report_directory,
+    get_report_pdf,
+    get_shift_fingerprint,
+    invalidate_report_artifacts,
+)
+from terminusgps_timekeeper.charts import render_weekday_chart
+from terminusgps_timekeeper.datasets import EmployeeReportData, ReportDataset
+from terminusgps_timekeeper.events import derive_shifts, replay_shifts
+from terminusgps_timekeeper.forms import EmployeeCreateForm, EmployeeSetFingerprintForm
+from terminusgps_timekeeper.imports import EmployeeImporter
+from terminusgps_timekeeper.intervals import (
+    aggregate_intervals,
+    split_interval,
+    split_intervals,
+)
+from terminusgps_timekeeper.jobs import ReportJobWorker, get_retry_delay
+from terminusgps_timekeeper.kiosk import get_employee_id_by_code
+from terminusgps_timekeeper.middleware import ServerTimingMiddleware
+from terminusgps_timekeeper.models import (
+    Employee,
+    EmployeeDailyHours,
+    EmployeePunchCard,
+    EmployeeShift,
+    PunchBatch,
+    PunchEvent,
+    PunchEventCheckpoint,
+    Report,
+    ReportJob,
+)
+from terminusgps_timekeeper.pagination import InvalidCursor, KeysetPaginator
+from terminusgps_timekeeper.pdf_generators import PDFReportGenerator
+from terminusgps_timekeeper.profiling import ReportProfile
+from terminusgps_timekeeper.punches import (
+    bulk_punch_in,
+    bulk_punch_out,
+    ingest_punch_events,
+    parse_punch_events,
+    punch_in,
+    punch_out,
+)
+from terminusgps_timekeeper.rollups import rebuild_daily_hours
+from terminusgps_timekeeper.streams import broadcaster
+from terminusgps_timekeeper.utils import hash_fingerprint_code
+from terminusgps_timekeeper.views import (
+    AsyncEmployeeDetailView,
+    AsyncShiftListView,
+    EmployeeDetailView,
+    ShiftListView,
+)
+
+
+def build_report_dataset(
+    employee_count: int, shift_count: int
+) -> tuple[Report, list[EmployeeReportData]]:
+    """Returns an unsaved report and in-memory employee data for it."""
+    tz = timezone.get_current_timezone()
+    start = datetime.datetime(2025, 3, 3, 8, tzinfo=tz)
+    report = Report(start_date=start.date(), end_date=start.date())
+    employees = []
+    for i in range(employee_count):
+        user = get_user_model()(username=f"employee{i}@terminusgps.com")
+        data = EmployeeReportData(Employee(user=user))
+        shifts = []
+        for day in range(shift_count):
+            shift_start = start + datetime.timedelta(days=day, minutes=17 * i)
+            duration = datetime.timedelta(hours=4 + (i + day) % 5)
+            shifts.append(
+                EmployeeShift(
+                    start_datetime=shift_start,
+                    end_datetime=shift_start + duration,
+                    duration=duration,
+                )
+            )
+        data.add_shifts(shifts)
+        employees.append(data)
+    report.end_date = (start + datetime.timedelta(days=shift_count)).date()
+    return report, employees
+
+
+class ThreadSafeReportRenderingTestCase(SimpleTestCase):
+    thread_count = 8
+
+    def setUp(self) -> None:
+        generated_at = datetime.datetime(2025, 3, 1, tzinfo=datetime.timezone.utc)
+        for patcher in (
+            mock.patch.object(timezone, "now", return_value=generated_at),
+            mock.patch.object(rl_config, "invariant", 1),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.datasets = [build_report_dataset(n, 7) for n in range(1, 4)]
+
+    @staticmethod
+    def render_report(report: Report, employees: list[EmployeeReportData]) -> bytes:
+        dataset = ReportDataset(report, employees=employees)
+        generator = PDFReportGenerator(
+            report, dataset=dataset, workers=1, chart_backend="matplotlib"
+        )
+        return generator.generate().getvalue()
+
+    def render_in_threads(self, fn, *iterables) -> list:
+        with concurrent.futures.ThreadPoolExecutor(self.thread_count) as executor:
+            return list(executor.map(fn, *iterables))
+
+    def test_charts_match_serial_output(self) -> None:
+        """Charts rendered on parallel threads are byte-identical to serial charts."""
+        charts = [
+            (data.name, data.weekday_hours)
+            for _, employees in self.datasets
+            for data in employees
+        ] * 2
+
+        def render(name, hours):
+            return render_weekday_chart(name, hours).getvalue()
+
+        serial = [render(name, hours) for name, hours in charts]
+        parallel = self.render_in_threads(render, *zip(*charts))
+        self.assertEqual(serial, parallel)
+
+    def test_reports_match_serial_output(self) -> None:
+        """Reports rendered on parallel threads are byte-identical to serial reports."""
+        datasets = self.datasets * 2
+        serial = [self.render_report(*dataset) for dataset in datasets]
+        parallel = self.render_in_threads(self.render_report, *zip(*datasets))
+        self.assertEqual(serial, parallel)
+
+
+class PDFReportGeneratorTestCase(SimpleTestCase):
+    def setUp(self) -> None:
+        generated_at = datetime.datetime(2025, 3, 1, tzinfo=datetime.timezone.utc)
+        for patcher in (
+            mock.patch.object(timezone, "now", return_value=generated_at),
+            mock.patch.object(rl_config, "invariant", 1),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.report, self.employees = build_report_dataset(3, 7)
+
+    def get_generator(self, **kwargs) -> PDFReportGenerator:
+        dataset = ReportDataset(self.report, employees=self.employees)
+        return PDFReportGenerator(self.report, dataset=dataset, **kwargs)
+
+    def test_process_pool_matches_serial_output(self) -> None:
+        """Employee sections rendered in a process pool produce the same pdf file as serial rendering."""
+        serial = self.get_generator(workers=1, chart_backend="matplotlib")
+        pooled = self.get_generator(workers=2, chart_backend="matplotlib")
+        with mock.patch(
+            "concurrent.futures.ProcessPoolExecutor",
+            wraps=concurrent.futures.ProcessPoolExecutor,
+        ) as executor:
+            pooled_pdf = pooled.generate().getvalue()
+        executor.assert_called_once()
+        self.assertEqual(executor.call_args.kwargs["max_workers"], 2)
+        self.assertEqual(pooled_pdf, serial.generate().getvalue())
+        self.assertIn("sections", [stage.name for stage in pooled.profile.stages])
+
+    def test_chart_backend_selection(self) -> None:
+        """The chart backend defaults to the setting, can be overridden, and decides how charts are embedded."""
+        with override_settings(TIMEKEEPER_REPORT_CHART_BACKEND="matplotlib"):
+            self.assertEqual(self.get_generator().chart_backend, "matplotlib")
+            self.assertEqual(
+                self.get_generator(chart_backend="reportlab").chart_backend, "reportlab"
+            )
+
+        for backend, flowable in [
+            ("reportlab", Drawing),
+            ("matplotlib", platypus.Image),
+        ]:
+            with self.subTest(backend=backend):
+                generator = self.get_generator(workers=1, chart_backend=backend)
+                # Building the document consumes its elements
+                with mock.patch.object(generator.doc, "build"):
+                    generator.generate()
+                charts = [
+                    element
+                    for element in generator.elements
+                    if isinstance(element, (Drawing, platypus.Image))
+                ]
+                # One chart per employee, plus the logo on the cover page
+                self.assertEqual(
+                    sum(isinstance(chart, flowable) for chart in charts),
+                    len(self.employees) + (flowable is platypus.Image),
+                )
+
+    def test_invalid_chart_backend(self) -> None:
+        """Unknown chart backends are rejected, whether they're passed in or set."""
+        with self.assertRaisesMessage(ValueError, "Invalid chart backend: 'svg'."):
+            self.get_generator(chart_backend="svg")
+        with override_settings(TIMEKEEPER_REPORT_CHART_BACKEND="svg"):
+            with self.assertRaisesMessage(ValueError, "Invalid chart backend: 'svg'."):
+                self.get_generator()
+
+
+class IntervalSplittingTestCase(SimpleTestCase):
+    def setUp(self) -> None:
+        self.tz = zoneinfo.ZoneInfo("America/Chicago")
+
+    def at(self, *args: int) -> datetime.datetime:
+        return datetime.datetime(*args, tzinfo=self.tz)
+
+    def test_shifts_split_at_local_midnight(self) -> None:
+        """Overnight shifts are split at local midnight, including across daylight saving time."""
+        frame = split_intervals(
+            [self.at(2025, 3, 3, 22), self.at(2025, 3, 8, 22), self.at(2025, 3, 4, 8)],
+            [self.at(2025, 3, 4, 6), self.at(2025, 3, 9, 6), self.at(2025, 3, 5)],
+            tz=self.tz,
+        )
+        hours = {
+            (row.interval, row.date.date()): row.seconds / 3600
+            for row in frame.itertuples()
+        }
+        self.assertEqual(
+            hours,
+            {
+                (0, datetime.date(2025, 3, 3)): 2,
+                (0, datetime.date(2025, 3, 4)): 6,
+                # Clocks skip 2am on March 9th
+                (1, datetime.date(2025, 3, 8)): 2,
+                (1, datetime.date(2025, 3, 9)): 5,
+                # Ending at midnight doesn't touch the next date
+                (2, datetime.date(2025, 3, 4)): 16,
+            },
+        )
+
+    def test_single_split_matches_vectorized_split(self) -> None:
+        """Splitting one interval at a time gives the same days as splitting them together."""
+        rng = random.Random(20)
+        # Spans both daylight saving time changes
+        base = self.at(2025, 3, 1)
+        starts = [
+            base + datetime.timedelta(minutes=rng.randrange(0, 60 * 24 * 300))
+            for _ in range(500)
+        ]
+        ends = [
+            start + datetime.timedelta(minutes=rng.randrange(0, 60 * 40))
+            for start in starts
+        ]
+        durations = [
+            rng.choice([None, end - start, datetime.timedelta(hours=3)])
+            for start, end in zip(starts, ends)
+        ]
+        frame = split_intervals(starts, ends, durations, tz=self.tz)
+        for i, days in enumerate(map(split_interval, starts, ends, durations)):
+            rows = frame[frame["interval"] == i]
+            self.assertEqual(list(days), rows["date"].dt.date.tolist())
+            for expected, seconds in zip(days.values(), rows["seconds"]):
+                self.assertAlmostEqual(expected, seconds, places=6)
+
+    def test_aggregate_by_period(self) -> None:
+        """Split shifts are summed by day, weekday and week."""
+        # Sunday night into Monday, and Monday of the next week
+        frame = split_intervals(
+            [self.at(2025, 3, 2, 20), self.at(2025, 3, 10, 8)],
+            [self.at(2025, 3, 3, 4), self.at(2025, 3, 10, 12)],
+            keys=[1, 1],
+            tz=self.tz,
+        )
+        weekdays = aggregate_intervals(frame, "weekday").loc[1]
+        self.assertEqual(weekdays["seconds"].to_dict(), {0: 8 * 3600, 6: 4 * 3600})
+        self.assertEqual(weekdays["count"].to_dict(), {0: 2, 6: 1})
+        weeks = aggregate_intervals(frame, "week").loc[1]["seconds"]
+        self.assertEqual(
+            weeks.to_dict(),
+            {
+                datetime.date(2025, 2, 24): 4 * 3600,
+                datetime.date(2025, 3, 3): 4 * 3600,
+                datetime.date(2025, 3, 10): 4 * 3600,
+            },
+        )
+        with self.assertRaises(ValueError):
+            aggregate_intervals(frame, "month")
+
+
+class EmployeeDailyHoursRollupTestCase(TestCase):
+    def setUp(self) -> None:
+        user = get_user_model().objects.create_user(username="rollup@terminusgps.com")
+        self.employee = Employee.objects.create(user=user, code="rollup")
+        self.start = datetime.datetime(
+            2025, 3, 3, 8, tzinfo=timezone.get_current_timezone()
+        )
+
+    def create_shift(self, days: int, hours: int) -> EmployeeShift:
+        start = self.start + datetime.timedelta(days=days)
+        return EmployeeShift.objects.create(
+            employee=self.employee,
+            start_datetime=start,
+            end_datetime=start + datetime.timedelta(hours=hours),
+        )
+
+    def get_rollup(self) -> list[tuple[datetime.date, float, int]]:
+        return list(
+            EmployeeDailyHours.objects.order_by("date").values_list(
+                "date", "seconds", "shift_count"
+            )
+        )
+
+    def test_punch_out_adds_hours(self) -> None:
+        """Punching out adds the new shift to the rollup."""
+        punch_in(self.employee.pk, now=timezone.now() - datetime.timedelta(hours=2))
+        card = EmployeePunchCard.objects.get(employee=self.employee)
+        card.punched_in = False
+        with self.captureOnCommitCallbacks(execute=True):
+            card.save()
+
+        daily = EmployeeDailyHours.objects.get(employee=self.employee)
+        self.assertEqual(daily.shift_count, 1)
+        self.assertAlmostEqual(daily.hours, 2, places=2)
+
+    def test_edits_and_deletes_update_hours(self) -> None:
+        """Editing and deleting shifts moves and removes their hours."""
+        first = self.create_shift(0, 4)
+        self.create_shift(0, 3)
+        self.assertEqual(self.get_rollup(), [(self.start.date(), 7 * 3600, 2)])
+
+        first.start_datetime += datetime.timedelta(days=1)
+        first.end_datetime += datetime.timedelta(days=1)
+        first.save()
+        next_day = self.start.date() + datetime.timedelta(days=1)
+        self.assertEqual(
+            self.get_rollup(),
+            [(self.start.date(), 3 * 3600, 1), (next_day, 4 * 3600, 1)],
+        )
+
+        first.delete()
+        self.assertEqual(self.get_rollup(), [(self.start.date(), 3 * 3600, 1)])
+
+    def test_overnight_shifts_split_across_dates(self) -> None:
+        """Overnight shifts add their hours to each date they were worked on."""
+        # 8pm to 4am
+        shift = self.create_shift(0, 8)
+        shift.start_datetime += datetime.timedelta(hours=12)
+        shift.end_datetime += datetime.timedelta(hours=12)
+        shift.save()
+        next_day = self.start.date() + datetime.timedelta(days=1)
+        self.assertEqual(
+            self.get_rollup(),
+            [(self.start.date(), 4 * 3600, 1), (next_day, 4 * 3600, 1)],
+        )
+
+        shift.delete()
+        self.assertEqual(self.get_rollup(), [])
+
+    def test_rebuild_matches_incremental_rollup(self) -> None:
+        """Rebuilding the rollup reproduces the incrementally maintained rows."""
+        for day in range(5):
+            self.create_shift(day, 4 + day % 3)
+            self.create_shift(day, 1)
+        incremental = self.get_rollup()
+
+        EmployeeDailyHours.objects.all().delete()
+        self.assertEqual(rebuild_daily_hours(chunk_size=3), 5)
+        self.assertEqual(self.get_rollup(), incremental)
+
+    def test_report_dataset_reads_rollup(self) -> None:
+        """Report datasets take their totals from the rollup."""
+        for day in range(3):
+            self.create_shift(day, 5)
+        report = Report.objects.create(
+            start_date=self.start.date(),
+            end_date=self.start.date() + datetime.timedelta(days=2),
+        )
+
+        with self.assertNumQueries(2):
+            dataset = ReportDataset(report)
+        (data,) = dataset.employees
+        self.assertEqual(data.hours, 15)
+        self.assertEqual(len(data.shifts), 3)
+        self.assertEqual(data.weekday_hours["Monday"], 5)
+
+
+class EmployeeImporterTestCase(TestCase):
+    def test_import_creates_employees_in_bulk(self) -> None:
+        """Valid rows are created in a constant number of queries."""
+        df = pd.DataFrame(
+            {
+                "Email": [f"import{i}@terminusgps.com" for i in range(50)],
+                "Phone": ["+15555555555"] * 50,
+                "Title": [None] * 50,
+            }
+        )
+        with self.assertNumQueries(7):
+            result = EmployeeImporter().import_dataframe(df)
+
+        self.assertTrue(result)
+        self.assertEqual(result.created, 50)
+        self.assertEqual(Employee.objects.count(), 50)
+        self.assertEqual(EmployeePunchCard.objects.count(), 50)
+        user = get_user_model().objects.get(username="import0@terminusgps.com")
+        self.assertFalse(user.has_usable_password())
+        self.assertEqual(user.employee.phone, "+15555555555")
+
+    def test_invalid_rows_are_reported(self) -> None:
+        """Invalid rows are reported by spreadsheet row without aborting the import."""
+        get_user_model().objects.create_user(username="taken@terminusgps.com")
+        csv = io.StringIO(
+            "Email,Phone,Title\n"
+            "good@terminusgps.com,,Tech\n"
+            "not-an-email,,\n"
+            "TAKEN@terminusgps.com,,\n"
+            "good@terminusgps.com,,\n"
+            "long@terminusgps.com,+1555555555555,\n"
+        )
+        result = EmployeeImporter().import_dataframe(pd.read_csv(csv, dtype=str))
+
+        self.assertEqual(result.created, 1)
+        self.assertEqual(
+            [(error.row, error.message) for error in result.errors],
+            [
+                (3, "Invalid email address."),
+                (4, "Email is taken."),
+                (5, "Duplicate email address."),
+                (6, "Phone number is too long."),
+            ],
+        )
+        self.assertEqual(Employee.objects.get().title, "Tech")
+
+    def test_import_file_streams_chunks(self) -> None:
+        """Csv and xlsx files are imported chunk by chunk with continuous row numbers."""
+        rows = [[f"stream{i}@terminusgps.com", None, "Tech"] for i in range(7)]
+        rows[5][0] = "not-an-email"
+
+        workbook = openpyxl.Workbook()
+        workbook.active.append(["Email", "Phone", "Title"])
+        for row in rows:
+            workbook.active.append(row)
+        xlsx = io.BytesIO()
+        workbook.save(xlsx)
+        csv = "Email,Phone,Title\n" + "".join(f"{row[0]},,Tech\n" for row in rows)
+
+        for name, content in (
+            ("employees.csv", csv.encode()),
+            ("employees.xlsx", xlsx.getvalue()),
+        ):
+            with self.subTest(name=name):
+                Employee.objects.all().delete()
+                get_user_model().objects.all().delete()
+                updates = []
+                result = EmployeeImporter().import_file(
+                    SimpleUploadedFile(name, content),
+                    chunk_size=3,
+                    progress=lambda result, rows: updates.append(
+                        (rows, result.created)
+                    ),
+                )
+
+                self.assertEqual(updates, [(3, 3), (6, 5), (7, 6)])
+                self.assertEqual([error.row for error in result.errors], [7])
+                self.assertEqual(Employee.objects.filter(title="Tech").count(), 6)
+
+    def test_invalid_columns_raise(self) -> None:
+        """Unknown columns are rejected before anything is imported."""
+        with self.assertRaises(ValueError):
+            EmployeeImporter().import_dataframe(pd.DataFrame({"Name": ["x"]}))
+
+
+class EmployeeCodeTestCase(TestCase):
+    def setUp(self) -> None:
+        user = get_user_model().objects.create_user(username="code@terminusgps.com")
+        self.employee = Employee.objects.create(user=user, code="first")
+
+    def test_digest_follows_code(self) -> None:
+        """The code digest is kept in sync whenever the code is saved, including with update_fields."""
+        self.assertEqual(self.employee.code_digest, hash_fingerprint_code("first"))
+
+        self.employee.code = "second"
+        self.employee.save(update_fields=["code"])
+        self.employee.refresh_from_db()
+        self.assertEqual(self.employee.code_digest, hash_fingerprint_code("second"))
+
+        self.employee.code = ""
+        self.employee.save()
+        self.employee.refresh_from_db()
+        self.assertIsNone(self.employee.code_digest)
+
+    def test_get_by_code(self) -> None:
+        """Employees are found by their current code only."""
+        self.assertEqual(Employee.objects.get_by_code("first"), self.employee)
+        for code in ["second", "", "FIRST"]:
+            with self.subTest(code=code), self.assertRaises(Employee.DoesNotExist):
+                Employee.objects.get_by_code(code)
+
+        self.employee.code = "second"
+        self.employee.save()
+        self.assertEqual(Employee.objects.get_by_code("second"), self.employee)
+        with self.assertRaises(Employee.DoesNotExist):
+            Employee.objects.get_by_code("first")
+
+    def test_backfill_codes(self) -> None:
+        """Digests keyed with an old secret key don't match until backfillcodes recomputes them."""
+        with override_settings(SECRET_KEY="rotated-" * 8):
+            self.employee.save()
+        with self.assertRaises(Employee.DoesNotExist):
+            Employee.objects.get_by_code("first")
+
+        stdout = io.StringIO()
+        call_command("backfillcodes", chunk_size=1, stdout=stdout)
+        self.assertIn(
+            "Processed 1 employees, updated 1 code digests.", stdout.getvalue()
+        )
+        self.assertEqual(Employee.objects.get_by_code("first"), self.employee)
+
+        call_command("backfillcodes", stdout=stdout)
+        self.assertIn("updated 0 code digests.", stdout.getvalue())
+        with self.assertRaises(CommandError):
+            call_command("backfillcodes", chunk_size=0, stdout=stdout)
+
+    def test_duplicate_codes_are_rejected(self) -> None:
+        """A fingerprint code belongs to one employee at most, wherever it's set."""
+        user = get_user_model().objects.create_user(username="other@terminusgps.com")
+        other = Employee.objects.create(user=user, code="other")
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            other.code = "first"
+            other.save()
+
+        form = EmployeeCreateForm(
+            data={"email": "new@terminusgps.com", "code": "first"}
+        )
+        self.assertIn("code", form.errors)
+        form = EmployeeSetFingerprintForm(data={"code": "first"}, instance=other)
+        self.assertIn("code", form.errors)
+        form = EmployeeSetFingerprintForm(
+            data={"code": "first"}, instance=self.employee
+        )
+        self.assertTrue(form.is_valid())
+
+        with self.assertRaises(CommandError):
+            call_command("setfingerprint", other.pk, "first", stdout=io.StringIO())
+        call_command("setfingerprint", self.employee.pk, "first", stdout=io.StringIO())
+        other.refresh_from_db()
+        self.assertEqual(other.code, "other")
+
+        # Rows written before the constraint existed, or by a raw update
+        Employee.objects.filter(pk=other.pk).update(code="first", code_digest=None)
+        for chunk_size in [1, 500]:
+            with (
+                self.subTest(chunk_size=chunk_size),
+                self.assertRaisesMessage(
+                    CommandError,
+                    f"Employees #{self.employee.pk} and #{other.pk} have the same fingerprint code.",
+                ),
+            ):
+                call_command(
+                    "backfillcodes", chunk_size=chunk_size, stdout=io.StringIO()
+                )
+        self.assertEqual(Employee.objects.get_by_code("first"), self.employee)
+
+
+class BulkPunchTestCase(TestCase):
+    def setUp(self) -> None:
+        self.employee_ids = []
+        for i in range(30):
+            user = get_user_model().objects.create_user(
+                username=f"crew{i}@terminusgps.com"
+            )
+            self.employee_ids.append(Employee.objects.create(user=user, code="").pk)
+
+    def test_bulk_punch_in_and_out(self) -> None:
+        """Bulk punches flip every card and create every shift in a constant number of queries."""
+        punch_in(self.employee_ids[0])
+        start = timezone.now()
+        with self.assertNumQueries(5):
+            result = bulk_punch_in(self.employee_ids, now=start)
+        self.assertEqual((result.success, result.skipped), (29, 1))
+
+        end = start + datetime.timedelta(hours=8)
+        with self.captureOnCommitCallbacks(execute=True):
+            result = bulk_punch_out(self.employee_ids[:20], now=end)
+        self.assertEqual((result.success, result.skipped), (20, 0))
+        self.assertFalse(
+            EmployeePunchCard.objects.filter(
+                employee_id__in=self.employee_ids[:20], punched_in=True
+            ).exists()
+        )
+        self.assertEqual(EmployeeShift.objects.filter(end_datetime=end).count(), 20)
+        self.assertEqual(
+            EmployeeShift.objects.get(employee_id=self.employee_ids[1]).duration,
+            datetime.timedelta(hours=8),
+        )
+        self.assertEqual(
+            EmployeeDailyHours.objects.filter(
+                employee_id__in=self.employee_ids[1:20], seconds=8 * 3600
+            ).count(),
+            19,
+        )
+
+        result = bulk_punch_out(self.employee_ids, now=end)
+        self.assertEqual((result.success, result.skipped), (10, 20))
+
+    def test_bulk_punch_out_query_count(self) -> None:
+        """Bulk punch outs don't run more queries for more employees."""
+        bulk_punch_in(self.employee_ids)
+        with self.assertNumQueries(5):
+            bulk_punch_out(self.employee_ids[:10])
+        with self.assertNumQueries(5):
+            bulk_punch_out(self.employee_ids[10:])
+
+
+class PunchEventTestCase(TestCase):
+    def setUp(self) -> None:
+        self.employee_ids = []
+        for i in range(3):
+            user = get_user_model().objects.create_user(
+                username=f"event{i}@terminusgps.com"
+            )
+            self.employee_ids.append(Employee.objects.create(user=user, code="").pk)
+        self.start = datetime.datetime(
+            2025, 3, 3, 8, tzinfo=timezone.get_current_timezone()
+        )
+
+    def punch(self, day: int, hours: int) -> None:
+        start = self.start + datetime.timedelta(days=day)
+        punch_in(self.employee_ids[0], now=start)
+        bulk_punch_in(self.employee_ids[1:], now=start)
+        with self.captureOnCommitCallbacks(execute=True):
+            punch_out(self.employee_ids[0], now=start + datetime.timedelta(hours=hours))
+            bulk_punch_out(
+                self.employee_ids, now=start + datetime.timedelta(hours=hours + 1)
+            )
+
+    def get_shifts(self) -> list[tuple[int, datetime.datetime, datetime.datetime]]:
+        return list(
+            EmployeeShift.objects.order_by("employee_id", "start_datetime").values_list(
+                "employee_id", "start_datetime", "end_datetime"
+            )
+        )
+
+    def test_punches_derive_shifts(self) -> None:
+        """Punch outs derive one shift per punch in/out pair once they commit."""
+        self.punch(0, 4)
+        self.punch(1, 6)
+
+        self.assertEqual(PunchEvent.objects.count(), 12)
+        self.assertEqual(EmployeeShift.objects.count(), 6)
+        self.assertEqual(
+            PunchEventCheckpoint.objects.get().last_event_id,
+            PunchEvent.objects.latest("pk").pk,
+        )
+        self.assertEqual(
+            EmployeeShift.objects.get(
+                employee_id=self.employee_ids[0], start_datetime=self.start
+            ).duration,
+            datetime.timedelta(hours=4),
+        )
+        self.assertEqual(
+            EmployeeDailyHours.objects.get(
+                employee_id=self.employee_ids[1], date=self.start.date()
+            ).seconds,
+            5 * 3600,
+        )
+        self.assertEqual(derive_shifts(), 0)
+
+    def test_replay_rebuilds_shifts(self) -> None:
+        """Replaying the punch event history reproduces the derived shifts and hours."""
+        for day in range(3):
+            self.punch(day, 2 + day)
+        shifts = self.get_shifts()
+        rollup = list(
+            EmployeeDailyHours.objects.order_by("employee_id", "date").values_list(
+                "employee_id", "date", "seconds", "shift_count"
+            )
+        )
+
+        EmployeeShift.objects.all().delete()
+        self.assertEqual(replay_shifts(chunk_size=4), 9)
+        self.assertEqual(self.get_shifts(), shifts)
+        self.assertEqual(
+            list(
+                EmployeeDailyHours.objects.order_by("employee_id", "date").values_list(
+                    "employee_id", "date", "seconds", "shift_count"
+                )
+            ),
+            rollup,
+        )
+        self.assertEqual(derive_shifts(), 0)
+
+    def test_derive_invalidates_artifacts_on_commit(self) -> None:
+        """Deriving shifts invalidates cached report pdf files only once the caller's transaction commits."""
+        punch_in(self.employee_ids[0], now=self.start)
+        punch_out(self.employee_ids[0], now=self.start + datetime.timedelta(hours=4))
+
+        with (
+            mock.patch(
+                "terminusgps_timekeeper.events.invalidate_report_artifacts"
+            ) as invalidate,
+            self.captureOnCommitCallbacks(execute=True),
+        ):
+            self.assertEqual(derive_shifts(), 1)
+            invalidate.assert_not_called()
+        invalidate.assert_called_once_with(self.start.date(), self.start.date())
+
+    def test_replay_rebuilds_rollup_and_artifacts(self) -> None:
+        """Replaying leaves the daily hours rollup matching the shifts, and invalidates every cached report."""
+        for day in range(3):
+            self.punch(day, 2 + day)
+        # Replay skips shift signals, so a stale rollup must not survive it
+        EmployeeDailyHours.objects.update(seconds=1, shift_count=1)
+        EmployeeDailyHours.objects.filter(date=self.start.date()).delete()
+
+        with (
+            mock.patch(
+                "terminusgps_timekeeper.events.invalidate_report_artifacts"
+            ) as invalidate,
+            self.captureOnCommitCallbacks(execute=True),
+        ):
+            replay_shifts()
+            invalidate.assert_not_called()
+        invalidate.assert_called_once_with(datetime.date.min, datetime.date.max)
+
+        employee_ids, starts, ends, durations = zip(
+            *EmployeeShift.objects.values_list(
+                "employee_id", "start_datetime", "end_datetime", "duration"
+            )
+        )
+        expected = aggregate_intervals(
+            split_intervals(starts, ends, durations, keys=employee_ids)
+        )
+        self.assertEqual(
+            list(
+                EmployeeDailyHours.objects.order_by("employee_id", "date").values_list(
+                    "employee_id", "date", "seconds", "shift_count"
+                )
+            ),
+            [
+                (employee_id, date, seconds, count)
+                for (employee_id, date), seconds, count in zip(
+                    expected.index, expected["seconds"], expected["count"]
+                )
+            ],
+        )
+
+    def test_legacy_open_cards_derive_shifts(self) -> None:
+        """Cards punched in without a punch in event still derive a shift when they punch out."""
+        EmployeePunchCard.objects.filter(employee_id__in=self.employee_ids).update(
+            punched_in=True, _prev_punch_state=True, last_punch_in_time=self.start
+        )
+        end = self.start + datetime.timedelta(hours=3)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertTrue(punch_out(self.employee_ids[0], now=end))
+            bulk_punch_out(self.employee_ids[1:2], now=end)
+        ingest_punch_events(
+            uuid.uuid4(),
+            [
+                PunchEvent(
+                    employee_id=self.employee_ids[2], direction="out", timestamp=end
+                )
+            ],
+        )
+
+        self.assertEqual(
+            self.get_shifts(),
+            [(employee_id, self.start, end) for employee_id in self.employee_ids],
+        )
+        self.assertEqual(
+            PunchEvent.objects.filter(
+                direction=PunchEvent.Direction.IN, timestamp=self.start
+            ).count(),
+            3,
+        )
+        EmployeeShift.objects.all().delete()
+        self.assertEqual(replay_shifts(), 3)
+
+    def test_punch_card_save_records_events(self) -> None:
+        """Saving a punch card with a new punch state punches through the punch events."""
+        card = EmployeePunchCard.objects.get(employee_id=self.employee_ids[0])
+        card.punched_in = True
+        card.save()
+        self.assertEqual(
+            list(PunchEvent.objects.values_list("direction", "source")),
+            [(PunchEvent.Direction.IN, PunchEvent.Source.ADMIN)],
+        )
+
+        card.punched_in = False
+        with self.captureOnCommitCallbacks(execute=True):
+            card.save()
+        self.assertFalse(EmployeePunchCard.objects.get(pk=card.pk).punched_in)
+        self.assertEqual(EmployeeShift.objects.count(), 1)
+
+    def test_punch_card_save_keeps_concurrent_punches(self) -> None:
+        """A punch committed after saving a punch card reads its state back isn't overwritten by the save."""
+        card = EmployeePunchCard.objects.get(employee_id=self.employee_ids[0])
+        refresh_from_db = EmployeePunchCard.refresh_from_db
+
+        def refresh_then_punch_out(instance, *args, **kwargs) -> None:
+            refresh_from_db(instance, *args, **kwargs)
+            punch_out(instance.employee_id, source=PunchEvent.Source.KIOSK)
+
+        card.punched_in = True
+        with mock.patch.object(
+            EmployeePunchCard, "refresh_from_db", refresh_then_punch_out
+        ):
+            card.save()
+
+        card = EmployeePunchCard.objects.get(pk=card.pk)
+        self.assertEqual((card.punched_in, card._prev_punch_state), (False, False))
+        self.assertEqual(
+            PunchEvent.objects.latest("pk").direction, PunchEvent.Direction.OUT
+        )
+
+
+class PunchBatchTestCase(TestCase):
+    def setUp(self) -> None:
+        user = get_user_model().objects.create_user(
+            username="kiosk@terminusgps.com", password="password"
+        )
+        self.employee = Employee.objects.create(user=user, code="kiosk")
+        self.start = datetime.datetime(
+            2025, 3, 3, 8, tzinfo=timezone.get_current_timezone()
+        )
+        self.client.force_login(user)
+
+    def build_events(self, *punches: tuple[str, int]) -> list[dict]:
+        return [
+            {
+                "employee": self.employee.pk,
+                "direction": direction,
+                "timestamp": (self.start + datetime.timedelta(hours=hours)).isoformat(),
+            }
+            for direction, hours in punches
+        ]
+
+    def test_ingest_orders_and_deduplicates(self) -> None:
+        """Batches are applied in timestamp order with repeated and stale events dropped."""
+        events = self.build_events(
+            ("out", 16), ("in", 8), ("out", 16), ("in", 32), ("out", 40), ("in", 8)
+        )
+        batch, created = ingest_punch_events(uuid.uuid4(), parse_punch_events(events))
+
+        self.assertTrue(created)
+        self.assertEqual(
+            (batch.received, batch.applied, batch.duplicates, batch.skipped),
+            (6, 4, 2, 0),
+        )
+        self.assertEqual(
+            list(
+                EmployeeShift.objects.order_by("start_datetime").values_list(
+                    "duration", flat=True
+                )
+            ),
+            [datetime.timedelta(hours=8)] * 2,
+        )
+        self.assertFalse(
+            EmployeePunchCard.objects.get(employee=self.employee).punched_in
+        )
+
+        stale = parse_punch_events(self.build_events(("in", 20), ("out", 24)))
+        batch, _ = ingest_punch_events(uuid.uuid4(), stale)
+        self.assertEqual((batch.applied, batch.skipped), (0, 2))
+        self.assertEqual(EmployeeShift.objects.count(), 2)
+
+    def test_token_makes_batches_idempotent(self) -> None:
+        """Resending a batch with the same token returns the original result."""
+        body = {
+            "token": str(uuid.uuid4()),
+            "events": self.build_events(("in", 0), ("out", 4)),
+        }
+        url = reverse("punch batch")
+        response = self.client.post(url, body, content_type="application/json")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()["applied"], 2)
+
+        # Session, user and batch lookups only
+        with self.assertNumQueries(3):
+            response = self.client.post(url, body, content_type="application/json")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()["replayed"])
+        self.assertEqual(PunchBatch.objects.count(), 1)
+        self.assertEqual(PunchEvent.objects.count(), 2)
+        self.assertEqual(EmployeeShift.objects.count(), 1)
+
+    def test_invalid_batches_are_rejected(self) -> None:
+        """Malformed batches are rejected without applying anything."""
+        url = reverse("punch batch")
+        for body in (
+            "not json",
+            json.dumps({"events": []}),
+            json.dumps({"token": str(uuid.uuid4()), "events": [{"employee": 1}]}),
+            json.dumps(
+                {
+                    "token": str(uuid.uuid4()),
+                    "events": self.build_events(("sideways", 0)),
+                }
+            ),
+        ):
+            with self.subTest(body=body):
+                response = self.client.post(url, body, content_type="application/json")
+                self.assertEqual(response.status_code, 400)
+        self.assertFalse(PunchBatch.objects.exists())
+
+
+class KioskPunchTestCase(TestCase):
+    def setUp(self) -> None:
+        user = get_user_model().objects.create_user(username="scan@terminusgps.com")
+        self.employee = Employee.objects.create(user=user, code="scan")
+        self.client.force_login(user)
+
+    def test_scan_toggles_punch(self) -> None:
+        """Each scan toggles the employee's punch state in one request."""
+        url = reverse("kiosk punch")
+        response = self.client.post(url, {"code": "scan"})
+        self.assertEqual(
+            response.json(), {"employee": self.employee.pk, "punched_in": True}
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(url, {"code": "scan"})
+        self.assertFalse(response.json()["punched_in"])
+        self.assertEqual(
+            PunchEvent.objects.filter(source=PunchEvent.Source.KIOSK).count(), 2
+        )
+        self.assertEqual(
+            EmployeeShift.objects.filter(employee=self.employee).count(), 1
+        )
+
+        response = self.client.post(url, {"code": "unknown"})
+        self.assertEqual(response.status_code, 404)
+
+    def test_code_cache_is_invalidated(self) -> None:
+        """Codes resolve without queries once cached, and changed codes resolve again."""
+        self.assertEqual(get_employee_id_by_code("scan"), self.employee.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(get_employee_id_by_code("scan"), self.employee.pk)
+
+        self.employee.code = "rescan"
+        self.employee.save()
+        self.assertIsNone(get_employee_id_by_code("scan"))
+        self.assertEqual(get_employee_id_by_code("rescan"), self.employee.pk)
+
+        self.employee.title = "Tech"
+        self.employee.save(update_fields=["title"])
+        with self.assertNumQueries(0):
+            self.assertEqual(get_employee_id_by_code("rescan"), self.employee.pk)
+
+        self.employee.user.delete()
+        self.assertIsNone(get_employee_id_by_code("rescan"))
+
+
+@override_settings(TIMEKEEPER_PUNCH_STREAM_INTERVAL=0.01)
+class PunchStreamTestCase(TestCase):
+    def setUp(self) -> None:
+        user = get_user_model().objects.create_user(username="stream@terminusgps.com")
+        self.employee = Employee.objects.create(user=user, code="stream")
+        self.user = user
+
+    async def read(self, stream) -> str:
+        return (await asyncio.wait_for(anext(stream), timeout=5)).decode()
+
+    async def test_streams_share_one_poller(self) -> None:
+        """Every connected stream receives the punched employee's row from one poller."""
+        await self.async_client.aforce_login(self.user)
+        url = reverse("punch stream")
+        streams = []
+        for _ in range(3):
+            response = await self.async_client.get(url)
+            self.assertEqual(response["Content-Type"], "text/event-stream")
+            streams.append(response.streaming_content)
+            self.assertEqual(await self.read(streams[-1]), "retry: 5000\n\n")
+        self.assertEqual(len(broadcaster.subscribers), 3)
+
+        await sync_to_async(punch_in)(self.employee.pk)
+        for stream in streams:
+            message = await self.read(stream)
+            event, data = message.split("\n")[1:3]
+            self.assertEqual(event, "event: punch")
+            data = json.loads(data.removeprefix("data: "))
+            self.assertEqual(data["employee"], self.employee.pk)
+            self.assertTrue(data["punched_in"])
+            self.assertIn(f'id="employee-{self.employee.pk}"', data["html"])
+
+        # Servers cancel the response when a client disconnects
+        for stream in streams:
+            read = asyncio.ensure_future(anext(stream))
+            await asyncio.sleep(0)
+            read.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await read
+        self.assertFalse(broadcaster.subscribers)
+
+    async def test_anonymous_streams_are_rejected(self) -> None:
+        """Anonymous users can't open a stream."""
+        response = await self.async_client.get(reverse("punch stream"))
+        self.assertEqual(response.status_code, 403)
+
+
+class ReportShiftsTestCase(TestCase):
+    def setUp(self) -> None:
+        user = get_user_model().objects.create_user(username="period@terminusgps.com")
+        self.employee = Employee.objects.create(user=user)
+        self.report = Report.objects.create(
+            start_date=datetime.date(2025, 3, 3), end_date=datetime.date(2025, 3, 9)
+        )
+        start, end = self.report.period
+        hour = datetime.timedelta(hours=1)
+        for shift_start, shift_end in [
+            (start - 4 * hour, start + 2 * hour),  # crosses the start
+            (start + 24 * hour, start + 32 * hour),  # inside
+            (end - 3 * hour, end + 5 * hour),  # crosses the end
+            (end, end + 8 * hour),  # after
+            (start - 8 * hour, start),  # before
+        ]:
+            EmployeeShift.objects.create(
+                employee=self.employee,
+                start_datetime=shift_start,
+                end_datetime=shift_end,
+            )
+
+    def test_boundary_shifts_are_clipped(self) -> None:
+        """Shifts crossing the report period are included, clipped to the period."""
+        start, end = self.report.period
+        shifts = list(self.report.shifts)
+        self.assertEqual(
+            [shift.clipped_duration for shift in shifts],
+            [datetime.timedelta(hours=hours) for hours in (2, 8, 3)],
+        )
+        self.assertEqual(shifts[0].clipped_start, start)
+        self.assertEqual(shifts[-1].clipped_end, end)
+        # Shift durations are untouched
+        self.assertEqual(shifts[0].duration, datetime.timedelta(hours=6))
+
+    @skipUnless(connection.vendor == "sqlite", "Reads SQLite query plans")
+    def test_queries_use_indexes(self) -> None:
+        """Period, per-employee and shift history queries search an index instead of scanning."""
+        start, end = self.report.period
+        shifts = EmployeeShift.objects.filter(employee=self.employee)
+        for queryset, index in [
+            (self.report.shifts, "shift_period_idx"),
+            (shifts.overlapping(start, end), "shift_employee_"),
+            (KeysetPaginator(shifts, 15).seek(None), "shift_employee_end_idx"),
+        ]:
+            with self.subTest(index=index):
+                plan = queryset.explain()
+                self.assertRegex(plan, rf"SEARCH \S+ USING INDEX {index}")
+                self.assertNotIn("TEMP B-TREE", plan)
+
+
+class ReportDatasetTestCase(TestCase):
+    def setUp(self) -> None:
+        self.report = Report.objects.create(
+            start_date=datetime.date(2025, 3, 3), end_date=datetime.date(2025, 3, 9)
+        )
+        self.employee_count = 0
+
+    def add_employees(self, count: int) -> None:
+        start, _ = self.report.period
+        for _ in range(count):
+            user = get_user_model().objects.create_user(
+                username=f"dataset{self.employee_count:03}@terminusgps.com"
+            )
+            employee = Employee.objects.create(user=user)
+            for day in range(3):
+                shift_start = start + datetime.timedelta(days=day, hours=8)
+                EmployeeShift.objects.create(
+                    employee=employee,
+                    start_datetime=shift_start,
+                    end_datetime=shift_start + datetime.timedelta(hours=4 + day),
+                )
+            self.employee_count += 1
+
+    def test_query_count_is_constant(self) -> None:
+        """Loading a report's data runs the same number of queries for 1 and 25 employees."""
+        self.add_employees(1)
+        with self.assertNumQueries(2):
+            dataset = ReportDataset(self.report)
+        self.assertEqual(len(dataset.employees), 1)
+
+        self.add_employees(24)
+        with self.assertNumQueries(2):
+            dataset = ReportDataset(self.report)
+            # Names, weekday charts and table rows don't query either
+            sections = [
+                (data.name, data.weekday_hours, data.get_table_rows())
+                for data in dataset.employees
+            ]
+        self.assertEqual(len(sections), 25)
+        self.assertEqual(len(dataset.employees), 25)
+        self.assertEqual(
+            dataset.employee_hours,
+            {
+                f"dataset{i:03}@terminusgps.com": 4 + 5 + 6
+                for i in range(self.employee_count)
+            },
+        )
+
+
+class ReportArtifactTestCase(TestCase):
+    def setUp(self) -> None:
+        user = get_user_model().objects.create_user(username="cache@terminusgps.com")
+        self.employee = Employee.objects.create(user=user)
+        self.report = Report.objects.create(
+            start_date=datetime.date(2025, 3, 3), end_date=datetime.date(2025, 3, 9)
+        )
+        start, _ = self.report.period
+        self.shift = EmployeeShift.objects.create(
+            employee=self.employee,
+            start_datetime=start + datetime.timedelta(days=1, hours=8),
+            end_datetime=start + datetime.timedelta(days=1, hours=16),
+        )
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings = override_settings(TIMEKEEPER_REPORT_DIR=pathlib.Path(directory.name))
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def test_cached_pdf_is_reused(self) -> None:
+        """Reports covering the same period reuse an up-to-date pdf file without generating it again."""
+        path = get_report_pdf(self.report)
+        same_period = Report.objects.create(
+            start_date=self.report.start_date, end_date=self.report.end_date
+        )
+        with mock.patch(
+            "terminusgps_timekeeper.artifacts.generate_report_pdf"
+        ) as generate:
+            self.assertEqual(get_report_pdf(self.report), path)
+            self.assertEqual(get_report_pdf(same_period), path)
+        generate.assert_not_called()
+
+    def test_edited_shift_regenerates_pdf(self) -> None:
+        """Editing a shift in the period deletes the cached pdf file, and the next request generates a new one in its place."""
+        path = get_report_pdf(self.report)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.shift.end_datetime += datetime.timedelta(hours=1)
+            self.shift.save()
+        self.assertFalse(path.exists())
+
+        regenerated = get_report_pdf(self.report)
+        self.assertNotEqual(regenerated, path)
+        self.assertTrue(regenerated.is_file())
+        self.assertEqual(list(regenerated.parent.glob("*.pdf")), [regenerated])
+
+    def test_invalidate_overlapping_periods(self) -> None:
+        """Only periods overlapping the changed dates are invalidated."""
+        directory = get_report_directory()
+        periods = [
+            (datetime.date(2025, 3, 1), datetime.date(2025, 3, 2)),
+            (datetime.date(2025, 3, 2), datetime.date(2025, 3, 8)),
+            (datetime.date(2025, 3, 5), datetime.date(2025, 3, 31)),
+            (datetime.date(2025, 4, 1), datetime.date(2025, 4, 30)),
+        ]
+        for start, end in periods:
+            (directory / get_period_directory(start, end)).mkdir(parents=True)
+        (directory / "not-a-period").mkdir()
+
+        invalidated = invalidate_report_artifacts(
+            datetime.date(2025, 3, 2), datetime.date(2025, 3, 5)
+        )
+        self.assertEqual(invalidated, 3)
+        self.assertEqual(
+            sorted(path.name for path in directory.iterdir()),
+            ["2025-04-01_2025-04-30", "not-a-period"],
+        )
+
+    def test_moved_shift_invalidates_both_periods(self) -> None:
+        """Moving a shift out of a report period invalidates the period it left."""
+        path = get_report_pdf(self.report)
+        self.assertTrue(path.is_file())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.shift.start_datetime += datetime.timedelta(days=30)
+            self.shift.end_datetime += datetime.timedelta(days=30)
+            self.shift.save()
+        self.assertFalse(path.exists())
+
+    def test_same_duration_move_regenerates_pdf(self) -> None:
+        """Moving a shift within the period without changing its duration never reuses the cached pdf file."""
+        start, _ = self.report.period
+        # Shifts before, after and on the same day as the moved one, so neither the first start, the last end nor the day's rollup row changes
+        for day, hour in [(0, 8), (1, 18), (6, 8)]:
+            EmployeeShift.objects.create(
+                employee=self.employee,
+                start_datetime=start + datetime.timedelta(days=day, hours=hour),
+                end_datetime=start + datetime.timedelta(days=day, hours=hour + 2),
+            )
+        path = get_report_pdf(self.report)
+        fingerprint = get_shift_fingerprint(self.report)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.shift.start_datetime += datetime.timedelta(hours=1)
+            self.shift.end_datetime += datetime.timedelta(hours=1)
+            self.shift.save()
+            # A request landing before the commit still finds the old pdf file, instead of caching a new one of the old shifts
+            self.assertTrue(path.is_file())
+        self.assertFalse(path.exists())
+
+        # Count, ids, duration, first start and last end are unchanged, so a pdf file cached before the commit must not match either
+        self.assertNotEqual(get_shift_fingerprint(self.report), fingerprint)
+        regenerated = get_report_pdf(self.report)
+        self.assertNotEqual(regenerated, path)
+        self.assertTrue(regenerated.is_file())
+
+    def test_rollup_changes_change_fingerprint(self) -> None:
+        """Changing the daily hours rollup without touching shifts regenerates the report pdf file."""
+        path = get_report_pdf(self.report)
+        fingerprint = get_shift_fingerprint(self.report)
+
+        EmployeeDailyHours.objects.update(seconds=3600)
+        self.assertNotEqual(get_shift_fingerprint(self.report), fingerprint)
+        rebuilt = get_report_pdf(self.report)
+        self.assertNotEqual(rebuilt, path)
+        self.assertTrue(rebuilt.is_file())
+        self.assertFalse(path.exists())
+
+
+class ReportJobTestCase(TestCase):
+    def setUp(self) -> None:
+        self.report = Report.objects.create(
+            start_date=datetime.date(2025, 3, 3), end_date=datetime.date(2025, 3, 9)
+        )
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings = override_settings(
+            TIMEKEEPER_REPORT_DIR=pathlib.Path(directory.name),
+            TIMEKEEPER_REPORT_PROFILE_MEMORY=False,
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def test_enqueue_reuses_unfinished_jobs(self) -> None:
+        """Enqueueing a report with a pending or running job returns that job."""
+        job = ReportJob.objects.enqueue(self.report)
+        self.assertEqual(ReportJob.objects.enqueue(self.report), job)
+
+        ReportJob.objects.filter(pk=job.pk).update(status=ReportJob.Status.RUNNING)
+        self.assertEqual(ReportJob.objects.enqueue(self.report), job)
+
+        ReportJob.objects.filter(pk=job.pk).update(status=ReportJob.Status.SUCCEEDED)
+        self.assertNotEqual(ReportJob.objects.enqueue(self.report), job)
+
+    def test_claim(self) -> None:
+        """Claims take the oldest runnable pending job, lock it and count the attempt, and never claim it twice."""
+        later = ReportJob.objects.create(
+            report=self.report, run_after=timezone.now() + datetime.timedelta(hours=1)
+        )
+        job = ReportJob.objects.create(report=self.report)
+
+        claimed = ReportJob.objects.claim("first")
+        self.assertEqual(claimed, job)
+        self.assertEqual(
+            (claimed.status, claimed.locked_by, claimed.attempts),
+            (ReportJob.Status.RUNNING, "first", 1),
+        )
+        self.assertIsNotNone(claimed.locked_at)
+        self.assertIsNone(ReportJob.objects.claim("second"))
+
+        ReportJob.objects.filter(pk=later.pk).update(run_after=timezone.now())
+        self.assertEqual(ReportJob.objects.claim("second"), later)
+
+    def test_retry_delay_backs_off(self) -> None:
+        """Retry delays double with each attempt, up to five minutes."""
+        self.assertEqual(
+            [
+                get_retry_delay(attempts).total_seconds()
+                for attempts in (1, 2, 3, 6, 10)
+            ],
+            [10, 20, 40, 300, 300],
+        )
+
+    def test_failed_jobs_retry_until_max_attempts(self) -> None:
+        """Failed attempts are requeued with a backoff, until the last attempt marks the job as failed."""
+        job = ReportJob.objects.enqueue(self.report)
+        worker = ReportJobWorker(worker_id="worker")
+        with mock.patch(
+            "terminusgps_timekeeper.jobs.get_report_pdf",
+            side_effect=RuntimeError("boom"),
+        ):
+            for attempt in range(1, job.max_attempts + 1):
+                ReportJob.objects.filter(pk=job.pk).update(run_after=timezone.now())
+                before = timezone.now()
+                with self.assertLogs("terminusgps_timekeeper.jobs", "ERROR"):
+                    self.assertEqual(worker.run(burst=True), 1)
+                job.refresh_from_db()
+                self.assertEqual(job.attempts, attempt)
+                self.assertIn("boom", job.error)
+                self.assertIsNone(job.locked_by)
+                if attempt < job.max_attempts:
+                    self.assertEqual(job.status, ReportJob.Status.PENDING)
+                    self.assertGreaterEqual(
+                        job.run_after, before + get_retry_delay(attempt)
+                    )
+        self.assertEqual(job.status, ReportJob.Status.FAILED)
+        self.assertIsNotNone(job.finished_at)
+
+    def test_recover_stale(self) -> None:
+        """Stale running jobs are requeued, or failed once they're out of attempts."""
+        stale_at = timezone.now() - datetime.timedelta(hours=1)
+        running = {"status": ReportJob.Status.RUNNING, "locked_by": "gone"}
+        requeued = ReportJob.objects.create(
+            report=self.report, attempts=1, locked_at=stale_at, **running
+        )
+        failed = ReportJob.objects.create(
+            report=self.report, attempts=3, locked_at=stale_at, **running
+        )
+        fresh = ReportJob.objects.create(
+            report=self.report, attempts=1, locked_at=timezone.now(), **running
+        )
+
+        self.assertEqual(
+            ReportJob.objects.recover_stale(datetime.timedelta(minutes=10)), 2
+        )
+        for job, status in [
+            (requeued, ReportJob.Status.PENDING),
+            (failed, ReportJob.Status.FAILED),
+            (fresh, ReportJob.Status.RUNNING),
+        ]:
+            with self.subTest(status=status):
+                job.refresh_from_db()
+                self.assertEqual(job.status, status)
+        self.assertIsNone(requeued.locked_by)
+        self.assertEqual(fresh.locked_by, "gone")
+
+    def test_recovered_jobs_keep_new_owner_outcome(self) -> None:
+        """A worker whose job was recovered by another worker doesn't record its outcome."""
+        job = ReportJob.objects.enqueue(self.report)
+
+        def recover(*args) -> None:
+            ReportJob.objects.filter(pk=job.pk).update(locked_by="other")
+
+        with mock.patch(
+            "terminusgps_timekeeper.jobs.get_report_pdf", side_effect=recover
+        ):
+            ReportJobWorker(worker_id="worker").run(burst=True)
+        job.refresh_from_db()
+        self.assertEqual(
+            (job.status, job.locked_by), (ReportJob.Status.RUNNING, "other")
+        )
+
+    def test_runworker_burst(self) -> None:
+        """runworker --burst runs every queued job and exits once the queue is empty."""
+        jobs = [ReportJob.objects.enqueue(self.report)]
+        other = Report.objects.create(
+            start_date=datetime.date(2025, 4, 1), end_date=datetime.date(2025, 4, 30)
+        )
+        jobs.append(ReportJob.objects.enqueue(other))
+
+        stdout = io.StringIO()
+        call_command("runworker", workers=1, burst=True, stdout=stdout)
+        self.assertIn("Ran 2 report job(s).", stdout.getvalue())
+        for job in jobs:
+            job.refresh_from_db()
+            self.assertEqual(job.status, ReportJob.Status.SUCCEEDED)
+            self.assertIsNone(job.locked_by)
+        self.assertEqual(len(list(get_report_directory().glob("*/*.pdf"))), 2)
+
+        with self.assertRaises(CommandError):
+            call_command("runworker", workers=0, burst=True, stdout=stdout)
+
+
+class ReportProfileTestCase(TestCase):
+    def setUp(self) -> None:
+        user = get_user_model().objects.create_user(username="profile@terminusgps.com")
+        self.employee = Employee.objects.create(user=user)
+        self.report = Report.objects.create(
+            start_date=datetime.date(2025, 3, 3), end_date=datetime.date(2025, 3, 9)
+        )
+        start, _ = self.report.period
+        for day in range(3):
+            shift_start = start + datetime.timedelta(days=day, hours=8)
+            EmployeeShift.objects.create(
+                employee=self.employee,
+                start_datetime=shift_start,
+                end_datetime=shift_start + datetime.timedelta(hours=8),
+            )
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings = override_settings(
+            TIMEKEEPER_REPORT_DIR=pathlib.Path(directory.name),
+            TIMEKEEPER_REPORT_PROFILE_MEMORY=False,
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def test_generate_records_stages(self) -> None:
+        """Every generation stage is recorded, with queries and memory allocations."""
+        profile = ReportProfile(trace_memory=True)
+        generator = PDFReportGenerator(
+            self.report, workers=1, chart_backend="reportlab", profile=profile
+        )
+        generator.generate()
+
+        name = str(self.employee)
+        self.assertIs(generator.profile, profile)
+        self.assertEqual(
+            [stage.name for stage in profile.stages],
+            [
+                "dataset",
+                "cover",
+                "overview",
+                f"chart: {name}",
+                f"table: {name}",
+                "build",
+            ],
+        )
+        self.assertGreater(profile.stages[0].queries, 0)
+        self.assertEqual(sum(stage.queries for stage in profile.stages[1:]), 0)
+        for stage in profile.stages:
+            self.assertGreaterEqual(stage.peak, 0)
+            self.assertIsNotNone(stage.allocated)
+        self.assertAlmostEqual(
+            profile.wall_time, sum(stage.wall_time for stage in profile.stages)
+        )
+
+    def test_memory_is_only_traced_when_asked(self) -> None:
+        """Profiles record wall time and queries without tracing memory by default."""
+        generator = PDFReportGenerator(self.report, workers=1)
+        generator.generate()
+
+        self.assertTrue(generator.profile.stages)
+        self.assertTrue(all(stage.peak is None for stage in generator.profile.stages))
+        self.assertFalse(generator.profile.as_dict()["trace_memory"])
+
+    def test_job_profile_is_displayed(self) -> None:
+        """Workers save the job's profile, which the status view and admin display."""
+        job = ReportJob.objects.enqueue(self.report)
+        self.assertEqual(ReportJobWorker(worker_id="profile").run(burst=True), 1)
+        job.refresh_from_db()
+
+        self.assertEqual(job.status, ReportJob.Status.SUCCEEDED)
+        names = [stage["name"] for stage in job.profile["stages"]]
+        self.assertEqual(names[:2], ["fingerprint", "dataset"])
+        self.assertEqual(names[-1], "build")
+
+        user = get_user_model().objects.create_superuser(
+            username="admin@terminusgps.com", password="admin"
+        )
+        self.client.force_login(user)
+        for url in [
+            reverse("report job status", kwargs={"pk": job.pk}),
+            reverse("admin:terminusgps_timekeeper_reportjob_change", args=[job.pk]),
+        ]:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertContains(response, "Generation profile")
+                self.assertContains(response, "fingerprint")
+
+
+class KeysetPaginationTestCase(TestCase):
+    def setUp(self) -> None:
+        user = get_user_model().objects.create_user(username="pages@terminusgps.com")
+        self.employee = Employee.objects.create(user=user)
+        self.client.force_login(user)
+        end = timezone.now()
+        # Pairs of shifts share an end time, so pages must break ties by id
+        EmployeeShift.objects.bulk_create(
+            EmployeeShift(
+                employee=self.employee,
+                start_datetime=end - datetime.timedelta(days=i // 2, hours=8),
+                end_datetime=end - datetime.timedelta(days=i // 2),
+                duration=datetime.timedelta(hours=8),
+            )
+            for i in range(37)
+        )
+        self.shifts = EmployeeShift.objects.filter(employee=self.employee)
+
+    def test_pages_cover_every_shift_once(self) -> None:
+        """Following cursors reads every shift once, in order, one query per page."""
+        paginator = KeysetPaginator(self.shifts, 10)
+        seen, cursor = [], None
+        while True:
+            with self.assertNumQueries(1):
+                page = paginator.get_page(cursor)
+            seen.extend(shift.pk for shift in page)
+            if not page.has_next:
+                break
+            cursor = page.next_cursor
+        expected = self.shifts.order_by("-end_datetime", "-id")
+        self.assertEqual(seen, list(expected.values_list("pk", flat=True)))
+        self.assertEqual(len(page), 7)
+
+        with self.assertRaises(InvalidCursor):
+            paginator.get_page("not-a-cursor")
+
+    def test_load_more_renders_rows(self) -> None:
+        """htmx requests with a cursor only render the next rows, without counting shifts."""
+        url = reverse("list shifts", args=[self.employee.pk])
+        response = self.client.get(url, headers={"HX-Request": "true"})
+        self.assertContains(response, "<table")
+        self.assertContains(response, "Load more")
+        cursor = response.context["page_obj"].next_cursor
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(
+                url, {"cursor": cursor}, headers={"HX-Request": "true"}
+            )
+        self.assertNotContains(response, "<table")
+        self.assertEqual(len(response.context["page_obj"]), 15)
+        self.assertFalse(any("COUNT(" in q["sql"] for q in queries.captured_queries))
+
+        response = self.client.get(url, {"cursor": "not-a-cursor"})
+        self.assertEqual(response.status_code, 404)
+
+
+class AsyncViewTestCase(TestCase):
+    def setUp(self) -> None:
+        self.user = get_user_model().objects.create_user(
+            username="async@terminusgps.com"
+        )
+        self.employee = Employee.objects.create(user=self.user, code="async")
+        start = timezone.now() - datetime.timedelta(days=30)
+        EmployeeShift.objects.bulk_create(
+            EmployeeShift(
+                employee=self.employee,
+                start_datetime=start + datetime.timedelta(days=day),
+                end_datetime=start + datetime.timedelta(days=day, hours=8),
+                duration=datetime.timedelta(hours=8),
+            )
+            for day in range(20)
+        )
+        self.headers = {"HX-Request": "true"}
+
+    def render_sync(self, view, path: str, **kwargs) -> str:
+        request = RequestFactory().get(path, headers=self.headers)
+        request.user = self.user
+        return view.as_view()(request, **kwargs).render().content.decode()
+
+    async def render_async(self, view, path: str, **kwargs) -> str:
+        request = AsyncRequestFactory().get(path, headers=self.headers)
+        request.user = self.user
+
+        async def auser():
+            return self.user
+
+        request.auser = auser
+        response = await view.as_view()(request, **kwargs)
+        # Rendering in the event loop raises if the template touches the database
+        return response.render().content.decode()
+
+    async def test_async_views_match_sync_views(self) -> None:
+        """The async views render the same partials as the sync views."""
+        pk = self.employee.pk
+        shifts = EmployeeShift.objects.filter(employee=self.employee)
+        page = await KeysetPaginator(shifts, 15).aget_page()
+        for sync_view, async_view, path in [
+            (EmployeeDetailView, AsyncEmployeeDetailView, f"/employees/{pk}/"),
+            (ShiftListView, AsyncShiftListView, f"/shifts/{pk}/"),
+            (
+                ShiftListView,
+                AsyncShiftListView,
+                f"/shifts/{pk}/?cursor={page.next_cursor}",
+            ),
+        ]:
+            with self.subTest(view=async_view.__name__):
+                expected = await sync_to_async(self.render_sync)(sync_view, path, pk=pk)
+                self.assertEqual(
+                    await self.render_async(async_view, path, pk=pk), expected
+                )
+
+    async def test_async_detail_punches(self) -> None:
+        """Patching the async detail view punches the employee in/out."""
+        view = AsyncEmployeeDetailView.as_view()
+        path = f"/employees/{self.employee.pk}/"
+        factory = AsyncRequestFactory()
+
+        response = await view(factory.patch(path), pk=self.employee.pk)
+        self.assertEqual(response.status_code, 403)
+
+        for status, punched_in in [("true", True), ("false", False)]:
+            request = factory.patch(f"{path}?status={status}", headers=self.headers)
+            response = await view(request, pk=self.employee.pk)
+            self.assertEqual(response.status_code, 200)
+            card = await EmployeePunchCard.objects.aget(employee=self.employee)
+            self.assertEqual(card.punched_in, punched_in)
+        self.assertEqual(
+            await PunchEvent.objects.filter(employee=self.employee).acount(), 2
+        )
+
+    async def test_async_shift_list_requires_login(self) -> None:
+        """Anonymous users are redirected to login."""
+        request = AsyncRequestFactory().get(f"/shifts/{self.employee.pk}/")
+        request.auser = sync_to_async(AnonymousUser)
+        response = await AsyncShiftListView.as_view()(request, pk=self.employee.pk)
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(response["Location"].startswith(reverse("login")))
+
+
+class ServerTimingMiddlewareTestCase(TestCase):
+    def setUp(self) -> None:
+        user = get_user_model().objects.create_user(username="timing@terminusgps.com")
+        Employee.objects.create(user=user, code="timing")
+        self.client.force_login(user)
+
+    def get_metrics(self, header: str) -> dict[str, tuple[float, str]]:
+        metrics = {}
+        for metric in header.split(", "):
+            name, duration, desc = metric.split(";")
+            metrics[name] = (float(duration.removeprefix("dur=")), desc)
+        return metrics
+
+    @override_settings(
+        TIMEKEEPER_SERVER_TIMING_SAMPLE_RATE=1, TIMEKEEPER_SLOW_REQUEST_THRESHOLD=0
+    )
+    def test_timings_are_sent_and_slow_requests_logged(self) -> None:
+        """Sampled responses carry Server-Timing, and slow requests log their slowest SQL."""
+        with (
+            self.assertLogs("terminusgps_timekeeper.middleware", "WARNING") as logs,
+            CaptureQueriesContext(connection) as context,
+        ):
+            response = self.client.get(reverse("list employees"))
+
+        metrics = self.get_metrics(response.headers["Server-Timing"])
+        self.assertEqual(list(metrics), ["sql", "view", "template", "total"])
+        self.assertEqual(metrics["sql"][1], f'desc="{len(context)} queries"')
+        self.assertGreater(metrics["template"][0], 0)
+        self.assertGreaterEqual(metrics["total"][0], metrics["view"][0])
+
+        data = logs.records[0].request_timing
+        self.assertEqual((data["method"], data["path"]), ("GET", "/employees/"))
+        self.assertEqual(data["queries"], len(context))
+        durations = [query["duration_ms"] for query in data["slowest_queries"]]
+        self.assertEqual(durations, sorted(durations, reverse=True))
+        self.assertEqual(len(durations), min(len(context), 5))
+        # Statements are logged without their parameters
+        self.assertNotIn(
+            "timing@terminusgps.com",
+            " ".join(query["sql"] for query in data["slowest_queries"]),
+        )
+
+    @override_settings(
+        TIMEKEEPER_SERVER_TIMING_SAMPLE_RATE=0, TIMEKEEPER_SLOW_REQUEST_THRESHOLD=0
+    )
+    def test_unsampled_requests_are_skipped(self) -> None:
+        """Requests left out of the sample get no header and aren't logged."""
+        with self.assertNoLogs("terminusgps_timekeeper.middleware"):
+            response = self.client.get(reverse("list employees"))
+        self.assertNotIn("Server-Timing", response.headers)
+
+    @override_settings(
+        TIMEKEEPER_SERVER_TIMING_SAMPLE_RATE=1, TIMEKEEPER_SLOW_REQUEST_THRESHOLD=60_000
+    )
+    async def test_async_requests_count_queries(self) -> None:
+        """Queries run from async views through sync_to_async are counted."""
+
+        async def view(request):
+            await Employee.objects.acount()
+            await Employee.objects.afirst()
+            return HttpResponse()
+
+        middleware = ServerTimingMiddleware(view)
+        response = await middleware(AsyncRequestFactory().get("/"))
+        metrics = self.get_metrics(response.headers["Server-Timing"])
+        self.assertEqual(metrics["sql"][1], 'desc="2 queries"')
+
+    @override_settings(
+        TIMEKEEPER_SERVER_TIMING_SAMPLE_RATE=1, TIMEKEEPER_SLOW_REQUEST_THRESHOLD=60_000
+    )
+    async def test_asgi_requests_are_timed(self) -> None:
+        """View and template hooks run in async mode under the ASGI handler."""
+        user = await get_user_model().objects.aget(username="timing@terminusgps.com")
+        await self.async_client.aforce_login(user)
+        response = await self.async_client.get(reverse("list employees"))
+        self.assertEqual(response.status_code, 200)
+        metrics = self.get_metrics(response.headers["Server-Timing"])
+        self.assertGreater(metrics["view"][0], 0)
+        self.assertGreater(metrics["template"][0], 0)
+
+
+class SeedTimekeeperTestCase(TestCase):
+    def seed(self, prefix: str, **options) -> None:
+        options = {
+            "employees": 4,
+            "years": 0.25,
+            "until": datetime.date(2025, 11, 15),
+            **options,
+        }
+        call_command("seed_timekeeper", prefix=prefix, stdout=io.StringIO(), **options)
+
+    def get_shifts(self, prefix: str) -> list[tuple]:
+        shifts = EmployeeShift.objects.filter(
+            employee__user__username__startswith=f"{prefix}-"
+        ).order_by("employee__user__username", "start_datetime")
+        return list(
+            shifts.values_list(
+                "employee__user__username", "start_datetime", "end_datetime", "duration"
+            )
+        )
+
+    def test_same_seed_seeds_same_shifts(self) -> None:
+        """Seeding twice with the same seed creates the same shift history."""
+        self.seed("first")
+        self.seed("second")
+        self.seed("third", seed=1)
+
+        first, second = self.get_shifts("first"), self.get_shifts("second")
+        self.assertGreater(len(first), 4 * 40)
+        self.assertEqual(
+            [shift[1:] for shift in first], [shift[1:] for shift in second]
+        )
+        self.assertNotEqual(
+            [shift[1:] for shift in first],
+            [shift[1:] for shift in self.get_shifts("third")],
+        )
+
+    def test_seeded_shifts_and_rollup(self) -> None:
+        """Seeded shifts read back through the ORM, and their rollup matches a rebuild."""
+        self.seed("seed", open_ratio=1)
+
+        shift = EmployeeShift.objects.earliest("start_datetime")
+        self.assertEqual(shift.duration, shift.end_datetime - shift.start_datetime)
+        self.assertTrue(
+            EmployeeShift.objects.filter(start_datetime=shift.start_datetime).exists()
+        )
+        self.assertFalse(
+            EmployeeShift.objects.filter(
+                start_datetime__gte=datetime.datetime(
+                    2025, 11, 15, tzinfo=timezone.get_current_timezone()
+                )
+            ).exists()
+        )
+
+        seeded = sorted(
+            EmployeeDailyHours.objects.values_list(
+                "employee_id", "date", "seconds", "shift_count"
+            )
+        )
+        rebuild_daily_hours()
+        rebuilt = sorted(
+            EmployeeDailyHours.objects.values_list(
+                "employee_id", "date", "seconds", "shift_count"
+            )
+        )
+        self.assertEqual(seeded, rebuilt)
+
+        cards = EmployeePunchCard.objects.all()
+        self.assertEqual(cards.count(), 4)
+        self.assertTrue(all(card.punched_in for card in cards))
+        self.assertEqual(
+            PunchEvent.objects.filter(direction=PunchEvent.Direction.IN).count(), 4
+        )
+
+    def test_existing_prefix_raises(self) -> None:
+        """Seeding an existing prefix again fails instead of duplicating employees."""
+        self.seed("seed", employees=1)
+        with self.assertRaises(CommandError):
+            self.seed("seed", employees=1)
+
+
+class BenchmarkSuiteTestCase(TestCase):
+    def test_suite_writes_json_results(self) -> None:
+        """The benchmark suite records every hot path and cleans up its dataset."""
+        with tempfile.TemporaryDirectory() as directory:
+            output = pathlib.Path(directory) / "benchmark.json"
+            call_command(
+                "benchmark",
+                "suite",
+                employees=[2],
+                years=0.05,
+                repeat=1,
+                output=output,
+                stdout=io.StringIO(),
+            )
+            data = json.loads(output.read_text())
+
+        self.assertEqual(data["database"], connection.vendor)
+        self.assertEqual(
+            [result["benchmark"] for result in data["results"]],
+            [
+                "punch",
+                "employee_list",
+                "shift_list",
+                "report_daily",
+                "report_weekly",
+                "report_monthly",
+                "report_yearly",
+                "import",
+            ],
+        )
+        for result in data["results"]:
+            self.assertEqual(result["employees"], 2)
+            self.assertEqual(len(result["wall_time"]["runs"]), 1)
+            self.assertGreater(result["queries"], 0)
+            self.assertGreater(result["peak_memory"], 0)
+        self.assertFalse(Employee.objects.exists())
+
+    def test_ingest_leaves_report_cache_alone(self) -> None:
+        """Ingest runs don't invalidate cached report pdf files in the real report directory."""
+        today = timezone.localdate()
+        with tempfile.TemporaryDirectory() as directory:
+            cached = (
+                pathlib.Path(directory)
+                / get_period_directory(today - datetime.timedelta(days=30), today)
+                / "cached.pdf"
+            )
+            cached.parent.mkdir()
+            cached.write_bytes(b"%PDF-")
+            with override_settings(TIMEKEEPER_REPORT_DIR=pathlib.Path(directory)):
+                call_command(
+                    "benchmark",
+                    "ingest",
+                    events=[20],
+                    employees=2,
+                    stdout=io.StringIO(),
+                )
+            self.assertTrue(cached.exists())
+        self.assertFalse(Employee.objects.exists())
+
+
+def format_queries(queries: list[dict[str, str]]) -> str:
+    """Returns captured queries as a numbered list."""
+    return "\n".join(f"{i}. {query['sql']}" for i, query in enumerate(queries, start=1))
+
+
+class ViewQueryBudgetTestCase(TestCase):
+    """Asserts views stay within a declared maximum number of queries, however many rows they render."""
+
+    query_budgets: dict[str, int] = {
+        # Session, user, page count, page of employees with their users and punch cards joined
+        "list employees": 4,
+        "list employees partial": 4,
+        # Employee with its user and punch card joined, its shifts, session, user
+        "detail employee": 4,
+        # Savepoint, latest event direction (punch outs only), conditional card update, event insert, release, then the detail employee queries minus the session and user
+        "punch employee": 7,
+        # Employee, session, user, first page of shifts
+        "list shifts": 4,
+        # The list shifts queries, plus the test's own lookup of the next page cursor
+        "list shifts more": 5,
+        # Session, user, employee
+        "set fingerprint": 3,
+        # Page count, session, user, page of reports
+        "list reports": 4,
+        # Existence check, distinct years, page count, session, user, page of reports
+        "archive reports": 6,
+        # Report, session, user, distinct employees with shifts in the period
+        "detail report": 4,
+        # Job with its report joined, session, user
+        "report job status": 3,
+        # Session, user, punch card check (the code is cached), savepoint, latest event direction, conditional card update, event insert, release
+        "kiosk punch": 8,
+        # The test's employee id lookup, session, user, token lookup, then ingest (8: savepoint, batch insert, cards, latest events, card update, event insert, batch update, release) and derive_shifts (13: savepoint, checkpoint, events, checkpoint claim, open punches, shift insert, rollup savepoint, rollup rows, savepoint, missing rollup insert, 3 releases), plus 3 to create the checkpoint on the first batch ever
+        "punch batch": 28,
+    }
+    """Maximum number of queries for each budget, keyed by budget name. Each budget is exactly what its view runs today, so any new query, per row or not, fails the test."""
+
+    def setUp(self) -> None:
+        self.user = get_user_model().objects.create_user(
+            username="budget@terminusgps.com"
+        )
+        self.employee = Employee.objects.create(user=self.user, code="budget")
+        self.client.force_login(self.user)
+        self.until = timezone.localdate()
+        self.seeded = 0
+
+    def add_rows(self, count: int) -> None:
+        """Adds employees with shifts and daily hours, and reports with jobs."""
+        if count < 1:
+            return
+        call_command(
+            "seed_timekeeper",
+            employees=count,
+            years=0.1,
+            open_ratio=0.5,
+            prefix=f"budget{self.seeded}",
+            until=self.until,
+            stdout=io.StringIO(),
+        )
+        self.seeded += 1
+        EmployeeShift.objects.bulk_create(
+            EmployeeShift(
+                employee=self.employee,
+                start_datetime=timezone.now() - datetime.timedelta(days=day, hours=8),
+                end_datetime=timezone.now() - datetime.timedelta(days=day),
+                duration=datetime.timedelta(hours=8),
+            )
+            for day in range(1, count * 3 + 1)
+        )
+        for _ in range(count):
+            report = Report.objects.create(
+                start_date=self.until - datetime.timedelta(days=30),
+                end_date=self.until - datetime.timedelta(days=1),
+            )
+            self.job = ReportJob.objects.create(report=report)
+        self.report = report
+
+    @contextlib.contextmanager
+    def assertMaxQueries(self, budget: int, label: str = "Block"):
+        """Fails if the block runs more than ``budget`` queries, listing every query it ran."""
+        with CaptureQueriesContext(connection) as context:
+            yield context
+        if len(context) > budget:
+            self.fail(
+                f"{label} ran {len(context)} queries, over its budget of {budget}:\n"
+                + format_queries(context.captured_queries)
+            )
+
+    def assertQueryBudget(
+        self, name: str, request: Callable[[], object], sizes: tuple[int, ...] = (1, 10)
+    ) -> None:
+        """
+        Runs ``request`` after growing the data to each size, asserting every run is within the budget named ``name``.
+
+        A query per row blows the budget as soon as the data grows, even if it fits with a single row.
+
+        """
+        budget = self.query_budgets[name]
+        added = 0
+        for size in sizes:
+            self.add_rows(size - added)
+            added = size
+            with self.assertMaxQueries(budget, f"'{name}' with {size} rows"):
+                request()
+
+    def test_employee_list(self) -> None:
+        """Employee list rows don't query their user or punch card."""
+        url = reverse("list employees")
+        self.assertQueryBudget("list employees", lambda: self.client.get(url))
+        self.assertQueryBudget(
+            "list employees partial",
+            lambda: self.client.get(url, headers={"HX-Request": "true"}),
+        )
+
+    def test_employee_detail(self) -> None:
+        """Employee details and punches don't query per shift."""
+        url = reverse("detail employee", args=[self.employee.pk])
+        self.assertQueryBudget("detail employee", lambda: self.client.get(url))
+        statuses = itertools.cycle(["true", "false"])
+        self.assertQueryBudget(
+            "punch employee",
+            lambda: self.client.patch(
+                f"{url}?status={next(statuses)}", headers={"HX-Request": "true"}
+            ),
+        )
+
+    def test_shift_list(self) -> None:
+        """Shift list pages don't query per shift."""
+        url = reverse("list shifts", args=[self.employee.pk])
+        self.assertQueryBudget("list shifts", lambda: self.client.get(url))
+
+        def load_more() -> None:
+            cursor = (
+                KeysetPaginator(
+                    EmployeeShift.objects.filter(employee=self.employee), 15
+                )
+                .get_page()
+                .next_cursor
+            )
+            self.client.get(url, {"cursor": cursor}, headers={"HX-Request": "true"})
+
+        self.assertQueryBudget("list shifts more", load_more, sizes=(10, 20))
+
+    def test_set_fingerprint(self) -> None:
+        """The fingerprint form doesn't query per row."""
+        url = reverse("set fingerprint", args=[self.employee.pk])
+        self.assertQueryBudget("set fingerprint", lambda: self.client.get(url))
+
+    def test_report_views(self) -> None:
+        """Report pages don't query per report or per employee in a report."""
+        self.assertQueryBudget(
+            "list reports", lambda: self.client.get(reverse("list reports"))
+        )
+        self.assertQueryBudget(
+            "archive reports", lambda: self.client.get(reverse("archive reports"))
+        )
+        self.assertQueryBudget(
+            "detail report",
+            lambda: self.client.get(reverse("detail report", args=[self.report.pk])),
+        )
+        self.assertQueryBudget(
+            "report job status",
+            lambda: self.client.get(reverse("report job status", args=[self.job.pk])),
+        )
+
+    def test_punch_views(self) -> None:
+        """Kiosk and batch punches don't query per employee or event."""
+        self.assertQueryBudget(
+            "kiosk punch",
+            lambda: self.client.post(reverse("kiosk punch"), {"code": "budget"}),
+        )
+
+        def punch_batch() -> None:
+            now = timezone.now()
+            employees = Employee.objects.values_list("pk", flat=True)
+            events = [
+                {
+                    "employee": pk,
+                    "direction": direction,
+                    "timestamp": (now + datetime.timedelta(hours=hours)).isoformat(),
+                }
+                for pk in employees
+                for direction, hours in (("in", 1), ("out", 2))
+            ]
+            self.client.post(
+                reverse("punch batch"),
+                {"token": str(uuid.uuid4()), "events": events},
+                content_type="application/json",
+            )
+
+        self.assertQueryBudget("punch batch", punch_batch)
+
+
+class ConcurrentPunchTestCase(TransactionTestCase):
+    thread_count = 8
+    punches_per_thread = 40
+
+    def setUp(self) -> None:
+        user = get_user_model().objects.create_user(username="punch@terminusgps.com")
+        self.employee = Employee.objects.create(user=user, code="punch")
+
+    @staticmethod
+    def retry_locked(fn, *args):
+        """Retries ``fn`` while sqlite reports the shared in-memory test database as locked."""
+        while True:
+            try:
+                return fn(*args)
+            except OperationalError as e:
+                if "locked" not in str(e):
+                    raise
+
+    def run_threads(self, target) -> None:
+        barrier = threading.Barrier(self.thread_count)
+
+        def run(seed: int) -> None:
+            barrier.wait()
+            try:
+                target(random.Random(seed))
+            finally:
+                connection.close()
+
+        threads = [
+            threading.Thread(target=run, args=(seed,))
+            for seed in range(self.thread_count)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    def test_one_shift_per_transition(self) -> None:
+        """Concurrent punches create exactly one shift per punch in/out transition."""
+        employee_id = self.employee.pk
+        counts = {"in": 0, "out": 0}
+        lock = threading.Lock()
+
+        def punch(rng: random.Random) -> None:
+            for _ in range(self.punches_per_thread):
+                if rng.random() < 0.5:
+                    changed = self.retry_locked(punch_in, employee_id)
+                    direction = "in"
+                else:
+                    changed = self.retry_locked(punch_out, employee_id)
+                    direction = "out"
+                if changed:
+                    with lock:
+                        counts[direction] += 1
+
+        self.run_threads(punch)
+        # Derivers that lost a lock on commit are caught up by the next run
+        self.retry_locked(derive_shifts)
+
+        shifts = list(EmployeeShift.objects.order_by("start_datetime"))
+        card = EmployeePunchCard.objects.get(employee=self.employee)
+        self.assertGreater(counts["out"], 0)
+        self.assertEqual(len(shifts), counts["out"])
+        self.assertEqual(counts["in"] - counts["out"], int(card.punched_in))
+        self.assertEqual(len({shift.start_datetime for shift in shifts}), len(shifts))
+        for shift in shifts:
+            self.assertGreaterEqual(shift.end_datetime, shift.start_datetime)
+
+    def test_double_punch_out_creates_one_shift(self) -> None:
+        """Simultaneous punch outs for the same punch in create a single shift."""
+        punch_in(self.employee.pk)
+        results = []
+
+        def punch(rng: random.Random) -> None:
+            results.append(self.retry_locked(punch_out, self.employee.pk))
+
+        self.run_threads(punch)
+        self.retry_locked(derive_shifts)
+        self.assertEqual(sum(results), 1)
+        self.assertEqual(
+            PunchEvent.objects.filter(direction=PunchEvent.Direction.OUT).count(), 1
+        )
+        self.assertEqual(EmployeeShift.objects.count(), 1)
@@ -1,6 +1,14 @@
+from django.conf import settings
 from django.urls import path
 from . import views
 
+if getattr(settings, "TIMEKEEPER_ASYNC_VIEWS", False):
+    EmployeeDetailView = views.AsyncEmployeeDetailView
+    ShiftListView = views.AsyncShiftListView
+else:
+    EmployeeDetailView = views.EmployeeDetailView
+    ShiftListView = views.ShiftListView
+
 urlpatterns = [
     path("login/", views.LoginView.as_view(), name="login"),
     path("logout/", views.LogoutView.as_view(), name="logout"),
@@ -15,10 +23,11 @@ urlpatterns = [
         name="create employee batch",
     ),
     path(
-        "employees/<int:pk>/",
-        views.EmployeeDetailView.as_view(),
-        name="detail employee",
+        "employees/new/batch/<uuid:token>/",
+        views.EmployeeBatchProgressView.as_view(),
+        name="create employee batch progress",
     ),
+    path("employees/<int:pk>/", EmployeeDetailView.as_view(), name="detail employee"),
     path(
         "employees/<int:pk>/set-fingerprint/",
         views.EmployeeSetFingerprintView.as_view(),
@@ -31,6 +40,11 @@ urlpatterns = [
         views.ReportCreateSuccessView.as_view(),
         name="create report success",
     ),
+    path(
+        "reports/jobs/<int:pk>/",
+        views.ReportJobStatusView.as_view(),
+        name="report job status",
+    ),
     path("reports/archive/", views.ReportArchiveView.as_view(), name="archive reports"),
     path(
         "reports/<int:pk>/download/", views.report_download_view, name="download report"
@@ -41,5 +55,8 @@ urlpatterns = [
         name="delete report",
     ),
     path("reports/<int:pk>/", views.ReportDetailView.as_view(), name="detail report"),
-    path("shifts/<int:pk>/", views.ShiftListView.as_view(), name="list shifts"),
+    path("punches/kiosk/", views.KioskPunchView.as_view(), name="kiosk punch"),
+    path("punches/stream/", views.PunchStreamView.as_view(), name="punch stream"),
+    path("punches/batch/", views.PunchBatchView.as_view(), name="punch batch"),
+    path("shifts/<int:pk>/", ShiftListView.as_view(), name="list shifts"),
 ]
@@ -1,6 +1,12 @@
+import datetime
 import secrets
 import string
 
+from django.utils.crypto import salted_hmac
+
+CODE_DIGEST_SALT: str = "terminusgps_timekeeper.Employee.code"
+"""Key salt for fingerprint code digests."""
+
 
 def display_duration(total_seconds: float) -> str:
     """
@@ -22,6 +28,50 @@ def display_duration(total_seconds: float) -> str:
     return f"{int(hours):02d}:{int(minutes):02d}:{int(seconds):02d}"
 
 
+def build_shift_table(
+    intervals: list[tuple[datetime.datetime, datetime.datetime, datetime.timedelta]],
+) -> list[list[str]]:
+    """
+    Takes shift intervals and returns them as table rows, including a header and a total row.
+
+    :param intervals: Start, end and duration of each shift.
+    :type intervals: :py:obj:`list`
+    :returns: A list of table rows.
+    :rtype: :py:obj:`list`
+
+    """
+    rows = [["Start Date/Time", "End Date/Time", "Duration"]]
+    total = datetime.timedelta(0)
+    for start, end, duration in intervals:
+        rows.append(
+            [
+                f"{start:%Y-%m-%d %I:%M %p}",
+                f"{end:%Y-%m-%d %I:%M %p}",
+                display_duration(duration.total_seconds()),
+            ]
+        )
+        total += duration
+    rows.append(["Total", "", display_duration(total.total_seconds())])
+    return rows
+
+
+def hash_fingerprint_code(code: str | None) -> str | None:
+    """
+    Takes a fingerprint code and returns a keyed hash (HMAC-SHA256) of it.
+
+    The digest is keyed with ``settings.SECRET_KEY``, so it can be stored and indexed without revealing the code.
+
+    :param code: A fingerprint code.
+    :type code: :py:obj:`str` | :py:obj:`None`
+    :returns: A hex digest of the code, or :py:obj:`None` if the code was empty.
+    :rtype: :py:obj:`str` | :py:obj:`None`
+
+    """
+    if not code:
+        return None
+    return salted_hmac(CODE_DIGEST_SALT, code, algorithm="sha256").hexdigest()
+
+
 def generate_random_password(length: int = 32) -> str:
     """
     Generates a random password and returns it.
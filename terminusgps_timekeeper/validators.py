@@ -5,6 +5,8 @@ from django.db.models import Q, QuerySet
 from django.forms import ValidationError
 from django.utils.translation import gettext_lazy as _
 
+from terminusgps_timekeeper.models import Employee
+
 
 def validate_spreadsheet_file(value: File) -> None:
     """Raises :py:exec:`~django.core.exceptions.ValidationError` if the file is not a spreadsheet file."""
@@ -26,3 +28,12 @@ def validate_email_unique(value: str) -> None:
         raise ValidationError(
             _("Whoops! '%(email)s' is taken."), code="invalid", params={"email": value}
         )
+
+
+def validate_code_unique(value: str) -> None:
+    """Raises :py:exec:`~django.core.exceptions.ValidationError` if another employee already has the fingerprint code."""
+    if Employee.objects.code_in_use(value):
+        raise ValidationError(
+            _("Whoops! That fingerprint code belongs to another employee."),
+            code="invalid",
+        )
@@ -1,9 +1,11 @@
 from .auth import LoginView, LogoutView
 from .generic import ContactView, PrivacyPolicyView, SourceCodeView
 from .employees import (
+    AsyncEmployeeDetailView,
     EmployeeCreateView,
     EmployeeDetailView,
     EmployeeBatchCreateView,
+    EmployeeBatchProgressView,
     EmployeeListView,
     EmployeeSetFingerprintView,
 )
@@ -15,6 +17,8 @@ from .reports import (
     ReportDownloadView,
     ReportArchiveView,
     ReportDeleteView,
+    ReportJobStatusView,
     report_download_view,
 )
-from .shifts import ShiftListView
+from .punches import KioskPunchView, PunchBatchView, PunchStreamView
+from .shifts import AsyncShiftListView, ShiftListView
@@ -1,25 +1,42 @@
-import pandas as pd
+import uuid
+import zipfile
 from typing import Any
 
+from asgiref.sync import sync_to_async
 from django import forms
 from django.contrib.auth import get_user_model
-from django.contrib.auth.base_user import AbstractBaseUser
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.core.exceptions import ValidationError
-from django.core.files import File
 from django.db.models import Q, QuerySet
-from django.http import HttpRequest, HttpResponse, HttpResponseRedirect
+from django.http import Http404, HttpRequest, HttpResponse, HttpResponseRedirect
 from django.urls import reverse_lazy
 from django.utils.translation import gettext_lazy as _
-from django.views.generic import DetailView, FormView, ListView, UpdateView
+from django.views.generic import (
+    DetailView,
+    FormView,
+    ListView,
+    TemplateView,
+    UpdateView,
+    View,
+)
+from django.views.generic.base import ContextMixin
 
+from terminusgps_timekeeper.imports import (
+    EmployeeImporter,
+    ImportResult,
+    get_import_progress,
+    set_import_progress,
+)
 from terminusgps_timekeeper.models import Employee, EmployeeShift
+from terminusgps_timekeeper.pagination import KeysetPage, KeysetPaginator
+from terminusgps_timekeeper.punches import set_punch_status
 from terminusgps_timekeeper.utils import generate_random_password
 from terminusgps_timekeeper.views.mixins import HtmxTemplateResponseMixin
 from terminusgps_timekeeper.forms import (
     EmployeeBatchCreateForm,
     EmployeeCreateForm,
     EmployeeSearchForm,
+    EmployeeSetFingerprintForm,
 )
 
 
@@ -62,7 +79,8 @@ class EmployeeListView(LoginRequiredMixin, HtmxTemplateResponseMixin, ListView):
     raise_exception = False
 
     def get_queryset(self, **kwargs) -> QuerySet:
-        queryset = super().get_queryset(**kwargs)
+        # Rows show each employee's username and punch state
+        queryset = super().get_queryset(**kwargs).select_related("user", "punch_card")
         form = EmployeeSearchForm({"q": self.request.GET.get("q")})
         if form.is_valid() and form.cleaned_data["q"] is not None:
             query = form.cleaned_data["q"]
@@ -80,71 +98,81 @@ class EmployeeListView(LoginRequiredMixin, HtmxTemplateResponseMixin, ListView):
 class EmployeeBatchCreateView(HtmxTemplateResponseMixin, FormView):
     extra_context = {"class": "flex flex-col gap-4", "title": "Upload Batch File"}
     form_class = EmployeeBatchCreateForm
-    partial_template_name = "terminusgps_timekeeper/employees/_create_batch.html"
+    partial_template_name = (
+        "terminusgps_timekeeper/employees/partials/_create_batch.html"
+    )
     success_url = reverse_lazy("list employees")
     template_name = "terminusgps_timekeeper/employees/create_batch.html"
     http_method_names = ["get", "post"]
 
+    def get_initial(self) -> dict[str, Any]:
+        initial: dict[str, Any] = super().get_initial()
+        initial["token"] = uuid.uuid4()
+        return initial
+
     def form_valid(self, form: EmployeeBatchCreateForm) -> HttpResponse:
+        token: uuid.UUID | None = form.cleaned_data["token"]
+        processed: int = 0
+
+        def progress(result: ImportResult, rows: int) -> None:
+            nonlocal processed
+            processed = rows
+            if token is not None:
+                set_import_progress(token, result, rows)
+
         try:
-            df = self.get_dataframe(form.cleaned_data["input_file"])
-        except ValueError as e:
-            form.add_error(
-                "input_file",
-                ValidationError(
-                    _("Whoops! %(error)s"), code="invalid", params={"error": e}
-                ),
+            result = EmployeeImporter().import_file(
+                form.cleaned_data["input_file"], progress=progress
             )
-            return self.form_invalid(form=form)
-
-        if df is None:
+        except (ValueError, zipfile.BadZipFile) as e:
+            if token is not None:
+                set_import_progress(token, ImportResult(), processed, done=True)
+            message = _("Whoops! %(error)s")
+            if processed:
+                message = _(
+                    "Whoops! %(error)s The first %(count)s row(s) were imported."
+                )
             form.add_error(
                 "input_file",
                 ValidationError(
-                    _(
-                        "Whoops! Failed to extract data from the input file. Please try again later."
-                    )
+                    message, code="invalid", params={"error": e, "count": processed}
                 ),
             )
             return self.form_invalid(form=form)
 
-        for i, row in df.iterrows():
-            email: str = str(row["Email"])
-            phone: str | None = str(row["Phone"]) if pd.notna(row["Phone"]) else None
-            title: str | None = str(row["Title"]) if pd.notna(row["Title"]) else None
-            user: AbstractBaseUser = get_user_model().objects.create_user(
-                username=email, password=generate_random_password()
+        if token is not None:
+            set_import_progress(token, result, processed, done=True)
+        if not result:
+            return self.render_to_response(
+                self.get_context_data(
+                    form=self.get_form_class()(initial=self.get_initial()),
+                    result=result,
+                )
             )
-            Employee.objects.create(user=user, phone=phone, title=title)
         return super().form_valid(form=form)
 
-    def get_dataframe(self, input_file: File) -> pd.DataFrame | None:
-        ext = "".join(input_file.name.split(".")[-1])
 
-        match ext:
-            case "csv":
-                df = pd.read_csv(input_file)
-            case "xlsx":
-                df = pd.read_excel(input_file)
-            case _:
-                raise ValueError(f"Invalid input file type: '{ext}'.")
-        return self.validate_dataframe(df)
-
-    def validate_dataframe(self, df: pd.DataFrame) -> pd.DataFrame | None:
-        """Raises :py:exec:`~django.core.exceptions.ValidationError` if any invalid columns are present in the :py:obj:`~pandas.DataFrame`."""
-        target_cols: tuple[str, str, str] = ("Email", "Phone", "Title")
-        bad_cols: list[str] = [col for col in df.columns if col not in target_cols]
+class EmployeeBatchProgressView(HtmxTemplateResponseMixin, TemplateView):
+    content_type = "text/html"
+    http_method_names = ["get"]
+    partial_template_name = (
+        "terminusgps_timekeeper/employees/partials/_create_batch_progress.html"
+    )
+    template_name = "terminusgps_timekeeper/employees/create_batch_progress.html"
+    extra_context = {"title": "Upload Progress"}
 
-        if bad_cols:
-            raise ValueError(f"Invalid column names: '{bad_cols}'")
-        return df
+    def get_context_data(self, **kwargs) -> dict[str, Any]:
+        context: dict[str, Any] = super().get_context_data(**kwargs)
+        context["token"] = self.kwargs["token"]
+        context["progress"] = get_import_progress(self.kwargs["token"])
+        return context
 
 
 class EmployeeDetailView(HtmxTemplateResponseMixin, DetailView):
     model = Employee
     template_name = "terminusgps_timekeeper/employees/detail.html"
     partial_template_name = "terminusgps_timekeeper/employees/partials/_detail.html"
-    queryset = Employee.objects.all()
+    queryset = Employee.objects.select_related("user", "punch_card")
     context_object_name = "employee"
     http_method_names = ["get", "patch"]
     extra_context = {"class": "flex flex-col gap-8", "title": "Employee Details"}
@@ -158,9 +186,9 @@ class EmployeeDetailView(HtmxTemplateResponseMixin, DetailView):
         status_map = {"true": True, "false": False}
         return status_map.get(status, None)
 
-    def get_shifts(self, total: int = 5) -> QuerySet[EmployeeShift | EmployeeShift]:
-        e, o = self.get_object(), "-start_datetime"
-        return EmployeeShift.objects.filter(employee=e).order_by(o)[:total]
+    def get_shifts(self, total: int = 5) -> KeysetPage:
+        shifts = EmployeeShift.objects.filter(employee=self.object)
+        return KeysetPaginator(shifts, total).get_page()
 
     def get_context_data(self, **kwargs) -> dict[str, Any]:
         context: dict[str, Any] = super().get_context_data(**kwargs)
@@ -173,12 +201,54 @@ class EmployeeDetailView(HtmxTemplateResponseMixin, DetailView):
 
         status = self.clean_status(request.GET.get("status"))
         if status is not None:
-            employee = self.get_object()
-            employee.punch_card.punched_in = status
-            employee.punch_card.save()
+            set_punch_status(self.kwargs["pk"], status)
         return self.get(request, *args, **kwargs)
 
 
+class AsyncEmployeeDetailView(HtmxTemplateResponseMixin, ContextMixin, View):
+    """
+    Async-native :py:obj:`EmployeeDetailView`.
+
+    The employee, their user and punch card are read with one :py:meth:`~django.db.models.query.QuerySet.aget`, and their latest shifts with async iteration, so the template renders without touching the database.
+
+    """
+
+    template_name = EmployeeDetailView.template_name
+    partial_template_name = EmployeeDetailView.partial_template_name
+    http_method_names = ["get", "patch"]
+    extra_context = EmployeeDetailView.extra_context
+    clean_status = staticmethod(EmployeeDetailView.clean_status)
+
+    async def aget_object(self) -> Employee:
+        try:
+            return await Employee.objects.select_related("user", "punch_card").aget(
+                pk=self.kwargs["pk"]
+            )
+        except Employee.DoesNotExist:
+            raise Http404("No employee found matching the query")
+
+    async def aget_shifts(self, total: int = 5) -> KeysetPage:
+        shifts = EmployeeShift.objects.filter(employee_id=self.kwargs["pk"])
+        return await KeysetPaginator(shifts, total).aget_page()
+
+    async def get(self, request: HttpRequest, *args, **kwargs) -> HttpResponse:
+        employee = await self.aget_object()
+        context = self.get_context_data(
+            object=employee, employee=employee, latest_shifts=await self.aget_shifts(5)
+        )
+        return self.render_to_response(context)
+
+    async def patch(self, request: HttpRequest, *args, **kwargs) -> HttpResponse:
+        if not request.headers.get("HX-Request"):
+            return HttpResponse(status=403)
+
+        status = self.clean_status(request.GET.get("status"))
+        if status is not None:
+            # Punches run in a transaction, which the async ORM can't open
+            await sync_to_async(set_punch_status)(self.kwargs["pk"], status)
+        return await self.get(request, *args, **kwargs)
+
+
 class EmployeeSetFingerprintView(
     LoginRequiredMixin, HtmxTemplateResponseMixin, UpdateView
 ):
@@ -190,7 +260,7 @@ class EmployeeSetFingerprintView(
     queryset = Employee.objects.all()
     context_object_name = "employee"
     http_method_names = ["get", "post"]
-    fields = ["code"]
+    form_class = EmployeeSetFingerprintForm
     extra_context = {"title": "Update Fingerprint", "class": "flex flex-col gap-4"}
     login_url = reverse_lazy("login")
     permission_denied_message = "Please login and try again."
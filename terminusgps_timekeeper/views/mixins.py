@@ -27,3 +27,37 @@ class HtmxTemplateResponseMixin(TemplateResponseMixin):
         if htmx_request and self.partial_template_name and not boosted:
             self.template_name = self.partial_template_name
         return super().render_to_response(context, **response_kwargs)
+
+
+class HtmxLoadMoreMixin(HtmxTemplateResponseMixin):
+    """
+    Renders a load more template for `htmx`_ requests that continue from a pagination cursor.
+
+    .. _htmx: https://htmx.org/docs/
+
+    """
+
+    load_more_template_name: str | None = None
+    """
+    A template rendered by `htmx`_ for every page after the first.
+
+    :type: :py:obj:`str` | :py:obj:`None`
+    :value: :py:obj:`None`
+    """
+
+    cursor_kwarg: str = "cursor"
+    """
+    Query parameter holding the pagination cursor.
+
+    :type: :py:obj:`str`
+    :value: ``"cursor"``
+    """
+
+    def render_to_response(self, context: dict[str, Any], **response_kwargs):
+        htmx_request = self.request.headers.get("HX-Request", False)
+        boosted = self.request.headers.get("HX-Boosted", False)
+        cursor = self.request.GET.get(self.cursor_kwarg)
+
+        if htmx_request and cursor and self.load_more_template_name and not boosted:
+            self.partial_template_name = self.load_more_template_name
+        return super().render_to_response(context, **response_kwargs)
@@ -0,0 +1,124 @@
+import asyncio
+import json
+import uuid
+from collections.abc import AsyncIterator
+
+from django.contrib.auth.mixins import LoginRequiredMixin
+from django.http import HttpRequest, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.views.generic import View
+
+from terminusgps_timekeeper.kiosk import get_employee_id_by_code, toggle_punch
+from terminusgps_timekeeper.punches import ingest_punch_events, parse_punch_events
+from terminusgps_timekeeper.streams import broadcaster
+
+
+class PunchBatchView(LoginRequiredMixin, View):
+    """
+    Applies a JSON batch of punch events recorded while a kiosk was offline.
+
+    The request body must be an object with a ``token`` and a list of ``events``:
+
+    .. code:: json
+
+        {
+            "token": "5a0ed8a4-3c5e-4bfa-a5b0-1c2d3e4f5a6b",
+            "events": [
+                {"employee": 1, "direction": "in", "timestamp": "2025-03-03T08:00:00-06:00"},
+                {"employee": 1, "direction": "out", "timestamp": "2025-03-03T16:00:00-06:00"}
+            ]
+        }
+
+    Retrying a request with the same token returns the original result.
+
+    """
+
+    http_method_names = ["post"]
+    raise_exception = True
+
+    def post(self, request: HttpRequest, *args, **kwargs) -> JsonResponse:
+        try:
+            payload = json.loads(request.body)
+        except ValueError:
+            return JsonResponse({"error": "Invalid JSON."}, status=400)
+        if not isinstance(payload, dict):
+            return JsonResponse({"error": "Punch batch must be an object."}, status=400)
+
+        try:
+            token = uuid.UUID(str(payload.get("token")))
+        except ValueError:
+            return JsonResponse({"error": "Invalid token."}, status=400)
+        try:
+            events = parse_punch_events(payload.get("events"))
+        except ValueError as e:
+            return JsonResponse({"error": str(e)}, status=400)
+
+        batch, created = ingest_punch_events(token, events)
+        return JsonResponse(
+            {
+                "token": str(batch.token),
+                "received": batch.received,
+                "applied": batch.applied,
+                "duplicates": batch.duplicates,
+                "skipped": batch.skipped,
+                "replayed": not created,
+            },
+            status=201 if created else 200,
+        )
+
+
+class KioskPunchView(LoginRequiredMixin, View):
+    """
+    Punches the employee with a scanned fingerprint code in or out in a single request.
+
+    Responds with the employee id and their new punch state, i.e. ``{"employee": 1, "punched_in": true}``.
+
+    """
+
+    http_method_names = ["post"]
+    raise_exception = True
+
+    def post(self, request: HttpRequest, *args, **kwargs) -> JsonResponse:
+        employee_id = get_employee_id_by_code(request.POST.get("code", ""))
+        if employee_id is None:
+            return JsonResponse({"error": "Unknown fingerprint code."}, status=404)
+        return JsonResponse(
+            {"employee": employee_id, "punched_in": toggle_punch(employee_id)}
+        )
+
+
+class PunchStreamView(View):
+    """
+    Streams punch state changes to the browser as server-sent events.
+
+    Each ``punch`` event carries the employee id, their new punch state, the punch time and their rendered employee list row. Streams share a single punch event poller per process, so this view should be served over ASGI.
+
+    """
+
+    http_method_names = ["get"]
+    keepalive_interval: float = 15
+    """Seconds between keepalive comments on an idle stream."""
+
+    async def get(self, request: HttpRequest, *args, **kwargs) -> HttpResponse:
+        user = await request.auser()
+        if not user.is_authenticated:
+            return HttpResponse(status=403)
+        response = StreamingHttpResponse(
+            self.stream(), content_type="text/event-stream"
+        )
+        response["Cache-Control"] = "no-cache"
+        response["X-Accel-Buffering"] = "no"
+        return response
+
+    async def stream(self) -> AsyncIterator[str]:
+        queue = await broadcaster.subscribe()
+        try:
+            yield "retry: 5000\n\n"
+            while True:
+                try:
+                    yield await asyncio.wait_for(
+                        queue.get(), timeout=self.keepalive_interval
+                    )
+                except TimeoutError:
+                    yield ": keepalive\n\n"
+        finally:
+            broadcaster.unsubscribe(queue)
@@ -12,8 +12,8 @@ from django.views.generic import (
 )
 
 from terminusgps_timekeeper.forms import ReportCreateForm
-from terminusgps_timekeeper.models import Report
-from terminusgps_timekeeper.pdf_generators import generate_report_pdf
+from terminusgps_timekeeper.models import Report, ReportJob
+from terminusgps_timekeeper.artifacts import get_report_pdf
 from terminusgps_timekeeper.views.mixins import HtmxTemplateResponseMixin
 
 
@@ -68,13 +68,13 @@ class ReportCreateView(HtmxTemplateResponseMixin, CreateView):
     success_url = reverse_lazy("create report success")
 
     def form_valid(self, form: ReportCreateForm) -> HttpResponse | HttpResponseRedirect:
-        response = super().form_valid(form)
-        generate_report_pdf(self.object, __class__.__name__)
-        return response
+        self.object = form.save()
+        self.job = ReportJob.objects.enqueue(self.object, __class__.__name__)
+        return HttpResponseRedirect(self.get_success_url())
 
     def get_success_url(self) -> str:
-        if self.object is not None:
-            return f"{reverse('create report success')}?next={reverse('download report', kwargs={'pk': self.object.pk})}"
+        if getattr(self, "job", None) is not None:
+            return f"{reverse('create report success')}?job={self.job.pk}"
         return super().get_success_url()
 
 
@@ -91,8 +91,25 @@ class ReportCreateSuccessView(HtmxTemplateResponseMixin, TemplateView):
 
     def setup(self, request: HttpRequest, *args, **kwargs) -> None:
         super().setup(request, *args, **kwargs)
-        self.next = request.GET.get("next")
-        print(f"{self.next = }")
+        try:
+            self.job = ReportJob.objects.get(pk=int(request.GET.get("job", "")))
+        except (ValueError, ReportJob.DoesNotExist):
+            self.job = None
+
+    def get_context_data(self, **kwargs) -> dict[str, Any]:
+        context: dict[str, Any] = super().get_context_data(**kwargs)
+        context["job"] = self.job
+        return context
+
+
+class ReportJobStatusView(HtmxTemplateResponseMixin, DetailView):
+    content_type = "text/html"
+    context_object_name = "job"
+    http_method_names = ["get"]
+    model = ReportJob
+    partial_template_name = "terminusgps_timekeeper/reports/partials/_job_status.html"
+    template_name = "terminusgps_timekeeper/reports/job_status.html"
+    extra_context = {"title": "Report Status", "class": "flex flex-col gap-2"}
 
 
 class ReportDownloadView(DetailView):
@@ -102,8 +119,10 @@ class ReportDownloadView(DetailView):
     template_name = "terminusgps_timekeeper/reports/download.html"
 
     def get(self, request: HttpRequest, *args, **kwargs) -> FileResponse:
-        pdf_file = generate_report_pdf(self.get_object())
-        return FileResponse(pdf_file, as_attachment=True, filename="report.pdf")
+        pdf_path = get_report_pdf(self.get_object())
+        return FileResponse(
+            pdf_path.open("rb"), as_attachment=True, filename="report.pdf"
+        )
 
 
 def report_download_view(
@@ -114,8 +133,8 @@ def report_download_view(
     except Report.DoesNotExist:
         return HttpResponse(status=404)
 
-    pdf_file = generate_report_pdf(report)
-    return FileResponse(pdf_file, as_attachment=True, filename="report.pdf")
+    pdf_path = get_report_pdf(report)
+    return FileResponse(pdf_path.open("rb"), as_attachment=True, filename="report.pdf")
 
 
 class ReportDeleteView(DeleteView):
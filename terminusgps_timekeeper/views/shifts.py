@@ -1,29 +1,35 @@
 from typing import Any
 from django.contrib.auth.mixins import LoginRequiredMixin
+from django.contrib.auth.views import redirect_to_login
 from django.db.models import QuerySet
-from django.http import HttpRequest
+from django.http import Http404, HttpRequest, HttpResponse
 from django.urls import reverse_lazy
-from django.views.generic import ListView
+from django.views.generic import ListView, View
+from django.views.generic.base import ContextMixin
 
 from terminusgps_timekeeper.models import Employee, EmployeeShift
-from terminusgps_timekeeper.views.mixins import HtmxTemplateResponseMixin
+from terminusgps_timekeeper.pagination import InvalidCursor, KeysetPage, KeysetPaginator
+from terminusgps_timekeeper.views.mixins import HtmxLoadMoreMixin
 
 
-class ShiftListView(ListView, LoginRequiredMixin, HtmxTemplateResponseMixin):
+class ShiftListView(LoginRequiredMixin, HtmxLoadMoreMixin, ListView):
     model = EmployeeShift
     template_name = "terminusgps_timekeeper/shifts/list.html"
     partial_template_name = "terminusgps_timekeeper/shifts/partials/_list.html"
+    load_more_template_name = "terminusgps_timekeeper/shifts/partials/_list_rows.html"
     http_method_names = ["get"]
     login_url = reverse_lazy("login")
     permission_denied_message = "Please login and try again."
     raise_exception = False
     paginate_by = 15
-    ordering = "-end_datetime"
+    ordering = ("-end_datetime", "-id")
 
     def setup(self, request: HttpRequest, *args, **kwargs) -> None:
         super().setup(request, *args, **kwargs)
         try:
-            self.employee = Employee.objects.get(pk=self.kwargs["pk"])
+            self.employee = Employee.objects.select_related("user").get(
+                pk=self.kwargs["pk"]
+            )
         except Employee.DoesNotExist:
             self.employee = None
 
@@ -38,3 +44,62 @@ class ShiftListView(ListView, LoginRequiredMixin, HtmxTemplateResponseMixin):
         if self.employee is not None:
             qs = qs.filter(employee=self.employee)
         return qs
+
+    def paginate_queryset(
+        self, queryset: QuerySet, page_size: int
+    ) -> tuple[KeysetPaginator, KeysetPage, list[EmployeeShift], bool]:
+        """Paginates shifts by cursor, so deep pages are as fast as the first and nothing is counted."""
+        paginator = KeysetPaginator(queryset, page_size, self.ordering)
+        try:
+            page = paginator.get_page(self.request.GET.get(self.cursor_kwarg))
+        except InvalidCursor as e:
+            raise Http404(str(e))
+        return paginator, page, page.object_list, page.has_next
+
+
+class AsyncShiftListView(HtmxLoadMoreMixin, ContextMixin, View):
+    """
+    Async-native :py:obj:`ShiftListView`.
+
+    The page is read with async iteration.
+
+    """
+
+    template_name = ShiftListView.template_name
+    partial_template_name = ShiftListView.partial_template_name
+    load_more_template_name = ShiftListView.load_more_template_name
+    http_method_names = ["get"]
+    login_url = ShiftListView.login_url
+    paginate_by = ShiftListView.paginate_by
+    ordering = ShiftListView.ordering
+
+    async def get(self, request: HttpRequest, *args, **kwargs) -> HttpResponse:
+        user = await request.auser()
+        if not user.is_authenticated:
+            return redirect_to_login(request.get_full_path(), self.login_url)
+
+        try:
+            employee = await Employee.objects.select_related("user").aget(
+                pk=self.kwargs["pk"]
+            )
+        except Employee.DoesNotExist:
+            employee = None
+        queryset = EmployeeShift.objects.all()
+        if employee is not None:
+            queryset = queryset.filter(employee=employee)
+
+        paginator = KeysetPaginator(queryset, self.paginate_by, self.ordering)
+        try:
+            page = await paginator.aget_page(request.GET.get(self.cursor_kwarg))
+        except InvalidCursor as e:
+            raise Http404(str(e))
+
+        context = self.get_context_data(
+            paginator=paginator,
+            page_obj=page,
+            is_paginated=page.has_next,
+            object_list=page.object_list,
+            employee=employee,
+            title=f"{employee}'s Shifts",
+        )
+        return self.render_to_response(context)